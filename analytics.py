@@ -0,0 +1,265 @@
+"""
+Precomputed draw analytics
+Computed with vectorized NumPy while an upload is loaded and stored per
+generation, next to number_frequency, so the statistics endpoints read a
+bounded number of rows no matter how long the history is:
+
+- number_pairs / number_triples: co-occurrence counts of main balls
+  (one-hot draw matrix X, pairs = X.T @ X)
+- number_gaps: draws since each number last appeared (main and bonus)
+- number_windows: main-ball counts over the last N draws (hot / cold)
+
+Draws are ordered as they appear in the uploaded file (historical_data.id).
+"""
+import numpy as np
+
+from cache import stats_cache
+from database import execute_query, execute_many
+from frequency import BONUS_POSITION, get_position_counts
+from generations import ACTIVE_GENERATION_SQL, read_generation
+
+MAIN_NUMBERS = 43
+BONUS_NUMBERS = 16
+
+# Filas leídas de historical_data por lote al recalcular una generación
+READ_CHUNK_SIZE = 50_000
+
+ANALYTICS_TABLES = ['number_pairs', 'number_triples', 'number_gaps', 'number_windows']
+
+# Valores por defecto; create_app() los sobrescribe con configure_analytics()
+_settings = {
+    'windows': (10, 50, 100),
+    'max_limit': 100,
+}
+
+
+def configure_analytics(app_config):
+    """Load analytics settings from the Flask config (ANALYTICS_* keys)"""
+    _settings['windows'] = tuple(sorted(app_config.get('ANALYTICS_WINDOWS', _settings['windows'])))
+    _settings['max_limit'] = app_config.get('ANALYTICS_MAX_LIMIT', _settings['max_limit'])
+
+
+def analytics_windows():
+    return _settings['windows']
+
+
+def max_limit():
+    return _settings['max_limit']
+
+
+class DrawAnalytics:
+    """Accumulates the analytics of a generation one batch of draws at a time
+
+    Memory is bounded by the batch size plus a 44 x 44 x 44 triple matrix and
+    the last max(windows) draws, so it can be fed while a file is streamed.
+    """
+
+    def __init__(self, windows=None):
+        self.windows = tuple(windows or _settings['windows'])
+        self.total = 0
+        self.pairs = np.zeros((MAIN_NUMBERS + 1, MAIN_NUMBERS + 1), dtype=np.int64)
+        self.triples = np.zeros((MAIN_NUMBERS + 1,) * 3, dtype=np.int64)
+        self.last_main = np.full(MAIN_NUMBERS + 1, -1, dtype=np.int64)
+        self.last_bonus = np.full(BONUS_NUMBERS + 1, -1, dtype=np.int64)
+        self.tail = np.empty((0, 5), dtype=np.int64)
+
+    def add(self, draws):
+        """Add an N x 6 batch of draws (5 main balls + bonus), oldest first"""
+        draws = np.asarray(draws, dtype=np.int64).reshape(-1, 6)
+        rows = len(draws)
+        if rows == 0:
+            return
+        main = draws[:, :5]
+        index = np.arange(self.total, self.total + rows)
+
+        # One-hot: X[n, k] = 1 si el número k salió en el sorteo n (float32 usa BLAS)
+        onehot = np.zeros((rows, MAIN_NUMBERS + 1), dtype=np.float32)
+        onehot[np.arange(rows)[:, None], main] = 1
+        self.pairs += np.rint(onehot.T @ onehot).astype(np.int64)
+        # Tríos: para cada número k, pares entre los sorteos donde salió k
+        for number in np.unique(main):
+            subset = onehot[onehot[:, number] == 1]
+            self.triples[number] += np.rint(subset.T @ subset).astype(np.int64)
+
+        np.maximum.at(self.last_main, main.ravel(), np.repeat(index, 5))
+        np.maximum.at(self.last_bonus, draws[:, 5], index)
+        if self.windows:
+            self.tail = np.vstack([self.tail, main])[-max(self.windows):]
+        self.total += rows
+
+    def add_generation(self, conn, generation, chunk_size=READ_CHUNK_SIZE):
+        """Feed every draw already stored under ``generation``"""
+        c = execute_query(
+            conn,
+            '''SELECT balota1, balota2, balota3, balota4, balota5, balota6
+               FROM historical_data WHERE generation = ? ORDER BY id''',
+            (generation,)
+        )
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                break
+            self.add(np.array([tuple(row) for row in rows], dtype=np.int64))
+
+    def pair_rows(self):
+        a, b = np.nonzero(np.triu(self.pairs, 1))
+        return list(zip(a.tolist(), b.tolist(), self.pairs[a, b].tolist()))
+
+    def triple_rows(self):
+        a, b, c = np.nonzero(self.triples)
+        ordered = (a < b) & (b < c)
+        a, b, c = a[ordered], b[ordered], c[ordered]
+        return list(zip(a.tolist(), b.tolist(), c.tolist(), self.triples[a, b, c].tolist()))
+
+    def gap_rows(self):
+        rows = []
+        for kind, last in (('main', self.last_main), ('bonus', self.last_bonus)):
+            for number in range(1, len(last)):
+                # NULL = el número nunca salió
+                gap = int(self.total - 1 - last[number]) if last[number] >= 0 else None
+                rows.append((kind, number, gap))
+        return rows
+
+    def window_rows(self):
+        rows = []
+        for window in self.windows:
+            counts = np.bincount(self.tail[-window:].ravel(), minlength=MAIN_NUMBERS + 1)
+            rows.extend((window, number, int(counts[number])) for number in range(1, MAIN_NUMBERS + 1))
+        return rows
+
+
+def save_analytics(conn, generation, analytics):
+    """Replace the stored analytics of ``generation`` (caller commits)"""
+    generation = int(generation)
+    for table in ANALYTICS_TABLES:
+        execute_query(conn, f'DELETE FROM {table} WHERE generation = ?', (generation,))
+    tables = [
+        ('number_pairs (generation, number_a, number_b, count) VALUES (?, ?, ?, ?)',
+         analytics.pair_rows()),
+        ('number_triples (generation, number_a, number_b, number_c, count) VALUES (?, ?, ?, ?, ?)',
+         analytics.triple_rows()),
+        ('number_gaps (generation, kind, number, gap) VALUES (?, ?, ?, ?)',
+         analytics.gap_rows()),
+        ('number_windows (generation, window_size, number, count) VALUES (?, ?, ?, ?)',
+         analytics.window_rows()),
+    ]
+    for insert, rows in tables:
+        if rows:
+            execute_many(conn, f'INSERT INTO {insert}', [(generation, *row) for row in rows])
+
+
+def rebuild_analytics(conn, generation):
+    """Recompute the analytics of a stored generation (caller commits)"""
+    analytics = DrawAnalytics()
+    analytics.add_generation(conn, generation)
+    save_analytics(conn, generation, analytics)
+    return analytics
+
+
+def ensure_analytics(conn):
+    """Build the active generation's analytics if missing but draws exist
+
+    Also rebuilds when ANALYTICS_WINDOWS changed since they were computed.
+    """
+    generation = read_generation(conn)
+    c = execute_query(conn, 'SELECT DISTINCT window_size FROM number_windows WHERE generation = ?', (generation,))
+    stored = tuple(sorted(row[0] for row in c.fetchall()))
+    if stored and stored == _settings['windows']:
+        return
+    c = execute_query(conn, 'SELECT 1 FROM historical_data WHERE generation = ? LIMIT 1', (generation,))
+    if c.fetchone() is None:
+        return
+    rebuild_analytics(conn, generation)
+    conn.commit()
+
+
+# Lecturas (siempre de la generación activa, cacheadas hasta la próxima carga)
+
+def _top_pairs(conn):
+    c = execute_query(
+        conn,
+        f'''SELECT number_a, number_b, count FROM number_pairs
+            WHERE generation = {ACTIVE_GENERATION_SQL}
+            ORDER BY count DESC, number_a, number_b LIMIT ?''',
+        (_settings['max_limit'],)
+    )
+    return [((row[0], row[1]), row[2]) for row in c.fetchall()]
+
+
+def _top_triples(conn):
+    c = execute_query(
+        conn,
+        f'''SELECT number_a, number_b, number_c, count FROM number_triples
+            WHERE generation = {ACTIVE_GENERATION_SQL}
+            ORDER BY count DESC, number_a, number_b, number_c LIMIT ?''',
+        (_settings['max_limit'],)
+    )
+    return [((row[0], row[1], row[2]), row[3]) for row in c.fetchall()]
+
+
+def read_gaps(conn):
+    """Gaps of the active generation straight from the table (not cached)"""
+    c = execute_query(
+        conn,
+        f'''SELECT kind, number, gap FROM number_gaps
+            WHERE generation = {ACTIVE_GENERATION_SQL} ORDER BY kind, number'''
+    )
+    gaps = {'main': [], 'bonus': []}
+    for row in c.fetchall():
+        gaps[row[0]].append((row[1], row[2]))
+    return gaps
+
+
+def read_pair_matrix(conn):
+    """Every pair count of the active generation as a symmetric 44 x 44 matrix"""
+    pairs = np.zeros((MAIN_NUMBERS + 1, MAIN_NUMBERS + 1), dtype=np.int64)
+    c = execute_query(
+        conn,
+        f'''SELECT number_a, number_b, count FROM number_pairs
+            WHERE generation = {ACTIVE_GENERATION_SQL}'''
+    )
+    for row in c.fetchall():
+        pairs[row[0], row[1]] = pairs[row[1], row[0]] = row[2]
+    return pairs
+
+
+def _window_counts(conn, window):
+    c = execute_query(
+        conn,
+        f'''SELECT number, count FROM number_windows
+            WHERE generation = {ACTIVE_GENERATION_SQL} AND window_size = ?
+            ORDER BY number''',
+        (window,)
+    )
+    return [(row[0], row[1]) for row in c.fetchall()]
+
+
+def top_pairs(limit):
+    """Most frequent main-ball pairs as [((a, b), count), ...]"""
+    return stats_cache.get_or_compute('pairs', _top_pairs)[:limit]
+
+
+def top_triples(limit):
+    """Most frequent main-ball triples as [((a, b, c), count), ...]"""
+    return stats_cache.get_or_compute('triples', _top_triples)[:limit]
+
+
+def number_gaps():
+    """{'main': [(number, gap), ...], 'bonus': [...]}; gap None = never drawn"""
+    return stats_cache.get_or_compute('gaps', read_gaps)
+
+
+def bonus_frequency():
+    """Bonus ball (balota6) counts as [(number, count), ...] for 1-16"""
+    counts = stats_cache.get_or_compute(
+        'bonus', lambda conn: get_position_counts(conn, BONUS_POSITION)
+    )
+    return [(number, counts.get(number, 0)) for number in range(1, BONUS_NUMBERS + 1)]
+
+
+def hot_cold(window, limit):
+    """(hot, cold) main balls of the last ``window`` draws as [(number, count), ...]"""
+    counts = stats_cache.get_or_compute(f'window:{window}', lambda conn: _window_counts(conn, window))
+    hot = sorted(counts, key=lambda item: (-item[1], item[0]))[:limit]
+    cold = sorted(counts, key=lambda item: (item[1], item[0]))[:limit]
+    return hot, cold
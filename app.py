@@ -2,10 +2,20 @@
 Sorteo Lotería Backend API
 Flask application with Blueprint architecture
 """
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
 from config import config
-from database import init_db
+from database import init_db, configure_pool, release_db_connections, pool_metrics
+from analytics import configure_analytics
+from cache import configure_cache, stats_cache
+from compression import configure_compression, compress_response
+from jobs import configure_jobs, ensure_started
+from logs import configure_logging
+from metrics import (configure_metrics, metrics_enabled, start_request, finish_request,
+                     server_timing, render_metrics)
+from passwords import configure_passwords
+from strategies import configure_strategies
+from tokens import configure_tokens, token_cache
 from routes import auth_bp, lottery_bp, upload_bp
 import os
 
@@ -16,6 +26,8 @@ def create_app(config_name='development'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+    configure_logging(app.config)
+    configure_metrics(app.config)
     
     # Initialize CORS
     CORS(app, resources={
@@ -24,10 +36,41 @@ def create_app(config_name='development'):
         }
     })
     
+    # Initialize database connection pool
+    configure_pool(app.config)
+    app.teardown_appcontext(release_db_connections)
+    configure_cache(app.config)
+    configure_analytics(app.config)
+    configure_strategies(app.config)
+    configure_compression(app.config)
+    configure_jobs(app.config)
+    configure_passwords(app.config)
+    configure_tokens(app.config)
+    
     # Initialize database
     with app.app_context():
         init_db()
     
+    # Latencia y tiempo en base de datos por endpoint (registrado primero:
+    # before_request corre antes que los demás y after_request al final)
+    if metrics_enabled():
+        @app.before_request
+        def start_timing():
+            g.request_started = start_request()
+        
+        @app.after_request
+        def record_timing(response):
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            timing = finish_request(g.request_started, request.method, endpoint, response.status_code)
+            response.headers['Server-Timing'] = server_timing(*timing)
+            return response
+    
+    # Reanudar cargas pendientes una vez por worker (después del fork)
+    app.before_request(ensure_started)
+    
+    # gzip/brotli para respuestas JSON grandes
+    app.after_request(compress_response)
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(lottery_bp)
@@ -42,6 +85,14 @@ def create_app(config_name='development'):
             'message': 'Sorteo Lotería API is running'
         }), 200
     
+    # Metrics endpoint (Prometheus text format)
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Expose request, pool and cache metrics for scraping"""
+        body = (render_metrics() + render_pool_metrics() + render_cache_metrics()
+                + render_token_metrics())
+        return Response(body, mimetype='text/plain; version=0.0.4')
+    
     # Root endpoint
     @app.route('/', methods=['GET'])
     def root():
@@ -52,16 +103,26 @@ def create_app(config_name='development'):
             'endpoints': {
                 'auth': [
                     'POST /api/register',
-                    'POST /api/login'
+                    'POST /api/login',
+                    'POST /api/refresh'
                 ],
                 'lottery': [
                     'GET /api/sorteo',
+                    'POST /api/sorteo/batch',
                     'POST /api/save_sorteo',
                     'GET /api/history/<user_id>',
-                    'GET /api/statistics'
+                    'PUT /api/sorteos',
+                    'DELETE /api/sorteos',
+                    'GET /api/statistics',
+                    'GET /api/statistics/pairs',
+                    'GET /api/statistics/triples',
+                    'GET /api/statistics/gaps',
+                    'GET /api/statistics/hot_cold',
+                    'GET /api/statistics/bonus'
                 ],
                 'upload': [
-                    'POST /api/upload'
+                    'POST /api/upload',
+                    'GET /api/upload/<job_id>'
                 ]
             }
         }), 200
@@ -69,6 +130,74 @@ def create_app(config_name='development'):
     return app
 
 
+POOL_METRICS = [
+    ('db_pool_size', 'size', 'gauge', 'Open connections owned by the pool'),
+    ('db_pool_in_use', 'in_use', 'gauge', 'Connections currently checked out'),
+    ('db_pool_idle', 'idle', 'gauge', 'Connections waiting in the pool'),
+    ('db_pool_max_size', 'max_size', 'gauge', 'Maximum connections allowed'),
+    ('db_pool_checkouts_total', 'checkouts', 'counter', 'Total connection checkouts'),
+    ('db_pool_waits_total', 'waits', 'counter', 'Checkouts that had to wait for a free connection'),
+    ('db_pool_wait_seconds_total', 'wait_seconds', 'counter', 'Total time spent waiting for a connection'),
+    ('db_pool_timeouts_total', 'timeouts', 'counter', 'Checkouts that gave up after the timeout'),
+    ('db_pool_created_total', 'created', 'counter', 'Physical connections opened'),
+    ('db_pool_recycled_total', 'recycled', 'counter', 'Connections closed for exceeding max uses/age'),
+    ('db_pool_failed_pings_total', 'failed_pings', 'counter', 'Connections discarded by the health check'),
+]
+
+
+def render_pool_metrics():
+    """Render pool metrics of this worker in Prometheus text format"""
+    snapshots = pool_metrics()
+    pid = os.getpid()
+    lines = []
+    for name, key, kind, help_text in POOL_METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for pool_key, snapshot in snapshots.items():
+            backend = 'postgresql' if pool_key.startswith('postgres') else 'sqlite'
+            lines.append(f'{name}{{backend="{backend}",pool="{snapshot["name"]}",pid="{pid}"}} {snapshot[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+CACHE_METRICS = [
+    ('stats_cache_hits_total', 'hits', 'counter', 'Statistics cache hits'),
+    ('stats_cache_misses_total', 'misses', 'counter', 'Statistics cache misses'),
+    ('stats_cache_entries', 'entries', 'gauge', 'Entries currently cached'),
+    ('stats_cache_generation', 'generation', 'gauge', 'historical_data generation seen by this worker'),
+]
+
+
+def render_cache_metrics():
+    """Render statistics cache metrics of this worker in Prometheus text format"""
+    snapshot = stats_cache.metrics()
+    pid = os.getpid()
+    lines = []
+    for name, key, kind, help_text in CACHE_METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name}{{pid="{pid}"}} {snapshot[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+TOKEN_METRICS = [
+    ('token_cache_hits_total', 'hits', 'counter', 'Tokens accepted without recomputing the HMAC'),
+    ('token_cache_misses_total', 'misses', 'counter', 'Tokens whose signature had to be verified'),
+    ('token_cache_entries', 'entries', 'gauge', 'Verified tokens remembered by this worker'),
+]
+
+
+def render_token_metrics():
+    """Render verified-token cache metrics of this worker in Prometheus text format"""
+    snapshot = token_cache.metrics()
+    pid = os.getpid()
+    lines = []
+    for name, key, kind, help_text in TOKEN_METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name}{{pid="{pid}"}} {snapshot[key]}')
+    return '\n'.join(lines) + '\n'
+
+
 if __name__ == '__main__':
     # Get environment and create app
     env = os.environ.get('FLASK_ENV', 'development')
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Script to create the ASGI application instance for Uvicorn/Hypercorn
+Usage: uvicorn asgi:app --workers 2
+"""
+from async_app import create_app
+import os
+
+# Create app instance
+env = os.environ.get('FLASK_ENV', 'production')
+app = create_app(env)
+
+if __name__ == '__main__':
+    # This is only used when running directly (not with uvicorn)
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 8080))
+    uvicorn.run(app, host='0.0.0.0', port=port)
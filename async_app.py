@@ -0,0 +1,143 @@
+"""
+Sorteo Lotería Backend API (ASGI)
+Same endpoints as app.py served by async views on Quart; database access
+goes through async_database (asyncpg / aiosqlite) instead of the sync pool
+"""
+import asyncio
+
+from quart import Quart, Response, jsonify, request, g
+from quart.wrappers.response import DataBody
+from quart_cors import cors
+from config import config
+from database import init_db, configure_pool
+from async_database import async_db
+from analytics import configure_analytics
+from cache import configure_cache
+from compression import configure_compression, compression_enabled, is_compressible, encode_response
+from jobs import configure_jobs, ensure_started
+from logs import configure_logging
+from metrics import (configure_metrics, metrics_enabled, start_request, finish_request,
+                     server_timing, render_metrics)
+from passwords import configure_passwords
+from strategies import configure_strategies
+from tokens import configure_tokens
+from routes_async import auth_bp, lottery_bp, upload_bp
+from app import render_pool_metrics, render_cache_metrics, render_token_metrics
+
+
+def create_app(config_name='development'):
+    """Application factory pattern"""
+    app = Quart(__name__)
+    
+    # Load configuration
+    app.config.from_object(config[config_name])
+    configure_logging(app.config)
+    configure_metrics(app.config)
+    
+    # Initialize CORS
+    app = cors(app, allow_origin=app.config['CORS_ORIGINS'])
+    
+    # El pool síncrono sigue sirviendo a la caché de estadísticas y a los jobs
+    configure_pool(app.config)
+    configure_cache(app.config)
+    configure_analytics(app.config)
+    configure_strategies(app.config)
+    configure_compression(app.config)
+    configure_jobs(app.config)
+    configure_passwords(app.config)
+    configure_tokens(app.config)
+    async_db.configure(app.config)
+    
+    # Initialize database
+    init_db()
+    
+    @app.before_serving
+    async def startup():
+        """Open the async pool and resume pending uploads in this worker"""
+        await async_db.open()
+        await asyncio.to_thread(ensure_started)
+    
+    @app.after_serving
+    async def shutdown():
+        await async_db.close()
+    
+    # Latencia y tiempo en base de datos por endpoint (registrado antes que
+    # compress: los after_request corren en orden inverso)
+    if metrics_enabled():
+        @app.before_request
+        async def start_timing():
+            g.request_started = start_request()
+        
+        @app.after_request
+        async def record_timing(response):
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            timing = finish_request(g.request_started, request.method, endpoint, response.status_code)
+            response.headers['Server-Timing'] = server_timing(*timing)
+            return response
+    
+    @app.after_request
+    async def compress(response):
+        """gzip/brotli para respuestas JSON grandes (no toca las de streaming)"""
+        if not compression_enabled() or not is_compressible(response) \
+                or not isinstance(response.response, DataBody):
+            return response
+        return encode_response(response, await response.get_data(), request.accept_encodings)
+    
+    # Register blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(lottery_bp)
+    app.register_blueprint(upload_bp)
+    
+    # Health check endpoint
+    @app.route('/health', methods=['GET'])
+    async def health_check():
+        """Health check endpoint"""
+        return jsonify({
+            'status': 'healthy',
+            'message': 'Sorteo Lotería API is running'
+        }), 200
+    
+    # Metrics endpoint (Prometheus text format)
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        """Expose request, pool and cache metrics for scraping"""
+        body = (render_metrics() + render_pool_metrics() + render_cache_metrics()
+                + render_token_metrics())
+        return Response(body, mimetype='text/plain; version=0.0.4')
+    
+    # Root endpoint
+    @app.route('/', methods=['GET'])
+    async def root():
+        """Root endpoint with API information"""
+        return jsonify({
+            'name': 'Sorteo Lotería API',
+            'version': '1.0.0',
+            'mode': 'asgi',
+            'endpoints': {
+                'auth': [
+                    'POST /api/register',
+                    'POST /api/login',
+                    'POST /api/refresh'
+                ],
+                'lottery': [
+                    'GET /api/sorteo',
+                    'POST /api/sorteo/batch',
+                    'POST /api/save_sorteo',
+                    'GET /api/history/<user_id>',
+                    'PUT /api/sorteos',
+                    'DELETE /api/sorteos',
+                    'GET /api/statistics',
+                    'GET /api/statistics/pairs',
+                    'GET /api/statistics/triples',
+                    'GET /api/statistics/gaps',
+                    'GET /api/statistics/hot_cold',
+                    'GET /api/statistics/bonus'
+                ],
+                'upload': [
+                    'POST /api/upload',
+                    'GET /api/upload/<job_id>'
+                ]
+            }
+        }), 200
+    
+    return app
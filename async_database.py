@@ -0,0 +1,173 @@
+"""
+Async database access for the ASGI serving mode
+Same SQL as database.py ('?' placeholders), executed with asyncpg on
+PostgreSQL or aiosqlite on SQLite from a per-worker pool of connections
+
+Limitation: this pool only connects to the primary. DATABASE_READ_URLS
+(read replicas) and the SQLite read-only pool are used by
+database.get_read_connection(), which serves the sync views and, in this
+mode, the statistics cache (run in a thread); the async history view reads
+from the primary.
+"""
+import asyncio
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from database import _database_url, _sqlite_path, is_postgres, sqlite_pragmas, to_numbered_placeholders
+from metrics import record_query
+
+
+def _timed(method):
+    """Account the query in the request's DB time (see metrics.record_query)"""
+    @wraps(method)
+    async def wrapper(self, query, params=()):
+        start = time.perf_counter()
+        try:
+            return await method(self, query, params)
+        finally:
+            record_query(time.perf_counter() - start)
+    return wrapper
+
+
+class _PostgresConnection:
+    """asyncpg connection with the '?' placeholder API used by the routes
+
+    asyncpg prepares and caches every statement per connection, so the hot
+    queries skip parsing/planning here without any extra bookkeeping.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @_timed
+    async def fetchall(self, query, params=()):
+        return await self._conn.fetch(to_numbered_placeholders(query), *params)
+
+    @_timed
+    async def fetchone(self, query, params=()):
+        return await self._conn.fetchrow(to_numbered_placeholders(query), *params)
+
+    @_timed
+    async def execute(self, query, params=()):
+        """Run a statement and return the number of affected rows"""
+        status = await self._conn.execute(to_numbered_placeholders(query), *params)
+        count = status.rsplit(' ', 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._conn.transaction():
+            yield self
+
+
+class _SqliteConnection:
+    """aiosqlite connection in autocommit mode; transaction() wraps BEGIN/COMMIT"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @_timed
+    async def fetchall(self, query, params=()):
+        async with self._conn.execute(query, params) as cursor:
+            return await cursor.fetchall()
+
+    @_timed
+    async def fetchone(self, query, params=()):
+        async with self._conn.execute(query, params) as cursor:
+            return await cursor.fetchone()
+
+    @_timed
+    async def execute(self, query, params=()):
+        async with self._conn.execute(query, params) as cursor:
+            return cursor.rowcount
+
+    @asynccontextmanager
+    async def transaction(self):
+        await self._conn.execute('BEGIN')
+        try:
+            yield self
+        except BaseException:
+            await self._conn.execute('ROLLBACK')
+            raise
+        await self._conn.execute('COMMIT')
+
+
+class AsyncDatabase:
+    """Pool of async connections for one event loop (one per ASGI worker)"""
+
+    def __init__(self):
+        self.min_size = 1
+        self.max_size = 5
+        self.timeout = 10.0
+        self._pg_pool = None
+        self._sqlite_idle = None
+        self._sqlite_all = []
+        self._sqlite_slots = None
+
+    def configure(self, app_config):
+        """Pool sizes come from the same DB_POOL_* keys as the sync pool"""
+        self.min_size = app_config.get('DB_POOL_MIN_SIZE', self.min_size)
+        self.max_size = app_config.get('DB_POOL_MAX_SIZE', self.max_size)
+        self.timeout = app_config.get('DB_POOL_TIMEOUT', self.timeout)
+
+    async def open(self):
+        if is_postgres():
+            import asyncpg
+
+            self._pg_pool = await asyncpg.create_pool(
+                _database_url(),
+                min_size=self.min_size,
+                max_size=self.max_size,
+                timeout=self.timeout
+            )
+        else:
+            self._sqlite_idle = asyncio.LifoQueue()
+            self._sqlite_slots = asyncio.Semaphore(self.max_size)
+
+    async def close(self):
+        if self._pg_pool is not None:
+            await self._pg_pool.close()
+            self._pg_pool = None
+        for conn in self._sqlite_all:
+            await conn.close()
+        self._sqlite_all = []
+        self._sqlite_idle = None
+
+    async def _open_sqlite(self):
+        import aiosqlite
+
+        conn = await aiosqlite.connect(_sqlite_path(), isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in sqlite_pragmas():
+            await conn.execute(pragma)
+        self._sqlite_all.append(conn)
+        return conn
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection for the duration of the ``async with`` block"""
+        if self._pg_pool is not None:
+            async with self._pg_pool.acquire(timeout=self.timeout) as conn:
+                yield _PostgresConnection(conn)
+            return
+
+        await asyncio.wait_for(self._sqlite_slots.acquire(), self.timeout)
+        try:
+            try:
+                conn = self._sqlite_idle.get_nowait()
+            except asyncio.QueueEmpty:
+                conn = await self._open_sqlite()
+            try:
+                yield _SqliteConnection(conn)
+            finally:
+                if conn.in_transaction:
+                    await conn.rollback()
+                self._sqlite_idle.put_nowait(conn)
+        finally:
+            self._sqlite_slots.release()
+
+
+# Instancia compartida por los blueprints async
+async_db = AsyncDatabase()
@@ -0,0 +1,86 @@
+"""
+Benchmark: análisis precalculados (analytics.py)
+Para cada tamaño de historial mide:
+1) Cálculo con NumPy (DrawAnalytics.add) y escritura de las tablas
+2) Lectura sin caché de las tablas precalculadas (pares, tríos, ausencias,
+   calientes/fríos): no depende del número de sorteos
+3) Lo mismo calculado al vuelo desde historical_data, como referencia
+Uso: python benchmarks/bench_analytics.py [sorteos,sorteos,...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+READ_REPEATS = 50
+
+
+def random_draws(count, seed=0):
+    rng = np.random.default_rng(seed)
+    main = np.argsort(rng.random((count, 43)), axis=1)[:, :5] + 1
+    return np.column_stack([main, rng.integers(1, 17, count)])
+
+
+def timed(fn, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main(sizes):
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_analytics_'), 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    import analytics
+    from app import create_app
+    from database import get_db_connection
+    from generations import allocate_generation, activate_generation, read_generation
+    from ingest import bulk_insert_historical
+
+    create_app('production')
+    conn = get_db_connection()
+
+    def read_tables():
+        analytics._top_pairs(conn)
+        analytics._top_triples(conn)
+        analytics.read_gaps(conn)
+        analytics._window_counts(conn, analytics.analytics_windows()[0])
+
+    def scan():
+        # Alternativa sin tablas: leer todo el historial activo y recalcular
+        fresh = analytics.DrawAnalytics()
+        fresh.add_generation(conn, read_generation(conn))
+        fresh.pair_rows()
+
+    print(f"{'sorteos':>10} | {'cálculo (ms)':>12} | {'guardar (ms)':>12} | "
+          f"{'lectura tablas (ms)':>19} | {'al vuelo (ms)':>13}")
+    print('-' * 79)
+    for size in sizes:
+        draws = random_draws(size)
+        base = read_generation(conn)
+        generation = allocate_generation(conn)
+        bulk_insert_historical(conn, draws, generation)
+        conn.commit()
+
+        result = analytics.DrawAnalytics()
+        compute = timed(lambda: result.add(draws))
+        save = timed(lambda: analytics.save_analytics(conn, generation, result))
+        conn.commit()
+        activate_generation(conn, generation, base)
+
+        read = timed(read_tables, READ_REPEATS)
+        on_the_fly = timed(scan, 1 if size > 100_000 else 3)
+        print(f'{size:>10} | {compute:>12.1f} | {save:>12.1f} | {read:>19.2f} | {on_the_fly:>13.1f}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1].split(',')] if len(sys.argv) > 1 else DEFAULT_SIZES)
@@ -0,0 +1,170 @@
+"""
+Benchmark: modo síncrono (gunicorn + wsgi:app) vs modo ASGI (uvicorn + asgi:app)
+Levanta ambos servidores sobre la misma base, los golpea con N clientes
+concurrentes (keep-alive cuando el servidor lo permite) y reporta req/s y
+latencias p50/p99 de una mezcla de /api/history, /api/sorteo y /api/statistics
+Uso: python benchmarks/bench_asgi.py [clientes ...]
+"""
+import asyncio
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_CLIENTS = [100, 200]
+DURATION = 10  # segundos por medición
+WORKERS = 2
+SAVED_SORTEOS = 500
+HISTORICAL_ROWS = 2_000
+PORTS = {'sync': 8701, 'asgi': 8702}
+
+
+def server_command(mode, port):
+    if mode == 'sync':
+        return ['gunicorn', '--workers', str(WORKERS), '--bind', f'127.0.0.1:{port}', 'wsgi:app']
+    return ['uvicorn', 'asgi:app', '--workers', str(WORKERS), '--host', '127.0.0.1',
+            '--port', str(port), '--no-access-log']
+
+
+def seed(env):
+    """Create the bench user, saved sorteos and historical data; returns (user_id, token)"""
+    os.environ.update(env)
+
+    import pandas as pd
+
+    from app import create_app
+
+    client = create_app('production').test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'bench'})
+    login = client.post('/api/login', json={'username': 'bench', 'password': 'bench'}).get_json()
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {login['access_token']}"
+    sorteos = [random.sample(range(1, 44), 5) + [random.randint(1, 16)] for _ in range(SAVED_SORTEOS)]
+    client.post('/api/save_sorteo', json={'sorteos': sorteos})
+
+    rows = ['-'.join(map(str, random.sample(range(1, 44), 5) + [random.randint(1, 16)]))
+            for _ in range(HISTORICAL_ROWS)]
+    buf = io.BytesIO()
+    pd.DataFrame({'fecha': range(len(rows)), 'resultado': rows}).to_excel(buf, sheet_name='Hoja1', index=False)
+    buf.seek(0)
+    status_url = client.post('/api/upload', data={'file': (buf, 'bench.xlsx')}).get_json()['status_url']
+    while client.get(status_url).get_json()['status'] not in ('succeeded', 'failed'):
+        time.sleep(0.1)
+    return login['user_id'], login['access_token']
+
+
+async def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def request(conn, port, path, token):
+    """One GET over ``conn`` (reader, writer) or a new connection; returns the connection to reuse"""
+    message = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n'.encode()
+    try:
+        if conn is None:
+            raise ConnectionResetError
+        reader, writer = conn
+        writer.write(message)
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (ConnectionError, asyncio.IncompleteReadError):
+        # Conexión nueva, o keep-alive cerrada por el servidor (como haría un cliente HTTP real)
+        conn = await asyncio.open_connection('127.0.0.1', port)
+        reader, writer = conn
+        writer.write(message)
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+    headers = head.decode('latin-1').lower()
+    length = 0
+    for line in headers.split('\r\n'):
+        if line.startswith('content-length:'):
+            length = int(line.split(':', 1)[1])
+    await reader.readexactly(length)
+    if not headers.startswith('http/1.1 200'):
+        raise RuntimeError(headers.split('\r\n', 1)[0])
+    if 'connection: close' in headers:
+        writer.close()
+        return None
+    return conn
+
+
+async def load(port, clients, paths, token):
+    """Run ``clients`` concurrent loops for DURATION seconds; returns latencies and errors"""
+    latencies = []
+    errors = 0
+    stop = time.monotonic() + DURATION
+
+    async def client_loop(index):
+        nonlocal errors
+        conn = None
+        i = index
+        while time.monotonic() < stop:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn = await request(conn, port, path, token)
+            except (OSError, RuntimeError, asyncio.IncompleteReadError):
+                errors += 1
+                conn = None
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client_loop(i) for i in range(clients)))
+    return latencies, errors
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+
+def main(client_counts):
+    tmp = tempfile.mkdtemp(prefix='bench_asgi_')
+    env = {
+        'SQLITE_PATH': os.path.join(tmp, 'bench.db'),
+        'SECRET_KEY': 'bench-secret',
+        'FLASK_ENV': 'production',
+    }
+    os.environ.pop('DATABASE_URL', None)
+    user_id, token = seed(env)
+    paths = [f'/api/history/{user_id}?limit=50', '/api/sorteo', '/api/statistics']
+
+    print(f'Workers: {WORKERS} | núcleos: {os.cpu_count()} | {DURATION}s por medición')
+    print(f"{'modo':>6} | {'clientes':>8} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'errores':>7}")
+    print('-' * 62)
+    for mode, port in PORTS.items():
+        server = subprocess.Popen(
+            server_command(mode, port), cwd=ROOT, env={**os.environ, **env},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            asyncio.run(wait_ready(port))
+            # Calentar cachés y conexiones antes de medir
+            asyncio.run(load(port, 10, paths, token))
+            for clients in client_counts:
+                latencies, errors = asyncio.run(load(port, clients, paths, token))
+                print(f'{mode:>6} | {clients:>8} | {len(latencies) / DURATION:>8.0f} | '
+                      f'{percentile(latencies, 0.5):>9.1f} | {percentile(latencies, 0.99):>9.1f} | {errors:>7}')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    client_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_CLIENTS
+    main(client_counts)
@@ -0,0 +1,80 @@
+"""
+Benchmark: compresión y GET condicional (ETag / 304)
+Para /api/history/<user_id> (página de 500) y /api/statistics/pairs mide
+bytes enviados y µs por petición sin compresión, con gzip, con brotli y
+revalidando con If-None-Match (304)
+Uso: python benchmarks/bench_conditional.py [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_analytics import random_draws
+
+DEFAULT_REPEATS = 500
+SORTEOS = 500
+
+
+def measure(client, url, headers, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        response = client.get(url, headers=headers)
+    elapsed = (time.perf_counter() - start) / repeats * 1e6
+    return response, elapsed
+
+
+def main(repeats):
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_conditional_'), 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    from analytics import rebuild_analytics
+    from app import create_app
+    from database import get_db_connection
+    from frequency import rebuild_frequencies
+    from generations import allocate_generation, activate_generation, read_generation
+    from history import insert_sorteos
+    from ingest import bulk_insert_historical
+
+    client = create_app('production').test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'bench-password'})
+    login = client.post('/api/login', json={'username': 'bench', 'password': 'bench-password'}).get_json()
+    auth = {'Authorization': f"Bearer {login['access_token']}"}
+
+    conn = get_db_connection()
+    draws = random_draws(10_000)
+    insert_sorteos(conn, login['user_id'], draws[:SORTEOS].tolist())
+    base = read_generation(conn)
+    generation = allocate_generation(conn)
+    bulk_insert_historical(conn, draws, generation)
+    rebuild_frequencies(conn, generation)
+    rebuild_analytics(conn, generation)
+    conn.commit()
+    activate_generation(conn, generation, base)
+    conn.close()
+
+    endpoints = [
+        (f"/api/history/{login['user_id']}?limit={SORTEOS}", auth),
+        ('/api/statistics/pairs?limit=100', {}),
+    ]
+    print(f"{'endpoint':>32} | {'modo':>8} | {'bytes':>7} | {'µs/petición':>11}")
+    print('-' * 68)
+    for url, headers in endpoints:
+        etag = client.get(url, headers=headers).headers['ETag']
+        modes = [
+            ('identity', {}),
+            ('gzip', {'Accept-Encoding': 'gzip'}),
+            ('br', {'Accept-Encoding': 'br'}),
+            ('304', {'If-None-Match': etag}),
+        ]
+        for mode, extra in modes:
+            response, elapsed = measure(client, url, {**headers, **extra}, repeats)
+            print(f'{url.split("?")[0]:>32} | {mode:>8} | {len(response.get_data()):>7,} | {elapsed:>11.0f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS)
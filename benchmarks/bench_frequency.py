@@ -0,0 +1,88 @@
+"""
+Benchmark: top-3 frecuentes con escaneo completo vs índice number_frequency
+Uso: python benchmarks/bench_frequency.py [filas ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 20
+
+
+def seed_historical(conn, rows, rng):
+    """Insert ``rows`` synthetic draws into historical_data"""
+    main = np.argsort(rng.random((rows, 43)), axis=1)[:, :5] + 1
+    bonus = rng.integers(1, 17, size=(rows, 1))
+    draws = np.hstack([main, bonus]).tolist()
+    conn.executemany(
+        '''INSERT INTO historical_data
+           (balota1, balota2, balota3, balota4, balota5, balota6)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        draws
+    )
+    conn.commit()
+
+
+def top_3_full_scan(conn):
+    """Implementación anterior: 5 SELECT completos + Counter en Python"""
+    numbers = []
+    for i in range(1, 6):
+        c = conn.execute(f'SELECT balota{i} FROM historical_data')
+        numbers.extend([row[0] for row in c.fetchall()])
+    return [num for num, _ in Counter(numbers).most_common(3)]
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def main(sizes):
+    tmp = tempfile.mkdtemp(prefix='bench_freq_')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+
+    import database
+    from frequency import rebuild_frequencies, get_top_frequent
+
+    database.init_db()
+    rng = np.random.default_rng(42)
+    loaded = 0
+
+    print(f"{'filas':>10} | {'escaneo (ms)':>12} | {'índice (ms)':>11} | {'rebuild (ms)':>12}")
+    print('-' * 56)
+    for size in sorted(sizes):
+        conn = database.get_db_connection()
+        seed_historical(conn.raw, size - loaded, rng)
+        loaded = size
+
+        start = time.perf_counter()
+        rebuild_frequencies(conn, 0)
+        conn.commit()
+        rebuild_ms = (time.perf_counter() - start) * 1000
+
+        scan_repeats = max(1, REPEATS // (size // 100_000 + 1))
+        scan_ms = timed(lambda: top_3_full_scan(conn.raw), scan_repeats)
+        index_ms = timed(lambda: get_top_frequent(conn, 3), REPEATS)
+        conn.close()
+
+        print(f'{size:>10} | {scan_ms:>12.2f} | {index_ms:>11.3f} | {rebuild_ms:>12.1f}')
+
+    database.close_pools()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,79 @@
+"""
+Benchmark: modelos de worker de gunicorn.conf.py
+Para cada combinación (worker class, workers, threads, preload) mide el
+tiempo hasta que el servidor responde /health y req/s + p50/p99 con N
+clientes concurrentes sobre la misma mezcla de bench_asgi.py
+Uso: python benchmarks/bench_gunicorn.py [clientes]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_asgi import ROOT, DURATION, seed, load, percentile
+
+PORT = 8703
+DEFAULT_CLIENTS = 100
+
+# Procfile anterior (2 workers sync, sin preload) y variantes de gunicorn.conf.py
+VARIANTS = [
+    ('sync x2 (anterior)', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '2', 'GUNICORN_PRELOAD': 'false'}),
+    ('sync x2 + preload', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '2', 'GUNICORN_PRELOAD': 'true'}),
+    ('gthread x2 t4', {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_WORKERS': '2', 'GUNICORN_PRELOAD': 'false'}),
+    ('gthread auto + preload', {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_WORKERS': '0', 'GUNICORN_THREADS': '4'}),
+]
+
+
+async def time_to_ready(timeout=60):
+    """Seconds until /health answers 200"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+            writer.write(b'GET /health HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            status = await reader.readline()
+            writer.close()
+            if b' 200 ' in status:
+                return time.perf_counter() - start
+        except OSError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError('server did not start')
+
+
+def main(clients):
+    tmp = tempfile.mkdtemp(prefix='bench_gunicorn_')
+    env = {
+        'SQLITE_PATH': os.path.join(tmp, 'bench.db'),
+        'SECRET_KEY': 'bench-secret',
+        'FLASK_ENV': 'production',
+        'PORT': str(PORT),
+    }
+    os.environ.pop('DATABASE_URL', None)
+    user_id, token = seed(env)
+    paths = [f'/api/history/{user_id}?limit=50', '/api/sorteo', '/api/statistics']
+
+    print(f'Núcleos: {os.cpu_count()} | {clients} clientes | {DURATION}s por medición')
+    print(f"{'modelo':>24} | {'arranque (s)':>12} | {'req/s':>7} | {'p50 (ms)':>8} | {'p99 (ms)':>8} | {'errores':>7}")
+    print('-' * 83)
+    for name, variant in VARIANTS:
+        server = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null', 'wsgi:app'],
+            cwd=ROOT, env={**os.environ, **env, **variant},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            startup = asyncio.run(time_to_ready())
+            latencies, errors = asyncio.run(load(PORT, clients, paths, token))
+            print(f'{name:>24} | {startup:>12.2f} | {len(latencies) / DURATION:>7.0f} | '
+                  f'{percentile(latencies, 0.5):>8.1f} | {percentile(latencies, 0.99):>8.1f} | {errors:>7}')
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CLIENTS)
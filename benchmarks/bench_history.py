@@ -0,0 +1,121 @@
+"""
+Benchmark: historial completo vs páginas por cursor (keyset) en /api/history
+Mide la primera página, una página a mitad del historial y la última para
+un usuario con N sorteos guardados
+Uso: python benchmarks/bench_history.py [sorteos ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+PAGE_SIZE = 50
+REPEATS = 20
+USER_ID = 1
+
+
+def seed_sorteos(conn, user_id, rows, start, rng):
+    """Insert ``rows`` sorteos for one user, one second apart"""
+    main = np.argsort(rng.random((rows, 43)), axis=1)[:, :5] + 1
+    bonus = rng.integers(1, 17, size=(rows, 1))
+    stamps = (np.datetime64('2020-01-01T00:00:00') + np.arange(start, start + rows).astype('timedelta64[s]'))
+    created = np.datetime_as_string(stamps).tolist()
+    conn.executemany(
+        '''INSERT INTO sorteos
+           (user_id, balota1, balota2, balota3, balota4, balota5, balota6, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        [(user_id, *n, t.replace('T', ' '))
+         for n, t in zip(np.hstack([main, bonus]).tolist(), created)]
+    )
+    conn.execute(
+        '''INSERT INTO user_sorteo_counts (user_id, count) VALUES (?, ?)
+           ON CONFLICT (user_id) DO UPDATE SET count = count + excluded.count''',
+        (user_id, rows)
+    )
+    conn.commit()
+
+
+def full_history(conn, user_id):
+    """Implementación anterior: todo el historial sin LIMIT"""
+    c = conn.execute(
+        '''SELECT id, balota1, balota2, balota3, balota4, balota5, balota6, created_at
+           FROM sorteos WHERE user_id = ? ORDER BY created_at DESC''',
+        (user_id,)
+    )
+    return [list(row[1:7]) for row in c.fetchall()]
+
+
+def cursor_at(conn, user_id, offset):
+    """Cursor that starts a page ``offset`` rows into the history"""
+    from history import encode_cursor
+
+    if offset == 0:
+        return None
+    row = conn.execute(
+        '''SELECT created_at, id FROM sorteos WHERE user_id = ?
+           ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?''',
+        (user_id, offset - 1)
+    ).fetchone()
+    return encode_cursor(row[0], row[1])
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def main(sizes):
+    tmp = tempfile.mkdtemp(prefix='bench_history_')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+
+    import database
+    from history import fetch_history_page, get_sorteo_count
+
+    database.init_db()
+    rng = np.random.default_rng(3)
+    conn = database.get_db_connection()
+    # Otro usuario con sorteos intercalados, para que el índice tenga que filtrar
+    seed_sorteos(conn.raw, USER_ID + 1, 50_000, 0, rng)
+    conn.close()
+    loaded = 0
+
+    print(f"{'sorteos':>10} | {'completo (ms)':>13} | {'COUNT(*) (ms)':>13} | "
+          f"{'pág. 1 (ms)':>11} | {'pág. media (ms)':>15} | {'última (ms)':>11} | {'total (ms)':>10}")
+    print('-' * 101)
+    for size in sorted(sizes):
+        conn = database.get_db_connection()
+        seed_sorteos(conn.raw, USER_ID, size - loaded, loaded, rng)
+        loaded = size
+
+        full_repeats = max(1, REPEATS // (size // 50_000 + 1))
+        full_ms = timed(lambda: full_history(conn.raw, USER_ID), full_repeats)
+        count_ms = timed(lambda: conn.raw.execute(
+            'SELECT COUNT(*) FROM sorteos WHERE user_id = ?', (USER_ID,)).fetchone(), full_repeats)
+
+        pages = []
+        for offset in (0, size // 2, size - PAGE_SIZE):
+            before = cursor_at(conn.raw, USER_ID, offset)
+            pages.append(timed(lambda: fetch_history_page(conn, USER_ID, PAGE_SIZE, before), REPEATS))
+        total_ms = timed(lambda: get_sorteo_count(conn, USER_ID), REPEATS)
+        conn.close()
+
+        print(f'{size:>10} | {full_ms:>13.1f} | {count_ms:>13.2f} | '
+              f'{pages[0]:>11.3f} | {pages[1]:>15.3f} | {pages[2]:>11.3f} | {total_ms:>10.3f}')
+
+    database.close_pools()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
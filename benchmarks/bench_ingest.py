@@ -0,0 +1,85 @@
+"""
+Benchmark: carga de historical_data fila por fila vs carga masiva
+Uso: python benchmarks/bench_ingest.py [filas ...]
+Usa SQLite temporal salvo que DATABASE_URL apunte a PostgreSQL
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def synthetic_draws(rows, rng):
+    """N x 6 int array with 5 distinct balls (1-43) and a bonus ball (1-16)"""
+    main = np.argsort(rng.random((rows, 43)), axis=1)[:, :5] + 1
+    bonus = rng.integers(1, 17, size=(rows, 1))
+    return np.hstack([main, bonus])
+
+
+def load_row_by_row(conn, draws, execute_query):
+    """Implementación anterior: un execute_query por fila"""
+    for row in draws:
+        execute_query(
+            conn,
+            '''INSERT INTO historical_data 
+               (balota1, balota2, balota3, balota4, balota5, balota6) 
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (int(row[0]), int(row[1]), int(row[2]),
+             int(row[3]), int(row[4]), int(row[5]))
+        )
+
+
+def timed_load(database, loader, draws):
+    conn = database.get_db_connection()
+    database.execute_query(conn, 'DELETE FROM historical_data')
+    conn.commit()
+    start = time.perf_counter()
+    loader(conn, draws)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return len(draws) / elapsed
+
+
+def main(sizes):
+    if not (os.getenv('DATABASE_URL') or '').startswith('postgres'):
+        tmp = tempfile.mkdtemp(prefix='bench_ingest_')
+        os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+
+    import database
+    from ingest import bulk_insert_historical
+
+    database.init_db()
+    rng = np.random.default_rng(7)
+    backend = 'PostgreSQL' if database.is_postgres() else 'SQLite'
+
+    print(f'Backend: {backend}')
+    print(f"{'filas':>10} | {'fila a fila (filas/s)':>22} | {'masiva (filas/s)':>17} | {'speedup':>7}")
+    print('-' * 66)
+    for size in sizes:
+        draws = synthetic_draws(size, rng)
+        loop_rate = timed_load(
+            database,
+            lambda conn, d: load_row_by_row(conn, d, database.execute_query),
+            draws
+        )
+        bulk_rate = timed_load(database, bulk_insert_historical, draws)
+        print(f'{size:>10} | {loop_rate:>22,.0f} | {bulk_rate:>17,.0f} | {bulk_rate / loop_rate:>6.1f}x')
+
+    conn = database.get_db_connection()
+    database.execute_query(conn, 'DELETE FROM historical_data')
+    conn.commit()
+    conn.close()
+    database.close_pools()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,90 @@
+"""
+Benchmark: logins concurrentes con hash en el hilo de la petición vs pool de procesos
+Mide logins/s con N hilos y la latencia de GET /api/sorteo mientras dura la ráfaga
+Uso: python benchmarks/bench_login.py [hilos ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_THREADS = [1, 4, 8]
+LOGINS_PER_THREAD = 25
+USERS = 8
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+
+def run_burst(app, threads):
+    """Return (logins/s, sorteo p50 ms, sorteo p95 ms) for one burst"""
+    done = threading.Event()
+    latencies = []
+
+    def login_worker(index):
+        client = app.test_client()
+        username = f'bench{index % USERS}'
+        for _ in range(LOGINS_PER_THREAD):
+            client.post('/api/login', json={'username': username, 'password': 'bench-password'})
+
+    def sorteo_worker():
+        client = app.test_client()
+        with contextlib.redirect_stdout(io.StringIO()):
+            while not done.is_set():
+                start = time.perf_counter()
+                client.get('/api/sorteo')
+                latencies.append(time.perf_counter() - start)
+
+    prober = threading.Thread(target=sorteo_worker)
+    workers = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+    prober.start()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    return threads * LOGINS_PER_THREAD / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+def main(thread_counts):
+    tmp = tempfile.mkdtemp(prefix='bench_login_')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    import passwords
+    from app import create_app
+
+    app = create_app('production')
+    client = app.test_client()
+    for i in range(USERS):
+        client.post('/api/register', json={'username': f'bench{i}', 'password': 'bench-password'})
+
+    cores = os.cpu_count() or 1
+    print(f'Hash: {passwords.hash_method()} | núcleos: {cores}')
+    print(f"{'modo':>14} | {'hilos':>5} | {'logins/s':>9} | {'sorteo p50 (ms)':>15} | {'sorteo p95 (ms)':>15}")
+    print('-' * 72)
+    for mode, workers in (('en el hilo', 0), (f'pool ({cores})', cores)):
+        passwords.configure_passwords({**app.config, 'PASSWORD_HASH_WORKERS': workers})
+        # Arrancar los procesos del pool fuera de la medición
+        run_burst(app, 1)
+        for threads in thread_counts:
+            logins, p50, p95 = run_burst(app, threads)
+            print(f'{mode:>14} | {threads:>5} | {logins:>9.1f} | {p50:>15.2f} | {p95:>15.2f}')
+    passwords.shutdown()
+
+
+if __name__ == '__main__':
+    thread_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_THREADS
+    main(thread_counts)
@@ -0,0 +1,62 @@
+"""
+Benchmark: parseo de 'resultado' con apply por fila vs parseo vectorizado
+Uso: python benchmarks/bench_parse.py [filas ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ingest import parse_resultados  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def synthetic_resultados(rows, rng):
+    """Series of 'n1-n2-n3-n4-n5-n6' strings like the Excel 'resultado' column"""
+    main = np.argsort(rng.random((rows, 43)), axis=1)[:, :5] + 1
+    bonus = rng.integers(1, 17, size=(rows, 1))
+    draws = np.hstack([main, bonus]).astype(str).tolist()
+    return pd.Series(['-'.join(draw) for draw in draws], dtype=object)
+
+
+def parse_with_apply(resultados):
+    """Implementación anterior de load_historical_data"""
+    def parse_resultado(resultado):
+        numbers = [int(num.strip()) for num in str(resultado).split('-')]
+        if len(numbers) != 6:
+            raise ValueError(f"Formato inválido: se esperan 6 números, se encontraron {len(numbers)}")
+        if not all(1 <= num <= 43 for num in numbers[:5]):
+            raise ValueError("Los primeros 5 números deben estar entre 1 y 43")
+        if not 1 <= numbers[5] <= 16:
+            raise ValueError("El sexto número debe estar entre 1 y 16")
+        return numbers
+
+    balotas = resultados.apply(parse_resultado)
+    return pd.DataFrame(balotas.tolist(), index=resultados.index)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    rng = np.random.default_rng(3)
+    print(f"{'filas':>10} | {'apply (s)':>9} | {'vectorizado (s)':>15} | {'µs/fila':>7} | {'speedup':>7}")
+    print('-' * 62)
+    for size in sizes:
+        resultados = synthetic_resultados(size, rng)
+        old = timed(parse_with_apply, resultados)
+        new = timed(parse_resultados, resultados)
+        print(f'{size:>10} | {old:>9.3f} | {new:>15.3f} | {new / size * 1e6:>7.2f} | {old / new:>6.1f}x')
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,90 @@
+"""
+Benchmark: capa de acceso a datos
+1) Costo de preparar el texto SQL: copia anterior de execute_query (lee
+   DATABASE_URL y hace replace en cada llamada) vs translate_sql cacheado
+2) Consultas frecuentes (login, página de historial, insert de sorteo) con
+   y sin PREPARE del lado del servidor; solo aplica con DATABASE_URL de PostgreSQL
+Uso: DATABASE_URL=postgresql://... python benchmarks/bench_queries.py [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_REPEATS = 5_000
+SAVED_SORTEOS = 1_000
+
+
+def per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def old_translate(query):
+    """Copia de la versión duplicada en routes/*.py"""
+    database_url = os.getenv('DATABASE_URL', '')
+    if database_url.startswith('postgres'):
+        query = query.replace('?', '%s')
+    return query
+
+
+def main(repeats):
+    if not os.getenv('DATABASE_URL'):
+        os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_queries_'), 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    import database
+    from app import create_app
+    from history import history_page_query, SORTEO_COLUMNS
+
+    app = create_app('production')
+    client = app.test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'bench'})
+    login = client.post('/api/login', json={'username': 'bench', 'password': 'bench'}).get_json()
+    user_id = login['user_id']
+    client.post('/api/save_sorteo', json={'sorteos': [[1, 2, 3, 4, 5, 6]] * SAVED_SORTEOS},
+                headers={'Authorization': f"Bearer {login['access_token']}"})
+
+    history_sql, history_params = history_page_query(user_id, 50, contains=[3])
+    insert_sql = f"INSERT INTO sorteos (user_id, {', '.join(SORTEO_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    postgres = database.is_postgres()
+
+    print(f"Backend: {'PostgreSQL' if postgres else 'SQLite'} | {repeats} repeticiones")
+    print(f"{'texto SQL':>28} | {'µs/llamada':>10}")
+    print('-' * 42)
+    print(f"{'anterior (getenv + replace)':>28} | {per_call(lambda: old_translate(history_sql), repeats):>10.2f}")
+    print(f"{'translate_sql cacheado':>28} | "
+          f"{per_call(lambda: database.translate_sql(history_sql, database.is_postgres()), repeats):>10.2f}")
+
+    queries = [
+        ('login', 'SELECT id, password FROM users WHERE username = ?', ('bench',)),
+        ('historial (contains)', history_sql, history_params),
+        ('insert sorteo', insert_sql, (user_id, 7, 8, 9, 10, 11, 12)),
+    ]
+    print()
+    print(f"{'consulta':>22} | {'sin PREPARE (µs)':>16} | {'con PREPARE (µs)':>16}")
+    print('-' * 60)
+    conn = database.get_db_connection()
+    for name, sql, params in queries:
+        results = []
+        for prepare in (False, True):
+            def run():
+                c = database.execute_query(conn, sql, params, prepare=prepare)
+                if c.description:
+                    c.fetchall()
+            run()
+            results.append(per_call(run, repeats))
+            conn.rollback()
+        print(f'{name:>22} | {results[0]:>16.1f} | {results[1]:>16.1f}')
+    conn.close()
+    if not postgres:
+        print('(SQLite: PREPARE no aplica, sqlite3 ya reutiliza statements compilados)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS)
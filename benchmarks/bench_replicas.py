@@ -0,0 +1,105 @@
+"""
+Benchmark: réplicas de lectura con bases SQLite de prueba
+Crea un primario y dos réplicas (copias con la API de backup de sqlite3,
+que quedan atrasadas hasta la próxima copia) más una réplica inexistente,
+y muestra a dónde va cada lectura (db_read_connections_total):
+- /api/statistics y /api/history reparten entre réplicas (round-robin)
+- la réplica inexistente se descarta por DB_READ_RETRY_AFTER segundos
+- justo después de guardar un sorteo, /api/history lee del primario
+  (read-your-writes) y vuelve a las réplicas cuando se ponen al día
+Uso: python benchmarks/bench_replicas.py [lecturas]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench_suite import PASSWORD, percentile, seed
+
+DEFAULT_READS = 500
+SCALE = 10_000
+
+
+def replicate(primary, replicas):
+    """Copy the primary into every replica file (a replica catching up)"""
+    source = sqlite3.connect(primary)
+    for replica in replicas:
+        target = sqlite3.connect(replica)
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+def routes():
+    """Current db_read_connections_total counters as {(target, reason): count}"""
+    from metrics import registry
+
+    return {
+        tuple(value for _, value in labels): count
+        for name, labels, count in registry.snapshot()['counters']
+        if name == 'db_read_connections_total'
+    }
+
+
+def report(title, before):
+    after = routes()
+    delta = {key: after[key] - before.get(key, 0) for key in after if after[key] - before.get(key, 0)}
+    print(f'{title}: ' + ', '.join(f'{target} ({reason}) {count}' for (reason, target), count in sorted(delta.items())))
+    return after
+
+
+def timed_reads(client, paths, headers, reads):
+    latencies = []
+    for i in range(reads):
+        start = time.perf_counter()
+        response = client.get(paths[i % len(paths)], headers=headers)
+        assert response.status_code == 200, response.status_code
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main(reads):
+    tmp = tempfile.mkdtemp(prefix='bench_replicas_')
+    primary = os.path.join(tmp, 'primary.db')
+    replicas = [os.path.join(tmp, 'replica1.db'), os.path.join(tmp, 'replica2.db')]
+    missing = os.path.join(tmp, 'missing', 'replica3.db')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ.update({
+        'SQLITE_PATH': primary,
+        'DATABASE_READ_URLS': ','.join(f'sqlite:///{path}' for path in replicas + [missing]),
+        'FLASK_ENV': 'production',
+        'SECRET_KEY': 'bench-secret',
+        'LOG_LEVEL': 'ERROR',
+    })
+
+    from app import create_app
+
+    client = create_app('production').test_client()
+    users = seed(SCALE, 0)
+    replicate(primary, replicas)
+    login = client.post('/api/login', json={'username': users[0], 'password': PASSWORD}).get_json()
+    headers = {'Authorization': f"Bearer {login['access_token']}"}
+    history = f"/api/history/{login['user_id']}?limit=50"
+    paths = [history, '/api/statistics', '/api/statistics/pairs']
+
+    before = routes()
+    p50, p99 = timed_reads(client, paths, headers, reads)
+    before = report(f'{reads} lecturas (p50 {p50:.2f} ms, p99 {p99:.2f} ms)', before)
+
+    from database import _replica_state, pool_metrics
+
+    checkouts = {m['name']: m['checkouts'] for m in pool_metrics().values() if m['name'].startswith('replica')}
+    print(f"préstamos por réplica: {checkouts} | réplicas descartadas: {len(_replica_state['down_until'])}")
+    client.post('/api/save_sorteo', json={'sorteos': [[1, 2, 3, 4, 5, 6]]}, headers=headers)
+    newest = client.get(history, headers=headers).get_json()['history'][0]['numbers']
+    before = report(f'historial tras guardar (ve el sorteo nuevo: {newest == [1, 2, 3, 4, 5, 6]})', before)
+
+    replicate(primary, replicas)
+    client.get(history, headers=headers)
+    report('historial con las réplicas al día', before)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_READS)
@@ -0,0 +1,65 @@
+"""
+Benchmark: N llamadas a GET /api/sorteo vs un POST /api/sorteo/batch
+Usa el test client de Flask en proceso (sin red) y reporta tickets/s
+Uso: python benchmarks/bench_sorteo_batch.py [tickets ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+# El bucle de llamadas individuales se corta aquí y se extrapola
+MAX_LOOP = 2_000
+
+
+def loop_single(client, count):
+    # sorteo() imprime cada ticket; no medir la consola
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(count):
+            client.get('/api/sorteo').get_json()
+
+
+def batch(client, count, stream):
+    response = client.post('/api/sorteo/batch', json={'count': count, 'stream': stream})
+    return response.get_data()
+
+
+def rate(fn, count):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main(sizes):
+    tmp = tempfile.mkdtemp(prefix='bench_sorteo_batch_')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    from app import create_app
+
+    client = create_app('production').test_client()
+    # Calentar caché de estadísticas y pool
+    loop_single(client, 10)
+
+    print(f"{'tickets':>10} | {'bucle (tickets/s)':>17} | {'batch JSON (tickets/s)':>22} | "
+          f"{'batch NDJSON (tickets/s)':>24} | {'speedup':>7}")
+    print('-' * 94)
+    for size in sizes:
+        looped = min(size, MAX_LOOP)
+        loop_rate = rate(lambda: loop_single(client, looped), looped)
+        json_rate = rate(lambda: batch(client, size, False), size)
+        ndjson_rate = rate(lambda: batch(client, size, True), size)
+        print(f'{size:>10} | {loop_rate:>17,.0f} | {json_rate:>22,.0f} | '
+              f'{ndjson_rate:>24,.0f} | {json_rate / loop_rate:>6.0f}x')
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
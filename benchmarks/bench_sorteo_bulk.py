@@ -0,0 +1,69 @@
+"""
+Benchmark: guardar N sorteos con N POST /api/save_sorteo vs uno solo con la lista
+Usa el test client de Flask en proceso y reporta sorteos/s
+Uso: python benchmarks/bench_sorteo_bulk.py [sorteos ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000]
+
+
+def rate(fn, count):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main(sizes):
+    tmp = tempfile.mkdtemp(prefix='bench_sorteo_bulk_')
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    from app import create_app
+
+    client = create_app('production').test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'bench'})
+    login = client.post('/api/login', json={'username': 'bench', 'password': 'bench'}).get_json()
+    user_id = login['user_id']
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {login['access_token']}"
+
+    def single(sorteos):
+        for numbers in sorteos:
+            client.post('/api/save_sorteo', json={'user_id': user_id, 'numbers': numbers})
+
+    def bulk(sorteos):
+        client.post('/api/save_sorteo', json={'user_id': user_id, 'sorteos': sorteos})
+
+    def delete_all():
+        ids = []
+        before = ''
+        while True:
+            page = client.get(f'/api/history/{user_id}?limit=500{before}').get_json()
+            ids.extend(item['id'] for item in page['history'])
+            if not page['next_cursor']:
+                break
+            before = f"&before={page['next_cursor']}"
+        for start in range(0, len(ids), 10_000):
+            client.delete('/api/sorteos', json={'ids': ids[start:start + 10_000]})
+
+    print(f"{'sorteos':>10} | {'uno a uno (sorteos/s)':>21} | {'masivo (sorteos/s)':>18} | {'speedup':>7}")
+    print('-' * 67)
+    for size in sizes:
+        sorteos = client.post('/api/sorteo/batch', json={'count': size}).get_json()['balotas']
+        single_rate = rate(lambda: single(sorteos), size)
+        delete_all()
+        bulk_rate = rate(lambda: bulk(sorteos), size)
+        delete_all()
+        print(f'{size:>10} | {single_rate:>21,.0f} | {bulk_rate:>18,.0f} | {bulk_rate / single_rate:>6.0f}x')
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,119 @@
+"""
+Benchmark: sorteos guardados como TEXT '1,2,3,4,5,6' vs seis columnas enteras
+Compara bytes por fila, lectura + decodificación del historial y la
+búsqueda "sorteos que contienen el número N"
+Uso: python benchmarks/bench_sorteo_storage.py [sorteos ...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history import MAIN_COLUMNS  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 5
+NUMBER = 7
+
+
+def synthetic_sorteos(rows, rng):
+    main = np.argsort(rng.random((rows, 43)), axis=1)[:, :5] + 1
+    bonus = rng.integers(1, 17, size=(rows, 1))
+    return np.hstack([main, bonus]).tolist()
+
+
+def build_text(path, sorteos):
+    """Esquema anterior: numbers TEXT"""
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE sorteos (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                    numbers TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.executemany('INSERT INTO sorteos (user_id, numbers) VALUES (1, ?)',
+                     [(','.join(map(str, s)),) for s in sorteos])
+    conn.commit()
+    return conn
+
+
+def build_compact(path, sorteos):
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE sorteos (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                    balota1 INTEGER NOT NULL, balota2 INTEGER NOT NULL, balota3 INTEGER NOT NULL,
+                    balota4 INTEGER NOT NULL, balota5 INTEGER NOT NULL, balota6 INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.executemany(
+        '''INSERT INTO sorteos (user_id, balota1, balota2, balota3, balota4, balota5, balota6)
+           VALUES (1, ?, ?, ?, ?, ?, ?)''',
+        sorteos
+    )
+    conn.commit()
+    return conn
+
+
+def read_text(conn):
+    rows = conn.execute('SELECT id, numbers, created_at FROM sorteos').fetchall()
+    return [[int(n) for n in row[1].split(',')] for row in rows]
+
+
+def read_compact(conn):
+    rows = conn.execute(
+        'SELECT id, balota1, balota2, balota3, balota4, balota5, balota6, created_at FROM sorteos'
+    ).fetchall()
+    return [list(row[1:7]) for row in rows]
+
+
+def contains_text(conn, number):
+    """Con TEXT hay que leer y decodificar todo en Python"""
+    return sum(1 for numbers in read_text(conn) if number in numbers[:5])
+
+
+def contains_compact(conn, number):
+    return conn.execute(
+        f'SELECT COUNT(*) FROM sorteos WHERE ? IN ({MAIN_COLUMNS})', (number,)
+    ).fetchone()[0]
+
+
+def bytes_per_row(conn, rows):
+    conn.execute('VACUUM')
+    pages = conn.execute('PRAGMA page_count').fetchone()[0]
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    return pages * page_size / rows
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def main(sizes):
+    tmp = tempfile.mkdtemp(prefix='bench_sorteo_storage_')
+    rng = np.random.default_rng(11)
+
+    print(f"{'sorteos':>10} | {'formato':>8} | {'bytes/fila':>10} | {'leer (ms)':>10} | {f'contiene {NUMBER} (ms)':>16}")
+    print('-' * 68)
+    for size in sizes:
+        sorteos = synthetic_sorteos(size, rng)
+        for name, build, read, contains in (
+            ('texto', build_text, read_text, contains_text),
+            ('compacto', build_compact, read_compact, contains_compact),
+        ):
+            path = os.path.join(tmp, f'{name}_{size}.db')
+            conn = build(path, sorteos)
+            size_per_row = bytes_per_row(conn, size)
+            read_ms = timed(lambda: read(conn), REPEATS)
+            contains_ms = timed(lambda: contains(conn, NUMBER), REPEATS)
+            conn.close()
+            print(f'{size:>10} | {name:>8} | {size_per_row:>10.1f} | {read_ms:>10.1f} | {contains_ms:>16.1f}')
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,153 @@
+"""
+Benchmark: lecturas concurrentes durante una carga en SQLite
+Mientras un escritor trabaja, N procesos lectores (como otros workers de
+gunicorn) piden /api/history y /api/statistics sin parar. Escritores:
+- upload: /api/upload de un Excel grande (lotes con commit propio)
+- bulk: una sola transacción de BULK_FACTOR x filas en historical_data,
+  como una carga masiva o un rebuild largo
+Compara el modo por defecto de SQLite (SQLITE_TUNED=false: rollback
+journal, una sola clase de conexión) con WAL + PRAGMAs + conexiones de
+solo lectura, cada uno en un proceso y una base propia.
+Uso: python benchmarks/bench_sqlite_concurrency.py [filas_upload] [lectores]
+"""
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_asgi import ROOT
+from bench_suite import PASSWORD, percentile, seed, workbook_bytes
+
+DEFAULT_ROWS = 100_000
+DEFAULT_READERS = 4
+SCALE = 10_000
+BULK_FACTOR = 10
+
+
+def reader(app, paths, headers, done, results):
+    """Reader process: GET ``paths`` in turn until ``done``; sends (latencies, errors)"""
+    client = app.test_client()
+    latencies = []
+    errors = 0
+    i = 0
+    while not done.is_set():
+        start = time.perf_counter()
+        try:
+            ok = client.get(paths[i % len(paths)], headers=headers).status_code == 200
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        i += 1
+    results.put((latencies, errors))
+
+
+def write_upload(client, headers, upload):
+    status_url = client.post('/api/upload', headers=headers,
+                             data={'file': (io.BytesIO(upload), 'bench.xlsx')}).get_json()['status_url']
+    while True:
+        job = client.get(status_url, headers=headers).get_json()
+        if job['status'] in ('succeeded', 'failed'):
+            return job['status']
+        time.sleep(0.05)
+
+
+def write_bulk(rows):
+    """Insert ``rows`` draws into a spare generation in one transaction, then drop them"""
+    from bench_analytics import random_draws
+    from database import get_db_connection
+    from generations import allocate_generation, discard_generation
+    from ingest import bulk_insert_historical
+
+    conn = get_db_connection()
+    generation = allocate_generation(conn)
+    conn.commit()
+    bulk_insert_historical(conn, random_draws(rows), generation)
+    conn.commit()
+    discard_generation(conn, generation)
+    conn.close()
+    return 'succeeded'
+
+
+def child(rows, readers, writer):
+    """Run one mode in this process and print its results as JSON"""
+    from app import create_app
+
+    # create_app() primero: configure_pool() decide los PRAGMAs antes de abrir la base
+    app = create_app('production')
+    users = seed(SCALE, 0)
+    upload = workbook_bytes(rows, 0) if writer == 'upload' else None
+    client = app.test_client()
+    login = client.post('/api/login', json={'username': users[0], 'password': PASSWORD}).get_json()
+    headers = {'Authorization': f"Bearer {login['access_token']}"}
+    paths = [f"/api/history/{login['user_id']}?limit=50", '/api/statistics']
+
+    # fork: cada lector hereda la app y abre sus propias conexiones (pools por pid)
+    context = multiprocessing.get_context('fork')
+    done = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=reader, args=(app, paths[i % 2:] + paths[:i % 2], headers,
+                                                              done, results))
+                 for i in range(readers)]
+    for process in processes:
+        process.start()
+    time.sleep(1)  # lectores en marcha antes de la carga
+
+    start = time.perf_counter()
+    status = write_bulk(rows * BULK_FACTOR) if writer == 'bulk' else write_upload(client, headers, upload)
+    writer_seconds = time.perf_counter() - start
+    done.set()
+    latencies = []
+    errors = 0
+    for _ in processes:
+        samples, failed = results.get()
+        latencies.extend(samples)
+        errors += failed
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    print(json.dumps({
+        'writer_status': status,
+        'writer_seconds': writer_seconds,
+        'reads': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.50),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] * 1000 if latencies else None,
+    }))
+
+
+def main(rows, readers):
+    print(f'Upload de {rows:,} filas / bulk de {rows * BULK_FACTOR:,} | {readers} lectores | '
+          f'base de {SCALE:,} sorteos')
+    print(f"{'escritor':>8} | {'modo':>16} | {'escritor (s)':>12} | {'lecturas':>8} | {'errores':>7} | "
+          f"{'p50 (ms)':>8} | {'p99 (ms)':>8} | {'máx (ms)':>8}")
+    print('-' * 100)
+    for writer in ('upload', 'bulk'):
+        for label, tuned in (('rollback journal', 'false'), ('WAL + solo lect.', 'true')):
+            env = {**os.environ, 'SQLITE_TUNED': tuned, 'FLASK_ENV': 'production', 'LOG_LEVEL': 'WARNING',
+                   'SECRET_KEY': 'bench-secret',
+                   'SQLITE_PATH': os.path.join(tempfile.mkdtemp(prefix='bench_sqlite_'), 'bench.db')}
+            env.pop('DATABASE_URL', None)
+            output = subprocess.run([sys.executable, __file__, '--child', str(rows), str(readers), writer],
+                                    cwd=ROOT / 'benchmarks', env=env, capture_output=True, text=True, check=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{writer:>8} | {label:>16} | {result['writer_seconds']:>12.1f} | {result['reads']:>8} | "
+                  f"{result['errors']:>7} | {result['p50_ms'] or 0:>8.1f} | {result['p99_ms'] or 0:>8.1f} | "
+                  f"{result['max_ms'] or 0:>8.0f}"
+                  + ('' if result['writer_status'] == 'succeeded' else f" ({result['writer_status']})"))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        child(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4])
+    else:
+        args = [int(arg) for arg in sys.argv[1:]]
+        main(args[0] if args else DEFAULT_ROWS, args[1] if len(args) > 1 else DEFAULT_READERS)
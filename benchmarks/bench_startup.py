@@ -0,0 +1,74 @@
+"""
+Benchmark: arranque en frío de wsgi:app
+Mide en un intérprete nuevo el tiempo de ``import wsgi`` (imports +
+create_app() + init_db()) y el RSS del proceso, con una base recién creada
+y con una base ya migrada (el caso de cada worker en Render). Con --ref
+compara contra otro commit usando un git worktree temporal.
+Uso: python benchmarks/bench_startup.py [--runs N] [--ref HEAD~1]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Se ejecuta en un proceso nuevo por medición
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import wsgi
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'ms': elapsed * 1000,
+    # ru_maxrss está en KB en Linux
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': sorted(name for name in ('pandas', 'openpyxl', 'psycopg2') if name in sys.modules),
+}))
+'''
+
+
+def measure(tree, db_path):
+    env = {**os.environ, 'SQLITE_PATH': db_path, 'FLASK_ENV': 'production',
+           'SECRET_KEY': 'bench-secret', 'LOG_LEVEL': 'WARNING'}
+    env.pop('DATABASE_URL', None)
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=tree, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_tree(label, tree, runs):
+    tmp = tempfile.mkdtemp(prefix='bench_startup_')
+    fresh = [measure(tree, os.path.join(tmp, f'fresh{i}.db')) for i in range(runs)]
+    warm_db = os.path.join(tmp, 'warm.db')
+    measure(tree, warm_db)
+    warm = [measure(tree, warm_db) for _ in range(runs)]
+    for scenario, samples in (('base nueva', fresh), ('base migrada', warm)):
+        print(f"{label:>14} | {scenario:>12} | {statistics.median(s['ms'] for s in samples):>8.0f} | "
+              f"{statistics.median(s['rss_mb'] for s in samples):>8.1f} | {', '.join(samples[0]['heavy']) or '-'}")
+
+
+def main(runs, ref):
+    print(f"{'árbol':>14} | {'escenario':>12} | {'ms':>8} | {'RSS (MB)':>8} | módulos pesados cargados")
+    print('-' * 78)
+    if ref:
+        worktree = tempfile.mkdtemp(prefix='bench_startup_ref_')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, ref], cwd=ROOT,
+                       check=True, capture_output=True)
+        try:
+            run_tree(ref, worktree, runs)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=ROOT, capture_output=True)
+    run_tree('actual', ROOT, runs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold start of wsgi:app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--ref', help='git ref to compare against (e.g. HEAD~1)')
+    args = parser.parse_args()
+    main(args.runs, args.ref)
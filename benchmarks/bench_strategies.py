@@ -0,0 +1,75 @@
+"""
+Benchmark: estrategias de generación de sorteos (strategies.py)
+Con un historial sintético mide, por estrategia:
+1) Construcción de la tabla de probabilidades (una vez por generación)
+2) GET /api/sorteo?strategy=... con la tabla ya en caché (µs por petición)
+3) POST /api/sorteo/batch de 100000 tickets (tickets/s)
+Uso: python benchmarks/bench_strategies.py [sorteos]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_analytics import random_draws
+
+DEFAULT_DRAWS = 100_000
+REQUESTS = 2_000
+BATCH = 100_000
+
+
+def timed(fn, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(size):
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_strategies_'), 'bench.db')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+    import strategies
+    from analytics import rebuild_analytics
+    from app import create_app
+    from database import get_db_connection
+    from frequency import rebuild_frequencies
+    from generations import allocate_generation, activate_generation, read_generation
+    from ingest import bulk_insert_historical
+
+    client = create_app('production').test_client()
+    conn = get_db_connection()
+    base = read_generation(conn)
+    generation = allocate_generation(conn)
+    bulk_insert_historical(conn, random_draws(size), generation)
+    rebuild_frequencies(conn, generation)
+    rebuild_analytics(conn, generation)
+    conn.commit()
+    activate_generation(conn, generation, base)
+
+    def single(name):
+        # sorteo() imprime cada ticket; no medir la consola
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.get(f'/api/sorteo?strategy={name}').get_json()
+
+    print(f'historial: {size:,} sorteos')
+    print(f"{'estrategia':>13} | {'tabla (ms)':>10} | {'GET /api/sorteo (µs)':>20} | {'batch (tickets/s)':>17}")
+    print('-' * 71)
+    for name, build in strategies.STRATEGIES.items():
+        table = timed(lambda: build(conn)) * 1000 if build else 0.0
+        single(name)
+        request = timed(lambda: single(name), REQUESTS) * 1e6
+        batch = BATCH / timed(lambda: client.post('/api/sorteo/batch',
+                                                  json={'count': BATCH, 'strategy': name}).get_data())
+        print(f'{name:>13} | {table:>10.2f} | {request:>20.0f} | {batch:>17,.0f}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DRAWS)
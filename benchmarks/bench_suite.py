@@ -0,0 +1,385 @@
+"""
+Benchmark: suite reproducible de todos los endpoints
+Siembra historical_data, usuarios y sorteos sintéticos a la escala pedida y
+mide req/s y latencias p50/p95/p99 de /api/sorteo, /api/statistics,
+/api/history, /api/login y /api/upload, con el test client de create_app()
+en proceso o contra gunicorn local (--gunicorn). El resultado se guarda en
+JSON para comparar entre commits (--compare otro.json).
+
+Uso:
+  python benchmarks/bench_suite.py --scale 100000
+  python benchmarks/bench_suite.py --scale 1000000 --gunicorn --clients 16
+  python benchmarks/bench_suite.py --database-url postgresql://localhost/bench
+  python benchmarks/bench_suite.py --compare benchmarks/results/abc123-sqlite-100000.json
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from bench_asgi import ROOT
+from bench_analytics import random_draws
+from bench_gunicorn import PORT, time_to_ready
+
+PASSWORD = 'bench-password'
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+
+# endpoint -> peticiones por defecto (login y upload son caros a propósito)
+REQUESTS = {
+    'sorteo': 1000,
+    'statistics': 1000,
+    'history': 1000,
+    'login': 50,
+    'upload': 5,
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', type=int, default=10_000,
+                        help='historical_data rows; users = scale/100, sorteos = scale (default 10000)')
+    parser.add_argument('--upload-rows', type=int, default=5_000, help='rows of the uploaded workbook')
+    parser.add_argument('--requests', type=float, default=1.0, help='multiplier of the requests per endpoint')
+    parser.add_argument('--endpoints', default=','.join(REQUESTS), help='comma-separated subset to run')
+    parser.add_argument('--database-url', help='PostgreSQL URL (default: a fresh SQLite file)')
+    parser.add_argument('--gunicorn', action='store_true', help='measure over HTTP against gunicorn.conf.py')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients with --gunicorn')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>-<db>-<scale>.json)')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Datos sintéticos
+
+def seed(scale, rng_seed):
+    """Fill the database with ``scale`` draws, ``scale // 100`` users and ``scale`` sorteos
+
+    Everything is bulk-loaded through the same modules the app uses, so
+    seeding 1M rows takes seconds. Returns the usernames.
+    """
+    from analytics import rebuild_analytics
+    from database import execute_many, execute_query, get_db_connection, init_db
+    from frequency import rebuild_frequencies
+    from generations import activate_generation, allocate_generation, read_generation
+    from history import insert_sorteos
+    from ingest import bulk_insert_historical
+    from passwords import hash_password
+
+    init_db()
+    conn = get_db_connection()
+    users = [f'bench{i}' for i in range(max(1, scale // 100))]
+    # Un solo hash para todos: el costo de login se mide, no el de la siembra
+    password_hash = hash_password(PASSWORD)
+    execute_many(conn, 'INSERT INTO users (username, password) VALUES (?, ?)',
+                 [(username, password_hash) for username in users])
+    user_ids = [row['id'] for row in execute_query(conn, 'SELECT id FROM users ORDER BY id').fetchall()]
+
+    sorteos = random_draws(scale, rng_seed + 1).tolist()
+    per_user = max(1, len(sorteos) // len(user_ids))
+    for i, user_id in enumerate(user_ids):
+        insert_sorteos(conn, user_id, sorteos[i * per_user:(i + 1) * per_user])
+
+    base = read_generation(conn)
+    generation = allocate_generation(conn)
+    bulk_insert_historical(conn, random_draws(scale, rng_seed), generation)
+    rebuild_frequencies(conn, generation)
+    rebuild_analytics(conn, generation)
+    conn.commit()
+    activate_generation(conn, generation, base)
+    conn.close()
+    return users
+
+
+def workbook_bytes(rows, rng_seed):
+    """An .xlsx upload with a Hoja1 sheet of ``rows`` draws"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Hoja1')
+    sheet.append(['fecha', 'resultado'])
+    for i, draw in enumerate(random_draws(rows, rng_seed + 2).astype(str).tolist()):
+        sheet.append([i, '-'.join(draw)])
+    buf = io.BytesIO()
+    workbook.save(buf)
+    return buf.getvalue()
+
+
+# Transportes: test client en proceso o HTTP contra gunicorn
+
+class InProcess:
+    """Requests through the Flask test client of create_app()"""
+
+    def __init__(self):
+        from app import create_app
+
+        self.client = create_app('production').test_client()
+
+    def request(self, method, path, headers=None, json_body=None, upload=None):
+        kwargs = {'headers': headers or {}}
+        if json_body is not None:
+            kwargs['json'] = json_body
+        if upload is not None:
+            kwargs['data'] = {'file': (io.BytesIO(upload), 'bench.xlsx')}
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.get_json(silent=True)
+
+
+class Http:
+    """Requests over keep-alive HTTP connections (one per client thread)"""
+
+    def __init__(self, port):
+        self.port = port
+        self.local = threading.local()
+
+    def _connection(self):
+        if getattr(self.local, 'conn', None) is None:
+            self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        return self.local.conn
+
+    def request(self, method, path, headers=None, json_body=None, upload=None):
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        if upload is not None:
+            boundary = uuid.uuid4().hex
+            body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="bench.xlsx"\r\n'
+                    f'Content-Type: application/octet-stream\r\n\r\n').encode() + upload \
+                + f'\r\n--{boundary}--\r\n'.encode()
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # keep-alive cerrada por el servidor (max_requests, keepalive): reconectar una vez
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+        try:
+            payload = json.loads(data) if data else None
+        except ValueError:
+            payload = None
+        return response.status, payload
+
+
+# Escenarios: cada uno devuelve una función que hace una petición y su estado
+
+def scenarios(transport, users, upload):
+    """name -> callable(i) performing request number ``i`` and returning its status"""
+    tokens = {}
+
+    def login(i):
+        status, _ = transport.request('POST', '/api/login',
+                                      json_body={'username': users[i % len(users)], 'password': PASSWORD})
+        return status
+
+    def authorized(i):
+        username = users[i % len(users)]
+        if username not in tokens:
+            _, body = transport.request('POST', '/api/login', json_body={'username': username, 'password': PASSWORD})
+            tokens[username] = (body['user_id'], {'Authorization': f"Bearer {body['access_token']}"})
+        return tokens[username]
+
+    def history(i):
+        user_id, headers = authorized(i % 32)
+        return transport.request('GET', f'/api/history/{user_id}?limit=50', headers=headers)[0]
+
+    def upload_file(i):
+        _, headers = authorized(0)
+        status, body = transport.request('POST', '/api/upload?mode=replace', headers=headers, upload=upload)
+        if status != 202:
+            return status
+        # La latencia de una carga es la del trabajo completo, no la del 202
+        while True:
+            status, job = transport.request('GET', body['status_url'], headers=headers)
+            if status != 200 or job['status'] in ('succeeded', 'failed'):
+                return status if status != 200 or job['status'] == 'succeeded' else 500
+            time.sleep(0.02)
+
+    return {
+        'sorteo': lambda i: transport.request('GET', '/api/sorteo')[0],
+        'statistics': lambda i: transport.request('GET', '/api/statistics')[0],
+        'history': history,
+        'login': login,
+        'upload': upload_file,
+    }, authorized
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * q))] * 1000
+
+
+def run(fn, count, clients):
+    """Run ``count`` requests over ``clients`` threads; returns the endpoint summary"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(count))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                ok = 200 <= fn(i) < 300
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'mean_ms': round(float(np.mean(latencies)) * 1000, 3) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+# Reporte
+
+def print_results(results, baseline=None):
+    header = f"{'endpoint':>10} | {'req/s':>9} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'errores':>7}"
+    if baseline:
+        header += f" | {'Δ p50':>7} | {'Δ req/s':>7}"
+    print(header)
+    print('-' * len(header))
+    for name, row in results['endpoints'].items():
+        line = (f"{name:>10} | {row['throughput_rps'] or 0:>9.1f} | {row['p50_ms'] or 0:>9.2f} | "
+                f"{row['p95_ms'] or 0:>9.2f} | {row['p99_ms'] or 0:>9.2f} | {row['errors']:>7}")
+        before = (baseline or {}).get('endpoints', {}).get(name)
+        if before and before['p50_ms'] and row['p50_ms'] and before['throughput_rps']:
+            line += (f" | {(row['p50_ms'] / before['p50_ms'] - 1) * 100:>+6.0f}%"
+                     f" | {(row['throughput_rps'] / before['throughput_rps'] - 1) * 100:>+6.0f}%")
+        print(line)
+
+
+def main(argv):
+    args = parse_args(argv)
+    requested = {name.strip() for name in args.endpoints.split(',') if name.strip()}
+    unknown = requested - set(REQUESTS)
+    if unknown:
+        sys.exit(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+    # Orden fijo: upload reemplaza el histórico, así que va al final
+    selected = [name for name in REQUESTS if name in requested]
+
+    env = {'SECRET_KEY': 'bench-secret', 'FLASK_ENV': 'production', 'PORT': str(PORT),
+           'LOG_LEVEL': 'WARNING'}
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+        backend = 'postgres'
+    else:
+        os.environ.pop('DATABASE_URL', None)
+        env['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_suite_'), 'bench.db')
+        backend = 'sqlite'
+    os.environ.update(env)
+
+    start = time.perf_counter()
+    users = seed(args.scale, args.seed)
+    seed_seconds = time.perf_counter() - start
+    upload = workbook_bytes(args.upload_rows, args.seed) if 'upload' in selected else None
+    print(f'{backend} | escala {args.scale:,} | {len(users):,} usuarios | sembrado en {seed_seconds:.1f}s')
+
+    server = None
+    if args.gunicorn:
+        server = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], cwd=ROOT,
+                                  env={**os.environ, 'GUNICORN_PRELOAD': 'true'},
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        asyncio.run(time_to_ready())
+        transport, clients = Http(PORT), args.clients
+    else:
+        transport, clients = InProcess(), 1
+
+    try:
+        runners, authorized = scenarios(transport, users, upload)
+        # Tokens de history/upload y cachés calientes antes de medir
+        for i in range(min(32, len(users))):
+            authorized(i)
+        for name in ('sorteo', 'statistics', 'history'):
+            if name in selected:
+                run(runners[name], 20, clients)
+
+        endpoints = {}
+        for name in selected:
+            count = max(1, int(REQUESTS[name] * args.requests))
+            # Las cargas reemplazan el histórico: siempre de a una
+            endpoints[name] = run(runners[name], count, 1 if name == 'upload' else clients)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'backend': backend,
+        'transport': 'gunicorn' if args.gunicorn else 'in-process',
+        'clients': clients,
+        'scale': args.scale,
+        'users': len(users),
+        'upload_rows': args.upload_rows,
+        'seed_seconds': round(seed_seconds, 2),
+        'endpoints': endpoints,
+    }
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_results(results, baseline)
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{results['commit']}-{backend}-{results['transport']}-{args.scale}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + '\n')
+    print(f'Resultados: {output}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,97 @@
+"""
+Benchmark: pico de memoria (RSS) al cargar un Excel grande
+Compara la carga completa con pandas vs la carga por lotes (streaming)
+Uso: python benchmarks/bench_upload_memory.py [filas ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_SIZES = [50_000, 200_000, 500_000]
+
+
+def write_workbook(path, rows, rng):
+    """Write a Hoja1 sheet with 'fecha' and 'resultado' columns (write-only mode)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Hoja1')
+    sheet.append(['fecha', 'resultado'])
+    chunk = 50_000
+    for start in range(0, rows, chunk):
+        size = min(chunk, rows - start)
+        main = np.argsort(rng.random((size, 43)), axis=1)[:, :5] + 1
+        bonus = rng.integers(1, 17, size=(size, 1))
+        for i, draw in enumerate(np.hstack([main, bonus]).astype(str).tolist()):
+            sheet.append([start + i, '-'.join(draw)])
+    workbook.save(path)
+
+
+def peak_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, file_path, db_path):
+    """Run one load in a fresh process and print 'baseline peak seconds'"""
+    os.environ.pop('DATABASE_URL', None)
+    os.environ['SQLITE_PATH'] = db_path
+
+    import database
+    from ingest import stream_historical, bulk_insert_historical, load_historical_data, BALOTA_COLUMNS
+
+    database.init_db()
+    baseline = peak_rss_mb()
+    conn = database.get_db_connection()
+    start = time.perf_counter()
+    if mode == 'stream':
+        stream_historical(conn, file_path, 0)
+    else:
+        df = load_historical_data(file_path)
+        bulk_insert_historical(conn, df[BALOTA_COLUMNS].to_numpy(), 0)
+    conn.rollback()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    print(f'{baseline:.1f} {peak_rss_mb():.1f} {elapsed:.2f}')
+
+
+def measure(mode, file_path, tmp):
+    db_path = os.path.join(tmp, f'{mode}.db')
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', mode, file_path, db_path],
+        check=True, capture_output=True, text=True, cwd=str(ROOT)
+    ).stdout.strip().splitlines()[-1]
+    baseline, peak, seconds = (float(value) for value in output.split())
+    return baseline, peak, seconds
+
+
+def main(sizes):
+    rng = np.random.default_rng(11)
+    tmp = tempfile.mkdtemp(prefix='bench_upload_mem_')
+    print(f"{'filas':>9} | {'archivo (MB)':>12} | {'pandas pico (MB)':>16} | {'streaming pico (MB)':>19} | {'pandas s':>8} | {'stream s':>8}")
+    print('-' * 90)
+    for size in sizes:
+        file_path = os.path.join(tmp, f'history_{size}.xlsx')
+        write_workbook(file_path, size, rng)
+        file_mb = os.path.getsize(file_path) / 1024 / 1024
+        base, pandas_peak, pandas_s = measure('pandas', file_path, tmp)
+        _, stream_peak, stream_s = measure('stream', file_path, tmp)
+        print(f'{size:>9} | {file_mb:>12.1f} | {pandas_peak:>16.1f} | {stream_peak:>19.1f} | {pandas_s:>8.1f} | {stream_s:>8.1f}')
+    print(f'RSS base del proceso tras importar: {base:.1f} MB')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(*sys.argv[2:5])
+    else:
+        sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+        main(sizes)
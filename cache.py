@@ -0,0 +1,106 @@
+"""
+In-process statistics cache with versioned invalidation
+Entries are tagged with the active historical_data generation stored in the
+data_generation table; an upload flips it and every worker drops stale entries.
+Values are computed on read connections (see database.get_read_connection),
+from a replica only when it has already caught up with that generation
+"""
+import threading
+import time
+
+from database import get_read_connection
+from generations import HISTORICAL_DATA, read_generation
+
+
+class StatsCache:
+    """TTL cache whose entries are only valid for one data generation"""
+
+    def __init__(self, ttl=300.0, check_interval=1.0, name=HISTORICAL_DATA):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, ttl, check_interval):
+        with self._lock:
+            self.ttl = ttl
+            self.check_interval = check_interval
+            self._entries.clear()
+            self._generation = None
+
+    def current_generation(self):
+        """Generation from the DB, re-read at most every ``check_interval`` seconds"""
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self.check_interval:
+            return self._generation
+
+        # Del primario: es la generación que deciden las cargas
+        conn = get_read_connection(replicas=False)
+        try:
+            generation = read_generation(conn, self.name)
+        finally:
+            conn.close()
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+            self._generation = generation
+            self._checked_at = now
+        return generation
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key`` or compute(conn) and store it"""
+        generation = self.current_generation()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        # Una réplica sirve solo si ya tiene esa generación
+        conn = get_read_connection(fresh=lambda replica: read_generation(replica, self.name) == generation)
+        try:
+            value = compute(conn)
+        finally:
+            conn.close()
+
+        with self._lock:
+            # Solo guardar si nadie cambió la generación mientras se calculaba
+            if generation == self._generation:
+                self._entries[key] = (generation, now + self.ttl, value)
+        return value
+
+    def invalidate(self):
+        """Drop every entry and force a generation re-read on next access"""
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'generation': self._generation if self._generation is not None else -1,
+            }
+
+
+# Instancia compartida por los endpoints de estadísticas y sorteo
+stats_cache = StatsCache()
+
+
+def configure_cache(app_config):
+    """Load cache settings from the Flask config (STATS_CACHE_* keys)"""
+    stats_cache.configure(
+        app_config.get('STATS_CACHE_TTL', 300.0),
+        app_config.get('STATS_CACHE_GENERATION_CHECK', 1.0),
+    )
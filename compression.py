@@ -0,0 +1,86 @@
+"""
+Response compression
+Compresses JSON/text responses above COMPRESS_MIN_SIZE with brotli (when the
+optional ``brotli`` package is installed and the client accepts it) or gzip.
+Streamed responses (NDJSON sorteo batches) and 304s are left untouched.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se usa solo gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+
+# Valores por defecto; create_app() los sobrescribe con configure_compression()
+_settings = {
+    'enabled': True,
+    'min_size': 1024,
+    'gzip_level': 6,
+    'brotli_quality': 4,
+}
+
+
+def configure_compression(app_config):
+    """Load compression settings from the Flask config (COMPRESS_* keys)"""
+    _settings['enabled'] = app_config.get('COMPRESS_ENABLED', _settings['enabled'])
+    _settings['min_size'] = app_config.get('COMPRESS_MIN_SIZE', _settings['min_size'])
+    _settings['gzip_level'] = app_config.get('COMPRESS_GZIP_LEVEL', _settings['gzip_level'])
+    _settings['brotli_quality'] = app_config.get('COMPRESS_BROTLI_QUALITY', _settings['brotli_quality'])
+
+
+def compression_enabled():
+    return _settings['enabled']
+
+
+def is_compressible(response):
+    """True for complete 2xx text/JSON responses that are not encoded yet"""
+    return (200 <= response.status_code < 300 and response.status_code != 204
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and 'Content-Encoding' not in response.headers)
+
+
+def choose_encoding(accept_encodings):
+    """Best supported encoding of an Accept-Encoding header (werkzeug Accept), or None"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=_settings['brotli_quality'])
+    return gzip.compress(data, compresslevel=_settings['gzip_level'])
+
+
+def encode_response(response, data, accept_encodings):
+    """Replace the body of ``response`` with its compressed ``data`` if worth it
+
+    The ETag gets the encoding as suffix ("abc-gzip") so a strong ETag
+    never names two different byte sequences.
+    """
+    response.vary.add('Accept-Encoding')
+    if len(data) < _settings['min_size']:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def compress_response(response):
+    """after_request hook of the Flask app"""
+    if not _settings['enabled'] or response.is_streamed or response.direct_passthrough \
+            or not is_compressible(response):
+        return response
+    return encode_response(response, response.get_data(), request.accept_encodings)
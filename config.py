@@ -6,12 +6,88 @@ import os
 
 class Config:
     """Base configuration"""
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    SECRET_KEY = os.environ.get('SECRET_KEY')  # obligatoria fuera de DEBUG/TESTING (firma los tokens)
     DEBUG = False
     TESTING = False
     
+    # Session tokens (firmados con SECRET_KEY)
+    TOKEN_ACCESS_TTL = int(os.environ.get('TOKEN_ACCESS_TTL', 900))  # segundos
+    TOKEN_REFRESH_TTL = int(os.environ.get('TOKEN_REFRESH_TTL', 30 * 24 * 3600))
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10_000))  # tokens verificados recordados por worker
+    
+    # Password hashing (pool de procesos por worker; 0 = en el hilo de la petición)
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'scrypt')  # scrypt o pbkdf2
+    PASSWORD_HASH_COST = int(os.environ.get('PASSWORD_HASH_COST', 0))  # N de scrypt o iteraciones de pbkdf2 (0 = por defecto)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))  # procesos por worker de gunicorn (cuentan en la RAM)
+    
     # Database
     DATABASE_NAME = 'lottery.db'
+
+    # Réplicas de lectura (mismo backend que el primario; sqlite:///ruta para pruebas locales)
+    DATABASE_READ_URLS = [url.strip() for url in os.environ.get('DATABASE_READ_URLS', '').split(',') if url.strip()]
+    DB_READ_RETRY_AFTER = float(os.environ.get('DB_READ_RETRY_AFTER', 30))  # segundos sin usar una réplica que falló
+    
+    # Connection pool (uno por worker de gunicorn)
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 5))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # segundos esperando una conexión libre
+    DB_POOL_MAX_USES = int(os.environ.get('DB_POOL_MAX_USES', 5000))  # reciclar tras N préstamos
+    DB_POOL_MAX_AGE = float(os.environ.get('DB_POOL_MAX_AGE', 1800))  # reciclar tras N segundos
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_POOL_PING_INTERVAL = float(os.environ.get('DB_POOL_PING_INTERVAL', 5))  # ping solo si estuvo inactiva
+    DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'  # PREPARE en consultas frecuentes (false con PgBouncer en modo transaction)
+
+    # SQLite (solo sin DATABASE_URL)
+    SQLITE_TUNED = os.environ.get('SQLITE_TUNED', 'true').lower() == 'true'  # PRAGMAs de abajo + conexiones de solo lectura
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')  # WAL: las lecturas no esperan a una carga
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL es seguro con WAL (FULL = fsync por commit)
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))  # páginas, o KiB si es negativo (64 MiB)
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes leídos vía mmap
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms esperando el lock de escritura
+
+    # Statistics cache (se invalida con cada carga de historical_data)
+    STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', 300))
+    STATS_CACHE_GENERATION_CHECK = float(os.environ.get('STATS_CACHE_GENERATION_CHECK', 1))  # segundos entre lecturas de la generación
+    
+    # Precomputed analytics (pares, tríos, ausencias, calientes/fríos)
+    ANALYTICS_WINDOWS = tuple(int(w) for w in os.environ.get('ANALYTICS_WINDOWS', '10,50,100').split(','))  # últimos N sorteos
+    ANALYTICS_MAX_LIMIT = int(os.environ.get('ANALYTICS_MAX_LIMIT', 100))  # máximo de ?limit= en /api/statistics/*
+    
+    # Sorteo generation
+    SORTEO_BATCH_MAX = int(os.environ.get('SORTEO_BATCH_MAX', 100_000))  # tickets por POST /api/sorteo/batch
+    SORTEO_BULK_MAX = int(os.environ.get('SORTEO_BULK_MAX', 10_000))  # sorteos por guardado/borrado/edición masiva
+    SORTEO_DEFAULT_STRATEGY = os.environ.get('SORTEO_DEFAULT_STRATEGY', 'top3')  # sin ?strategy= (ver strategies.py)
+    SORTEO_RECENCY_HALF_LIFE = float(os.environ.get('SORTEO_RECENCY_HALF_LIFE', 10))  # sorteos en que el peso de 'recency' se reduce a la mitad
+    SORTEO_AVOID_RECENT_DRAWS = int(os.environ.get('SORTEO_AVOID_RECENT_DRAWS', 3))  # 'avoid_recent' excluye los números de los últimos N sorteos
+    
+    # History pagination
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))  # sorteos por página si no se pasa ?limit=
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 500))
+    
+    # Gunicorn (leídos por gunicorn.conf.py)
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')  # sync o gthread
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 0))  # 0 = según núcleos y worker class
+    GUNICORN_MAX_AUTO_WORKERS = int(os.environ.get('GUNICORN_MAX_AUTO_WORKERS', 4))  # tope cuando GUNICORN_WORKERS es 0
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))  # hilos por worker (solo gthread)
+    GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'  # create_app() una vez en el master
+    GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))  # reiniciar worker tras N peticiones (0 = nunca)
+    GUNICORN_MAX_REQUESTS_JITTER = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))  # evita reinicios simultáneos
+    GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 5))  # segundos (gthread)
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+    
+    # Response compression (brotli si el paquete está instalado, si no gzip)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes; respuestas más chicas van sin comprimir
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    
+    # Observability (/metrics y logs)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # snapshots por worker para agregar /metrics (gunicorn.conf.py lo define)
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))  # segundos entre snapshots de un worker
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # DEBUG muestra cada sorteo generado
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json o text
     
     # CORS
     CORS_ORIGINS = "*"  # Allow all origins for production
@@ -20,6 +96,10 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'xlsx'}
+    UPLOAD_STREAMING = os.environ.get('UPLOAD_STREAMING', 'true').lower() == 'true'  # lectura por lotes con openpyxl
+    UPLOAD_BATCH_SIZE = int(os.environ.get('UPLOAD_BATCH_SIZE', 5000))  # filas por lote
+    UPLOAD_JOB_WORKERS = int(os.environ.get('UPLOAD_JOB_WORKERS', 1))  # hilos de carga por worker
+    UPLOAD_JOB_STALE_AFTER = float(os.environ.get('UPLOAD_JOB_STALE_AFTER', 120))  # segundos sin heartbeat para reencolar
 
 
 class DevelopmentConfig(Config):
@@ -2,104 +2,393 @@
 Database initialization and connection utilities
 Compatible with both SQLite (development) and PostgreSQL (production)
 """
+import hashlib
+import itertools
+import logging
 import os
+import re
 import sqlite3
+import time
+import weakref
+from functools import lru_cache
 from pathlib import Path
 
+from flask import g, has_app_context
 
-def get_db_connection():
-    """Get a connection to the database (SQLite or PostgreSQL)"""
-    database_url = os.getenv('DATABASE_URL')
-    
+from metrics import record_query, record_read
+from pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Pools por proceso, indexados por DSN (se recrean tras un fork)
+_pools = {}
+
+# Valores por defecto; create_app() los sobrescribe con configure_pool()
+_pool_settings = {
+    'min_size': 1,
+    'max_size': 5,
+    'timeout': 10.0,
+    'max_uses': 5000,
+    'max_age': 1800.0,
+    'pre_ping': True,
+    'ping_interval': 5.0,
+}
+
+
+# Backend resuelto una vez por configuración; configure_pool() lo reinicia
+_backend = {}
+
+# PRAGMAs de cada conexión SQLite; configure_pool() los sobrescribe (SQLITE_* keys).
+# WAL deja leer mientras una carga escribe; synchronous=NORMAL es seguro con WAL
+_sqlite_settings = {
+    'tuned': True,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,  # KiB (negativo) = 64 MiB por conexión
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,  # ms esperando un lock de escritura
+}
+
+
+# Réplicas de lectura (DATABASE_READ_URLS); configure_pool() las carga
+_read_settings = {
+    'urls': (),
+    'retry_after': 30.0,
+}
+
+# Turno del round-robin y réplicas caídas {url: monotonic hasta el reintento}
+_replica_state = {
+    'turn': itertools.count(),
+    'down_until': {},
+}
+
+
+def _normalize_url(database_url):
+    if database_url and database_url.startswith('postgres://'):
+        # Render usa postgres:// pero psycopg2 necesita postgresql://
+        return database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+def _database_url():
+    """Return the configured DATABASE_URL normalized for psycopg2"""
+    if 'url' in _backend:
+        return _backend['url']
+    database_url = _normalize_url(os.getenv('DATABASE_URL'))
+    _backend['url'] = database_url
+    return database_url
+
+
+# Statements ya preparados en cada conexión física de PostgreSQL
+_prepared = weakref.WeakKeyDictionary()
+
+_query_settings = {
+    'prepare': True,
+}
+
+
+def is_postgres():
+    """True when DATABASE_URL points to PostgreSQL (resolved once, not per query)"""
+    postgres = _backend.get('postgres')
+    if postgres is None:
+        postgres = _backend['postgres'] = (os.getenv('DATABASE_URL') or '').startswith('postgres')
+    return postgres
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(query, postgres):
+    """SQL written with '?' placeholders in the paramstyle of the backend"""
+    if not postgres:
+        return query
+    # psycopg2 usa %s; un % literal debe ir escapado
+    return query.replace('%', '%%').replace('?', '%s')
+
+
+@lru_cache(maxsize=512)
+def to_numbered_placeholders(query):
+    """'... = ? AND ... = ?' -> '... = $1 AND ... = $2' (PREPARE / asyncpg syntax)"""
+    counter = iter(range(1, query.count('?') + 1))
+    return re.sub(r'\?', lambda _: f'${next(counter)}', query)
+
+
+@lru_cache(maxsize=256)
+def _prepared_sql(query):
+    """(name, PREPARE text, EXECUTE text) for a '?' query"""
+    name = 'stmt_' + hashlib.sha1(query.encode()).hexdigest()[:16]
+    args = ', '.join(['%s'] * query.count('?'))
+    execute = f'EXECUTE {name} ({args})' if args else f'EXECUTE {name}'
+    return name, f'PREPARE {name} AS {to_numbered_placeholders(query)}', execute
+
+
+def execute_query(conn, query, params=(), prepare=False):
+    """Execute a query written with '?' placeholders and return the cursor
+
+    With ``prepare`` the statement is prepared server-side the first time a
+    PostgreSQL connection runs it and later calls only send EXECUTE with the
+    parameters. Meant for hot queries with a fixed text; SQLite already
+    keeps compiled statements per connection.
+    """
+    start = time.perf_counter()
+    c = conn.cursor()
+    if prepare and _query_settings['prepare'] and is_postgres():
+        name, prepare_sql, execute_sql = _prepared_sql(query)
+        names = _prepared.setdefault(getattr(conn, 'raw', conn), set())
+        if name not in names:
+            c.execute(prepare_sql)
+            names.add(name)
+        c.execute(execute_sql, params)
+    else:
+        c.execute(translate_sql(query, is_postgres()), params)
+    record_query(time.perf_counter() - start)
+    return c
+
+
+def execute_many(conn, query, rows):
+    """Execute the same statement for every row of params"""
+    start = time.perf_counter()
+    c = conn.cursor()
+    c.executemany(translate_sql(query, is_postgres()), rows)
+    record_query(time.perf_counter() - start)
+    return c
+
+
+def _sqlite_path(database_url=None):
+    """File of the primary SQLite database, or of a ``sqlite:///path`` replica URL"""
+    if database_url and database_url.startswith('sqlite:///'):
+        return database_url[len('sqlite:///'):]
+    return os.getenv('SQLITE_PATH') or str(Path(__file__).parent / 'lottery.db')
+
+
+def sqlite_pragmas(read_only=False):
+    """PRAGMA statements run on every new SQLite connection"""
+    if not _sqlite_settings['tuned']:
+        return []
+    # busy_timeout primero: cambiar journal_mode también espera el lock
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(_sqlite_settings['busy_timeout'])}",
+        f"PRAGMA cache_size = {int(_sqlite_settings['cache_size'])}",
+        f"PRAGMA mmap_size = {int(_sqlite_settings['mmap_size'])}",
+    ]
+    if read_only:
+        return pragmas + ['PRAGMA query_only = ON']
+    # journal_mode queda guardado en el archivo; las lectoras lo heredan
+    return pragmas + [
+        f"PRAGMA journal_mode = {_sqlite_settings['journal_mode']}",
+        f"PRAGMA synchronous = {_sqlite_settings['synchronous']}",
+    ]
+
+
+def _connect(database_url, read_only=False):
+    """Open a new physical connection (no pooling)"""
     if database_url and database_url.startswith('postgres'):
         # PostgreSQL para producción
         import psycopg2
         import psycopg2.extras
-        
-        # Render usa postgres:// pero psycopg2 necesita postgresql://
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
-        conn = psycopg2.connect(database_url)
+
+        # Filas accesibles por índice y por nombre, igual que sqlite3.Row
+        conn = psycopg2.connect(database_url, cursor_factory=psycopg2.extras.DictCursor)
+        if read_only:
+            conn.set_session(readonly=True)
         return conn
     else:
-        # SQLite para desarrollo local
-        db_path = Path(__file__).parent / 'lottery.db'
-        conn = sqlite3.connect(str(db_path))
+        # SQLite para desarrollo local (o una réplica sqlite:///path de prueba)
+        db_path = _sqlite_path(database_url)
+        # El pool puede entregar la conexión a otro hilo del mismo worker
+        if read_only:
+            conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for pragma in sqlite_pragmas(read_only):
+            conn.execute(pragma)
         return conn
 
 
+def configure_pool(app_config):
+    """Load pool settings from the Flask config (DB_POOL_* keys)"""
+    for key in _pool_settings:
+        config_key = f'DB_POOL_{key.upper()}'
+        if config_key in app_config:
+            _pool_settings[key] = app_config[config_key]
+    _query_settings['prepare'] = app_config.get('DB_PREPARED_STATEMENTS', _query_settings['prepare'])
+    for key in _sqlite_settings:
+        config_key = f'SQLITE_{key.upper()}'
+        if config_key in app_config:
+            _sqlite_settings[key] = app_config[config_key]
+    _read_settings['urls'] = tuple(_normalize_url(url) for url in app_config.get('DATABASE_READ_URLS', ()))
+    _read_settings['retry_after'] = app_config.get('DB_READ_RETRY_AFTER', _read_settings['retry_after'])
+    _replica_state['down_until'].clear()
+    _backend.clear()
+    close_pools()
+
+
+def get_pool(database_url=None):
+    """Return the connection pool for a DSN, creating it on first use"""
+    if database_url is None:
+        database_url = _database_url()
+    key = database_url or f'sqlite:{_sqlite_path()}'
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools.setdefault(key, ConnectionPool(
+            lambda: _connect(database_url),
+            name='primary',
+            **_pool_settings
+        ))
+    return pool
+
+
+def get_read_pool():
+    """Pool for read-only queries, or the primary pool when there is none
+
+    On tuned SQLite the readers get their own ``mode=ro`` connections: in WAL
+    mode they read the last committed snapshot while an upload holds the
+    write lock, and can never take it themselves.
+    """
+    database_url = _database_url()
+    if database_url or not _sqlite_settings['tuned']:
+        return get_pool(database_url)
+    key = f'sqlite-ro:{_sqlite_path()}'
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools.setdefault(key, ConnectionPool(
+            lambda: _connect(None, read_only=True),
+            name='read',
+            **_pool_settings
+        ))
+    return pool
+
+
+def _replica_pool(number, database_url):
+    pool = _pools.get(f'replica:{database_url}')
+    if pool is None:
+        pool = _pools.setdefault(f'replica:{database_url}', ConnectionPool(
+            lambda: _connect(database_url, read_only=True),
+            name=f'replica{number}',
+            **_pool_settings
+        ))
+    return pool
+
+
+def _replica_order():
+    """Healthy replicas as ``[(number, url)]``, starting at the next round-robin turn"""
+    now = time.monotonic()
+    healthy = [(number, url) for number, url in enumerate(_read_settings['urls'], 1)
+               if _replica_state['down_until'].get(url, 0.0) <= now]
+    if not healthy:
+        return []
+    start = next(_replica_state['turn']) % len(healthy)
+    return healthy[start:] + healthy[:start]
+
+
+def _mark_replica_down(number, database_url, error):
+    """Skip a replica for DB_READ_RETRY_AFTER seconds after a failed checkout"""
+    _replica_state['down_until'][database_url] = time.monotonic() + _read_settings['retry_after']
+    logger.warning('Read replica unavailable, falling back', extra={
+        'replica': f'replica{number}', 'error': str(error), 'retry_after': _read_settings['retry_after'],
+    })
+
+
+def close_pools():
+    """Close idle connections of every pool and forget them"""
+    for pool in list(_pools.values()):
+        pool.closeall()
+    _pools.clear()
+
+
+def pool_metrics():
+    """Metrics snapshot for every pool in this process"""
+    return {key: pool.metrics() for key, pool in _pools.items()}
+
+
+def get_db_connection():
+    """Get a connection to the database (SQLite or PostgreSQL)
+
+    The connection is borrowed from the worker's pool; calling close()
+    returns it. Inside a request any connection that was not closed is
+    returned automatically when the app context is torn down.
+    """
+    conn = get_pool().getconn()
+
+    if has_app_context():
+        g.setdefault('_db_connections', []).append(conn)
+
+    return conn
+
+
+def get_read_connection(fresh=None, replicas=True):
+    """Get a connection for queries that never write (statistics, history pages)
+
+    With DATABASE_READ_URLS the connection comes from the next healthy
+    replica (round-robin); a replica that cannot hand out a connection is
+    skipped for DB_READ_RETRY_AFTER seconds. ``fresh(conn)`` can check that
+    the replica already has what the caller needs (e.g. the user's last
+    write); if it returns False the read goes to the primary instead.
+    Without usable replicas, or with ``replicas=False``, the primary's read
+    path is used (see get_read_pool()). Same contract as get_db_connection().
+    """
+    conn = None
+    reason = 'not_routed' if not (replicas and _read_settings['urls']) else 'unavailable'
+    for number, database_url in (_replica_order() if replicas else []):
+        try:
+            candidate = _replica_pool(number, database_url).getconn()
+        except Exception as e:
+            _mark_replica_down(number, database_url, e)
+            continue
+        try:
+            caught_up = fresh is None or fresh(candidate)
+        except Exception as e:
+            candidate.close()
+            _mark_replica_down(number, database_url, e)
+            continue
+        if caught_up:
+            conn = candidate
+            record_read('replica', 'replica')
+        else:
+            # Réplica atrasada: leer del primario garantiza read-your-writes
+            candidate.close()
+            reason = 'stale'
+        break
+    if conn is None:
+        conn = get_read_pool().getconn()
+        record_read('primary', reason)
+
+    if has_app_context():
+        g.setdefault('_db_connections', []).append(conn)
+
+    return conn
+
+
+def release_db_connections(exception=None):
+    """Return every connection borrowed during the app context to its pool"""
+    for conn in g.pop('_db_connections', []):
+        conn.close()
+
+
 def init_db():
-    """Initialize the database with required tables"""
-    conn = get_db_connection()
-    database_url = os.getenv('DATABASE_URL', '')
-    is_postgres = database_url.startswith('postgres')
-    
-    c = conn.cursor()
-    
-    if is_postgres:
-        # PostgreSQL syntax
-        # Users table
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id SERIAL PRIMARY KEY,
-                      username VARCHAR(255) UNIQUE NOT NULL,
-                      password VARCHAR(255) NOT NULL,
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Sorteos table
-        c.execute('''CREATE TABLE IF NOT EXISTS sorteos
-                     (id SERIAL PRIMARY KEY,
-                      user_id INTEGER NOT NULL,
-                      numbers TEXT NOT NULL,
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      FOREIGN KEY (user_id) REFERENCES users (id))''')
-        
-        # Historical data table
-        c.execute('''CREATE TABLE IF NOT EXISTS historical_data
-                     (id SERIAL PRIMARY KEY,
-                      balota1 INTEGER,
-                      balota2 INTEGER,
-                      balota3 INTEGER,
-                      balota4 INTEGER,
-                      balota5 INTEGER,
-                      balota6 INTEGER,
-                      date TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    else:
-        # SQLite syntax
-        # Users table
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      username TEXT UNIQUE NOT NULL,
-                      password TEXT NOT NULL,
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Sorteos table
-        c.execute('''CREATE TABLE IF NOT EXISTS sorteos
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      user_id INTEGER NOT NULL,
-                      numbers TEXT NOT NULL,
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      FOREIGN KEY (user_id) REFERENCES users (id))''')
-        
-        # Historical data table
-        c.execute('''CREATE TABLE IF NOT EXISTS historical_data
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      balota1 INTEGER,
-                      balota2 INTEGER,
-                      balota3 INTEGER,
-                      balota4 INTEGER,
-                      balota5 INTEGER,
-                      balota6 INTEGER,
-                      date TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    """Bring the schema up to date and build missing derived indexes
+
+    The DDL lives in migrations.py; when the recorded schema version is
+    current this costs a single SELECT instead of re-running every
+    CREATE TABLE IF NOT EXISTS on each worker start.
+    """
+    # Import local: migrations, frequency y analytics dependen de este módulo
+    from migrations import migrate
+    from frequency import ensure_frequencies
+    from analytics import ensure_analytics
     
-    conn.commit()
+    conn = get_db_connection()
+    version, applied = migrate(conn)
+    ensure_frequencies(conn)
+    ensure_analytics(conn)
     conn.close()
-    db_type = "PostgreSQL" if is_postgres else "SQLite"
-    print(f"✅ Database initialized successfully ({db_type})")
+    logger.info('Database initialized', extra={
+        'backend': 'postgresql' if is_postgres() else 'sqlite',
+        'schema_version': version,
+        'migrations_applied': applied,
+    })
 
 
 def close_db_connection(conn):
-    """Close database connection"""
+    """Return database connection to the pool"""
     if conn:
         conn.close()
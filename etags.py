@@ -0,0 +1,72 @@
+"""
+Strong ETags and conditional GET for read endpoints
+ETags are derived from data versions instead of the response body, so an
+unchanged read is answered with 304 before querying or serializing:
+
+- /api/statistics*: the active historical_data generation
+- /api/history/<user_id>: the user's sorteo counter row, whose version is
+  bumped by every insert, update and delete of that user's sorteos
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, request
+
+# Sufijos que compression.py agrega al ETag de una respuesta comprimida
+ENCODING_SUFFIXES = ('', '-gzip', '-br')
+
+
+def make_etag(*parts):
+    """Opaque ETag value (unquoted) for a data version and the request's query"""
+    key = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def query_key(args):
+    """Query string in a canonical order, so ?a=1&b=2 and ?b=2&a=1 share an ETag"""
+    return '&'.join(f'{key}={value}' for key, value in sorted(args.items(multi=True)))
+
+
+def etag_matches(if_none_match, etag):
+    """True if If-None-Match lists ``etag`` in any of its encodings (or is '*')"""
+    return any(if_none_match.contains(etag + suffix) for suffix in ENCODING_SUFFIXES)
+
+
+def history_etag_for(user_id, count, version, args):
+    """ETag of a history page: the user's history (count, version) plus the query"""
+    return make_etag('history', user_id, count, version, query_key(args))
+
+
+def statistics_etag_for(path, generation, args):
+    """ETag of a statistics endpoint: the active data generation plus the query"""
+    return make_etag(path, generation, query_key(args))
+
+
+def tag_response(response, etag, cache_control):
+    """Set the ETag and Cache-Control of a 200/304 conditional response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def conditional(etag_for, cache_control):
+    """Answer 304 when If-None-Match matches ``etag_for(*args, **kwargs)``
+
+    ``etag_for`` returns None to skip the check (e.g. forbidden requests).
+    Successful responses carry the ETag and ``cache_control``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_for(*args, **kwargs)
+            if etag is None:
+                return view(*args, **kwargs)
+            if etag_matches(request.if_none_match, etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return tag_response(response, etag, cache_control)
+        return wrapper
+    return decorator
@@ -0,0 +1,95 @@
+"""
+Frequency index for historical draws
+Keeps number_frequency (generation, position, number) -> count in sync with
+historical_data so sorteo/statistics read at most 43 rows instead of
+scanning every draw
+"""
+import numpy as np
+
+from database import execute_query, execute_many
+from generations import ACTIVE_GENERATION_SQL, read_generation
+
+BONUS_POSITION = 6
+
+
+def rebuild_frequencies(conn, generation):
+    """Recompute the index of one generation from historical_data in a single statement"""
+    generation = int(generation)
+    execute_query(conn, 'DELETE FROM number_frequency WHERE generation = ?', (generation,))
+    selects = ' UNION ALL '.join(
+        f'SELECT {generation}, {i}, balota{i}, COUNT(*) FROM historical_data '
+        f'WHERE generation = {generation} AND balota{i} IS NOT NULL GROUP BY balota{i}'
+        for i in range(1, 7)
+    )
+    execute_query(conn, f'INSERT INTO number_frequency (generation, position, number, count) {selects}')
+
+
+def count_draws(draws):
+    """Per-position counts of an N x 6 draw array as a 6 x 44 matrix (index = number)"""
+    draws = np.asarray(draws, dtype=np.int64).reshape(-1, 6)
+    return np.stack([np.bincount(draws[:, i], minlength=44)[:44] for i in range(6)])
+
+
+def apply_counts(conn, counts, generation, sign=1):
+    """Add (sign=1) or subtract (sign=-1) a 6 x 44 count matrix to a generation"""
+    positions, numbers = np.nonzero(counts)
+    if len(positions) == 0:
+        return
+
+    execute_many(
+        conn,
+        '''INSERT INTO number_frequency (generation, position, number, count) VALUES (?, ?, ?, ?)
+           ON CONFLICT (generation, position, number)
+           DO UPDATE SET count = number_frequency.count + excluded.count''',
+        [(generation, int(p) + 1, int(n), sign * int(counts[p, n]))
+         for p, n in zip(positions, numbers)]
+    )
+
+
+def apply_draws(conn, draws, generation, sign=1):
+    """Incrementally add (sign=1) or remove (sign=-1) draws from the index
+
+    ``draws`` is an N x 6 array or a list of 6-number sequences
+    (5 balotas + balota extra).
+    """
+    if len(draws) == 0:
+        return
+    apply_counts(conn, count_draws(draws), generation, sign)
+
+
+def ensure_frequencies(conn):
+    """Build the active generation's index if it is missing but draws exist"""
+    generation = read_generation(conn)
+    c = execute_query(conn, 'SELECT 1 FROM number_frequency WHERE generation = ? LIMIT 1', (generation,))
+    if c.fetchone() is not None:
+        return
+    c = execute_query(conn, 'SELECT 1 FROM historical_data WHERE generation = ? LIMIT 1', (generation,))
+    if c.fetchone() is None:
+        return
+    rebuild_frequencies(conn, generation)
+    conn.commit()
+
+
+def get_top_frequent(conn, n=3):
+    """Top ``n`` main-ball numbers (positions 1-5) as [(number, count), ...]"""
+    c = execute_query(
+        conn,
+        f'''SELECT number, SUM(count) AS total FROM number_frequency
+            WHERE generation = {ACTIVE_GENERATION_SQL} AND position <= 5
+            GROUP BY number
+            HAVING SUM(count) > 0
+            ORDER BY total DESC, number ASC LIMIT ?''',
+        (n,)
+    )
+    return [(row[0], row[1]) for row in c.fetchall()]
+
+
+def get_position_counts(conn, position):
+    """Count per number for a single position as {number: count}"""
+    c = execute_query(
+        conn,
+        f'''SELECT number, count FROM number_frequency
+            WHERE generation = {ACTIVE_GENERATION_SQL} AND position = ? AND count > 0''',
+        (position,)
+    )
+    return {row[0]: row[1] for row in c.fetchall()}
@@ -0,0 +1,116 @@
+"""
+Dataset generations for historical_data (double buffering)
+Every load writes its rows under a fresh generation number and becomes
+visible with a single pointer flip in data_generation; readers always
+filter by the active generation and old generations are deleted later
+"""
+from database import execute_query
+
+HISTORICAL_DATA = 'historical_data'
+SEQUENCE = 'historical_data_seq'
+
+# Subconsulta para filtrar por la generación activa en una sola sentencia
+ACTIVE_GENERATION_SQL = (
+    "(SELECT generation FROM data_generation WHERE name = 'historical_data')"
+)
+
+# Filas borradas por sentencia al limpiar generaciones viejas
+DELETE_BATCH_SIZE = 10_000
+
+# Tablas derivadas de historical_data, con una copia por generación
+DERIVED_TABLES = ['number_frequency', 'number_pairs', 'number_triples', 'number_gaps', 'number_windows']
+
+
+def read_generation(conn, name=HISTORICAL_DATA):
+    """Current generation number for a dataset"""
+    c = execute_query(conn, 'SELECT generation FROM data_generation WHERE name = ?', (name,))
+    row = c.fetchone()
+    return row[0] if row else 0
+
+
+def allocate_generation(conn):
+    """Reserve a new, never used generation number and commit"""
+    execute_query(
+        conn,
+        'UPDATE data_generation SET generation = generation + 1 WHERE name = ?',
+        (SEQUENCE,)
+    )
+    generation = read_generation(conn, SEQUENCE)
+    conn.commit()
+    return generation
+
+
+def activate_generation(conn, generation, expected):
+    """Atomically point readers at ``generation`` and commit
+
+    Only succeeds if the active generation is still ``expected`` (the one
+    the load started from); returns False when another upload won the race.
+    """
+    c = execute_query(
+        conn,
+        'UPDATE data_generation SET generation = ? WHERE name = ? AND generation = ?',
+        (generation, HISTORICAL_DATA, expected)
+    )
+    conn.commit()
+    return c.rowcount == 1
+
+
+def copy_generation(conn, source, target):
+    """Copy the draws and frequency index of one generation into another"""
+    execute_query(
+        conn,
+        '''INSERT INTO historical_data
+           (balota1, balota2, balota3, balota4, balota5, balota6, date, generation)
+           SELECT balota1, balota2, balota3, balota4, balota5, balota6, date, ?
+           FROM historical_data WHERE generation = ? ORDER BY id''',
+        (target, source)
+    )
+    execute_query(
+        conn,
+        '''INSERT INTO number_frequency (generation, position, number, count)
+           SELECT ?, position, number, count FROM number_frequency WHERE generation = ?''',
+        (target, source)
+    )
+
+
+def _delete_in_batches(conn, where, params):
+    deleted = 0
+    while True:
+        c = execute_query(
+            conn,
+            f'''DELETE FROM historical_data WHERE id IN
+                (SELECT id FROM historical_data WHERE {where} LIMIT {DELETE_BATCH_SIZE})''',
+            params
+        )
+        conn.commit()
+        if c.rowcount <= 0:
+            break
+        deleted += c.rowcount
+    for table in DERIVED_TABLES:
+        execute_query(conn, f'DELETE FROM {table} WHERE {where}', params)
+    conn.commit()
+    return deleted
+
+
+def discard_generation(conn, generation):
+    """Delete every row of a generation that will never be activated"""
+    conn.rollback()
+    return _delete_in_batches(conn, 'generation = ?', (generation,))
+
+
+def delete_stale_generations(conn):
+    """Drop generations older than the active one and abandoned partial loads
+
+    Generations newer than the active one are kept while an upload job that
+    owns them is still queued or running. Deletes in small batches, each in
+    its own transaction, so the live table is never locked for long.
+    """
+    active = read_generation(conn)
+    conn.commit()
+    return _delete_in_batches(
+        conn,
+        '''(generation < ? OR (generation > ? AND generation NOT IN
+               (SELECT generation FROM upload_jobs
+                WHERE status IN ('queued', 'running') AND generation IS NOT NULL)))''',
+        (active, active)
+    )
@@ -0,0 +1,102 @@
+"""
+Gunicorn configuration
+Every setting comes from the GUNICORN_* keys of config.py (overridable by
+environment variables), so concurrency can be tuned per instance size
+without code changes:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master runs create_app() (and init_db()) once and the
+workers are forked from it; post_fork drops the state that must not be
+shared across processes.
+"""
+import os
+import tempfile
+
+# Directorio compartido por los workers para agregar /metrics; debe existir
+# antes de importar config.py, que lee METRICS_DIR
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'sorteo-metrics-{os.getpid()}'))
+
+from config import config as app_configs
+
+settings = app_configs[os.environ.get('FLASK_ENV', 'production')]
+# CPUs que este proceso puede usar (en un contenedor cpu_count() da los del host)
+cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+# Solo clases que no necesitan dependencias fuera de requirements.txt
+WORKER_CLASSES = ('sync', 'gthread')
+
+
+def default_workers(worker_class):
+    """Worker count for the number of cores when GUNICORN_WORKERS is 0
+
+    Capped at GUNICORN_MAX_AUTO_WORKERS: every worker has its own DB pool,
+    hashing process and upload threads, and the cap keeps a small instance
+    (512 MB on Render) within its memory even if it reports many cores.
+    """
+    if worker_class == 'gthread':
+        # Los hilos cubren la espera de I/O; un worker extra por si uno se recicla
+        count = cores + 1
+    else:
+        count = 2 * cores + 1
+    return min(count, settings.GUNICORN_MAX_AUTO_WORKERS)
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+worker_class = settings.GUNICORN_WORKER_CLASS
+if worker_class not in WORKER_CLASSES:
+    raise RuntimeError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, got {worker_class!r}")
+workers = settings.GUNICORN_WORKERS or default_workers(worker_class)
+threads = settings.GUNICORN_THREADS if worker_class == 'gthread' else 1
+preload_app = settings.GUNICORN_PRELOAD
+max_requests = settings.GUNICORN_MAX_REQUESTS
+max_requests_jitter = settings.GUNICORN_MAX_REQUESTS_JITTER
+keepalive = settings.GUNICORN_KEEPALIVE
+timeout = settings.GUNICORN_TIMEOUT
+graceful_timeout = settings.GUNICORN_GRACEFUL_TIMEOUT
+accesslog = '-'
+
+
+def on_starting(server):
+    from metrics import reset_metrics_dir
+
+    reset_metrics_dir(settings.METRICS_DIR)
+    server.log.info(
+        "Worker model: %s x%d (threads=%d, preload=%s, max_requests=%d±%d)",
+        worker_class, workers, threads, preload_app, max_requests, max_requests_jitter
+    )
+    if worker_class == 'gthread' and threads > settings.DB_POOL_MAX_SIZE:
+        server.log.warning(
+            "GUNICORN_THREADS=%d > DB_POOL_MAX_SIZE=%d: threads will wait for connections",
+            threads, settings.DB_POOL_MAX_SIZE
+        )
+
+
+def when_ready(server):
+    """Master: close the connections init_db() opened so no worker inherits them"""
+    if preload_app:
+        from database import close_pools
+
+        close_pools()
+
+
+def child_exit(server, worker):
+    """Master: fold the exited worker's metrics snapshot into dead.json"""
+    from metrics import collect_dead_worker
+
+    try:
+        collect_dead_worker(settings.METRICS_DIR, worker.pid)
+    except OSError as e:
+        server.log.warning("Could not collect metrics of worker %s: %s", worker.pid, e)
+
+
+def post_fork(server, worker):
+    """Worker: start with empty pools (connections are never shared across fork)"""
+    from database import close_pools
+    from logs import restart_logging
+    from metrics import registry
+
+    close_pools()
+    # Las consultas de init_db() en el master no cuentan para ningún worker
+    registry.reset()
+    restart_logging()
@@ -0,0 +1,331 @@
+"""
+Paginated sorteo history
+Pages are read with keyset pagination on (created_at, id) using the
+idx_sorteos_user_created index, so every page costs the same no matter how
+deep the cursor is; totals come from the user_sorteo_counts counter table
+
+Sorteos are stored as six small-int columns (balota1-5 + balota6 extra),
+so rows decode without string parsing and "contains number N" is a plain
+SQL condition evaluated inside the user's index range
+"""
+import base64
+import binascii
+
+from database import execute_query
+
+SORTEO_COLUMNS = ['balota1', 'balota2', 'balota3', 'balota4', 'balota5', 'balota6']
+MAIN_COLUMNS = ', '.join(SORTEO_COLUMNS[:5])
+
+# Filas por sentencia en las operaciones masivas (7 parámetros por fila)
+BULK_CHUNK_SIZE = 1000
+
+
+class InvalidNumbersError(ValueError):
+    """Raised when a sorteo is not 5 distinct balls 1-43 plus an extra ball 1-16"""
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a ``before`` cursor cannot be decoded"""
+
+
+def encode_cursor(created_at, sorteo_id):
+    """Opaque cursor pointing just after (created_at, id)"""
+    raw = f'{created_at}|{sorteo_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor: (created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, sorteo_id = raw.rsplit('|', 1)
+        return created_at, int(sorteo_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError('Cursor inválido')
+
+
+def validate_numbers(numbers):
+    """Return the sorteo as 6 ints or raise InvalidNumbersError"""
+    if not isinstance(numbers, (list, tuple)) or len(numbers) != 6:
+        raise InvalidNumbersError('Invalid numbers format')
+    if not all(isinstance(n, int) and not isinstance(n, bool) for n in numbers):
+        raise InvalidNumbersError('Numbers must be integers')
+    for i in range(5):
+        if not (1 <= numbers[i] <= 43):
+            raise InvalidNumbersError(f'Number {i+1} must be between 1-43')
+    if len(set(numbers[:5])) != 5:
+        raise InvalidNumbersError('The first five numbers must be different')
+    if not (1 <= numbers[5] <= 16):
+        raise InvalidNumbersError('Sixth number must be between 1-16')
+    return list(numbers)
+
+
+def is_sorteo_id(value):
+    """True for a positive int id (bools excluded)"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def bulk_items_error(items, max_items):
+    """Error message for a bulk request list that is empty, not a list or too long; None if fine"""
+    if not isinstance(items, list) or not items:
+        return 'Missing data'
+    if len(items) > max_items:
+        return f'At most {max_items} items per request'
+    return None
+
+
+def validate_bulk_saves(sorteos):
+    """Per-item results and the valid sorteos of a bulk save: ``(results, valid)``"""
+    results = []
+    valid = []
+    for index, numbers in enumerate(sorteos):
+        try:
+            valid.append(validate_numbers(numbers))
+            results.append({'index': index, 'success': True})
+        except InvalidNumbersError as e:
+            results.append({'index': index, 'success': False, 'error': str(e)})
+    return results, valid
+
+
+def validate_bulk_ids(ids):
+    """Per-item results and the valid, distinct ids of a bulk delete: ``(results, valid)``"""
+    results = []
+    valid = []
+    seen = set()
+    for index, sorteo_id in enumerate(ids):
+        if not is_sorteo_id(sorteo_id):
+            results.append({'index': index, 'id': sorteo_id, 'success': False, 'error': 'Invalid id'})
+        elif sorteo_id in seen:
+            results.append({'index': index, 'id': sorteo_id, 'success': False, 'error': 'Duplicate id'})
+        else:
+            valid.append(sorteo_id)
+            seen.add(sorteo_id)
+            results.append({'index': index, 'id': sorteo_id, 'success': True})
+    return results, valid
+
+
+def validate_bulk_updates(items):
+    """Per-item results and the valid ``(id, numbers)`` of a bulk update: ``(results, valid)``"""
+    results = []
+    valid = []
+    seen = set()
+    for index, item in enumerate(items):
+        sorteo_id = item.get('id') if isinstance(item, dict) else None
+        result = {'index': index, 'id': sorteo_id, 'success': False}
+        results.append(result)
+        if not is_sorteo_id(sorteo_id):
+            result['error'] = 'Invalid id'
+            continue
+        if sorteo_id in seen:
+            result['error'] = 'Duplicate id'
+            continue
+        try:
+            valid.append((sorteo_id, validate_numbers(item.get('numbers'))))
+        except InvalidNumbersError as e:
+            result['error'] = str(e)
+            continue
+        seen.add(sorteo_id)
+        result['success'] = True
+    return results, valid
+
+
+def attach_ids(results, ids):
+    """Give every successful result of a bulk save its new id, in order"""
+    ids = iter(ids)
+    for result in results:
+        if result['success']:
+            result['id'] = next(ids)
+
+
+def mark_missing(results, found):
+    """Fail the successful results whose id is not in ``found`` (not the user's or gone)"""
+    for result in results:
+        if result['success'] and result['id'] not in found:
+            result.update(success=False, error='Sorteo not found')
+
+
+def bulk_result(results, **extra):
+    """Body and status of a bulk response: 200 if at least one item succeeded, 400 otherwise"""
+    succeeded = sum(1 for result in results if result['success'])
+    body = {
+        'success': succeeded > 0,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+        **extra
+    }
+    return body, 200 if succeeded else 400
+
+
+def parse_history_args(args, default_limit, max_limit):
+    """Read ``limit``, ``before`` and ``contains`` of a history request
+
+    Returns ``((limit, before, contains), None)`` or ``(None, error)``.
+    Callers check that the user may read the history first, so a request
+    for someone else's history never sees these validation messages.
+    """
+    try:
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        return None, 'limit must be an integer'
+    if not (1 <= limit <= max_limit):
+        return None, f'limit must be between 1 and {max_limit}'
+    before = args.get('before') or None
+    try:
+        contains = [int(n) for n in args.get('contains', '').split(',') if n.strip()]
+    except ValueError:
+        return None, 'contains must be a comma separated list of numbers'
+    if not all(1 <= n <= 43 for n in contains):
+        return None, 'contains numbers must be between 1-43'
+    return (limit, before, contains), None
+
+
+def history_page_query(user_id, limit, before=None, contains=None, parse_timestamp=None):
+    """SQL and params for one page of a user's sorteos, newest first
+
+    One row more than ``limit`` is requested so split_page() can tell
+    whether another page exists. ``contains`` restricts the page to sorteos
+    whose main balls include every number in it. ``parse_timestamp``
+    converts the cursor's created_at for drivers that need a datetime.
+    """
+    where = 'user_id = ?'
+    params = [user_id]
+    if before is not None:
+        created_at, sorteo_id = decode_cursor(before)
+        if parse_timestamp is not None:
+            try:
+                created_at = parse_timestamp(created_at)
+            except ValueError:
+                raise InvalidCursorError('Cursor inválido')
+        where += ' AND (created_at, id) < (?, ?)'
+        params += [created_at, sorteo_id]
+    for number in contains or ():
+        where += f' AND ? IN ({MAIN_COLUMNS})'
+        params.append(number)
+
+    sql = f'''SELECT id, {', '.join(SORTEO_COLUMNS)}, created_at FROM sorteos
+              WHERE {where}
+              ORDER BY created_at DESC, id DESC LIMIT ?'''
+    return sql, params + [limit + 1]
+
+
+def split_page(rows, limit):
+    """Trim the extra row of a page; returns ``(rows, next_cursor)``"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[7], last[0])
+
+
+def fetch_history_page(conn, user_id, limit, before=None, contains=None):
+    """One page of a user's sorteos, newest first
+
+    Returns ``(rows, next_cursor)`` where rows are
+    (id, balota1, ..., balota6, created_at) and next_cursor is None on the
+    last page.
+    """
+    sql, params = history_page_query(user_id, limit, before, contains)
+    return split_page(execute_query(conn, sql, params, prepare=True).fetchall(), limit)
+
+
+# Cada escritura también sube la versión del historial (ETag de /api/history)
+ADJUST_COUNT_SQL = '''INSERT INTO user_sorteo_counts (user_id, count, version) VALUES (?, ?, 1)
+                      ON CONFLICT (user_id) DO UPDATE SET count = user_sorteo_counts.count + excluded.count,
+                                                          version = user_sorteo_counts.version + 1'''
+
+COUNT_SQL = 'SELECT count FROM user_sorteo_counts WHERE user_id = ?'
+
+VERSION_SQL = 'SELECT count, version FROM user_sorteo_counts WHERE user_id = ?'
+
+
+def adjust_sorteo_count(conn, user_id, delta):
+    """Add ``delta`` to a user's sorteo counter (same transaction as the write)
+
+    Also bumps the user's history version; updates pass ``delta=0``.
+    """
+    execute_query(conn, ADJUST_COUNT_SQL, (user_id, delta), prepare=True)
+
+
+def get_sorteo_count(conn, user_id):
+    """Number of saved sorteos of a user, read from the counter table"""
+    row = execute_query(conn, COUNT_SQL, (user_id,), prepare=True).fetchone()
+    return row[0] if row else 0
+
+
+def get_history_version(conn, user_id):
+    """``(count, version)`` of a user's history; changes on every write"""
+    row = execute_query(conn, VERSION_SQL, (user_id,), prepare=True).fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_statements(user_id, sorteos):
+    """Multi-row INSERT ... RETURNING id statements for validated sorteos of one user"""
+    for chunk in _chunks(sorteos):
+        values = ', '.join(['(?, ?, ?, ?, ?, ?, ?)'] * len(chunk))
+        yield (
+            f'''INSERT INTO sorteos (user_id, {', '.join(SORTEO_COLUMNS)})
+                VALUES {values} RETURNING id''',
+            [value for numbers in chunk for value in (user_id, *numbers)]
+        )
+
+
+def delete_statements(ids, user_id):
+    """DELETE ... RETURNING id statements for a user's sorteos"""
+    for chunk in _chunks(ids):
+        yield (
+            f'''DELETE FROM sorteos
+                WHERE user_id = ? AND id IN ({', '.join(['?'] * len(chunk))}) RETURNING id''',
+            [user_id, *chunk]
+        )
+
+
+def update_statements(items, user_id):
+    """UPDATE ... FROM (VALUES) ... RETURNING id statements for ``[(id, numbers), ...]``"""
+    assignments = ', '.join(f'{column} = v.{column}' for column in SORTEO_COLUMNS)
+    # Tipos explícitos: PostgreSQL no puede inferirlos dentro de VALUES
+    row = '(' + ', '.join(['CAST(? AS INTEGER)'] * 7) + ')'
+    for chunk in _chunks(items):
+        yield (
+            f'''WITH v (id, {', '.join(SORTEO_COLUMNS)}) AS (VALUES {', '.join([row] * len(chunk))})
+                UPDATE sorteos SET {assignments}
+                FROM v WHERE sorteos.id = v.id AND sorteos.user_id = ?
+                RETURNING sorteos.id''',
+            [value for sorteo_id, numbers in chunk for value in (sorteo_id, *numbers)] + [user_id]
+        )
+
+
+def _returned_ids(conn, statements):
+    ids = []
+    for sql, params in statements:
+        ids.extend(row[0] for row in execute_query(conn, sql, params).fetchall())
+    return ids
+
+
+def insert_sorteos(conn, user_id, sorteos):
+    """Insert validated sorteos of one user with multi-row INSERTs; returns their ids"""
+    ids = _returned_ids(conn, insert_statements(user_id, sorteos))
+    if ids:
+        adjust_sorteo_count(conn, user_id, len(ids))
+    return ids
+
+
+def delete_sorteos(conn, ids, user_id):
+    """Delete a user's sorteos by id; returns the ids that existed"""
+    deleted = _returned_ids(conn, delete_statements(ids, user_id))
+    if deleted:
+        adjust_sorteo_count(conn, user_id, -len(deleted))
+    return deleted
+
+
+def update_sorteos(conn, items, user_id):
+    """Apply ``[(id, numbers), ...]`` to a user's sorteos; returns the ids that were updated"""
+    updated = _returned_ids(conn, update_statements(items, user_id))
+    if updated:
+        adjust_sorteo_count(conn, user_id, 0)
+    return updated
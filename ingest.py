@@ -0,0 +1,317 @@
+"""
+Bulk ingestion of historical draws
+Parses 'resultado' columns with vectorized NumPy operations and loads the
+draw arrays with COPY FROM STDIN on PostgreSQL and a single executemany
+transaction on SQLite instead of one INSERT per row
+"""
+import io
+import logging
+import warnings
+
+import numpy as np
+
+from analytics import DrawAnalytics, save_analytics
+from database import execute_many, is_postgres
+from frequency import count_draws, rebuild_frequencies, apply_counts
+from generations import (read_generation, activate_generation, copy_generation,
+                         discard_generation)
+from metrics import PhaseTimer
+from xlsx_reader import iter_column_batches
+
+logger = logging.getLogger(__name__)
+
+BALOTA_COLUMNS = ['balota1', 'balota2', 'balota3', 'balota4', 'balota5', 'balota6']
+
+# Filas por lote: acota la memoria de los buffers intermedios
+CHUNK_SIZE = 50_000
+
+# Filas leídas del Excel por lote en modo streaming
+STREAM_BATCH_SIZE = 5_000
+
+# Máximo de filas inválidas detalladas en la respuesta
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRowsError(Exception):
+    """Raised when one or more 'resultado' values cannot be parsed"""
+
+    def __init__(self, errors, total=None):
+        self.errors = errors
+        self.total = total if total is not None else len(errors)
+        super().__init__(f'{self.total} filas inválidas')
+
+
+def _parse_tokens(text, rows):
+    """Parse the 6 numbers of each row into a float matrix (NaN = not a number)
+
+    Fast path: one C-level np.fromstring over the whole text. If any token is
+    not an integer, falls back to pd.to_numeric over all tokens so the
+    offending rows end up with NaN and can be reported.
+    """
+    joined = ' '.join(text).replace('-', ' ')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            values = np.fromstring(joined, dtype=np.int64, sep=' ')
+        except (ValueError, DeprecationWarning):
+            values = None
+    if values is not None and values.size == rows * 6:
+        return values.reshape(rows, 6).astype(np.float64)
+
+    # pandas solo hace falta para reportar filas inválidas: import perezoso
+    # para no cargarlo en cada worker al arrancar
+    import pandas as pd
+    
+    tokens = pd.Series('-'.join(text).split('-'), dtype=object).str.strip()
+    values = pd.to_numeric(tokens, errors='coerce').to_numpy(dtype=np.float64)
+    return values.reshape(rows, 6)
+
+
+def parse_resultados(resultados, first_row=2):
+    """Vectorized parse of 'n1-n2-n3-n4-n5-n6' strings
+
+    Returns ``(draws, errors)``: an int64 array with the six balotas of every
+    valid row and a list of ``{'row', 'value', 'error'}`` for the invalid
+    ones. ``row`` is the spreadsheet row number (``first_row`` for the first
+    value, i.e. 2 when row 1 holds the headers).
+    """
+    text = [str(value).strip() for value in resultados]
+    total = len(text)
+    counts = np.fromiter((t.count('-') for t in text), dtype=np.int64, count=total) + 1
+
+    values = np.full((total, 6), np.nan)
+    well_formed = counts == 6
+    if well_formed.any():
+        selected = [t for t, ok in zip(text, well_formed) if ok] if not well_formed.all() else text
+        values[well_formed] = _parse_tokens(selected, len(selected))
+
+    main = values[:, :5]
+    bonus = values[:, 5]
+    not_numeric = well_formed & (np.isnan(values).any(axis=1) | (values != np.floor(values)).any(axis=1))
+    checked = well_formed & ~not_numeric
+    main_out_of_range = checked & ((main < 1) | (main > 43)).any(axis=1)
+    bonus_out_of_range = checked & ~main_out_of_range & ((bonus < 1) | (bonus > 16))
+    invalid = ~well_formed | not_numeric | main_out_of_range | bonus_out_of_range
+
+    errors = []
+    for idx in np.flatnonzero(invalid):
+        if not well_formed[idx]:
+            message = f'Formato inválido: se esperan 6 números, se encontraron {counts[idx]}'
+        elif not_numeric[idx]:
+            message = 'Formato inválido: todos los valores deben ser enteros'
+        elif main_out_of_range[idx]:
+            message = 'Los primeros 5 números deben estar entre 1 y 43'
+        else:
+            message = 'El sexto número debe estar entre 1 y 16'
+        errors.append({'row': int(first_row + idx), 'value': text[idx], 'error': message})
+
+    draws = values[~invalid].astype(np.int64)
+    return draws, errors
+
+
+def as_draw_array(columns):
+    """Stack six column arrays (or an N x 6 array) into a contiguous int64 matrix"""
+    if isinstance(columns, np.ndarray) and columns.ndim == 2:
+        draws = columns
+    else:
+        draws = np.column_stack([np.asarray(col) for col in columns])
+    if draws.shape[1] != len(BALOTA_COLUMNS):
+        raise ValueError(f'Se esperan {len(BALOTA_COLUMNS)} columnas, se recibieron {draws.shape[1]}')
+    return np.ascontiguousarray(draws, dtype=np.int64)
+
+
+def _copy_chunk(cursor, chunk):
+    """Stream one chunk to PostgreSQL through COPY FROM STDIN"""
+    buffer = io.StringIO()
+    # tolist() convierte a int de Python en C; el join evita un format por celda
+    buffer.write('\n'.join(map(','.join, chunk.astype(str).tolist())))
+    buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY historical_data ({', '.join(BALOTA_COLUMNS)}, generation) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def bulk_insert_historical(conn, columns, generation=0, chunk_size=CHUNK_SIZE):
+    """Insert draws of one generation into historical_data without committing
+
+    ``columns`` is an N x 6 integer array or a sequence of six column arrays.
+    Returns the number of rows inserted. The caller owns the transaction.
+    """
+    draws = as_draw_array(columns)
+    total = len(draws)
+    if total == 0:
+        return 0
+    draws = np.column_stack([draws, np.full(total, generation, dtype=np.int64)])
+
+    if is_postgres():
+        cursor = conn.cursor()
+        for start in range(0, total, chunk_size):
+            _copy_chunk(cursor, draws[start:start + chunk_size])
+        cursor.close()
+    else:
+        query = f'''INSERT INTO historical_data ({', '.join(BALOTA_COLUMNS)}, generation)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)'''
+        for start in range(0, total, chunk_size):
+            execute_many(conn, query, draws[start:start + chunk_size].tolist())
+
+    return total
+
+
+def iter_resultado_batches(file_path, batch_size=STREAM_BATCH_SIZE,
+                           sheet_name='Hoja1', column='resultado'):
+    """Yield ``(first_row, values)`` batches of the 'resultado' column
+
+    The worksheet XML is parsed incrementally (see xlsx_reader), so memory is
+    bounded by ``batch_size`` rather than by the size of the file.
+    """
+    return iter_column_batches(file_path, sheet_name, column, batch_size)
+
+
+def stream_historical(conn, file_path, generation, batch_size=STREAM_BATCH_SIZE, progress=None,
+                      analytics=None, timer=None):
+    """Parse, validate and insert an Excel file batch by batch into ``generation``
+
+    Each batch is committed on its own: rows of a generation that is not
+    active yet are invisible to readers, so no long transaction is needed.
+    Returns ``(rows_inserted, counts)`` where ``counts`` is the 6 x 44 frequency
+    matrix of the inserted draws. Every batch is validated even after an
+    error so all invalid rows are reported; in that case nothing more is
+    inserted and InvalidRowsError is raised (the caller discards the generation).
+    ``progress(rows_parsed, rows_inserted)`` is called after every batch and
+    each inserted batch is fed to ``analytics`` (a DrawAnalytics) when given.
+    Time spent reading, parsing, inserting and indexing is added to ``timer``.
+    """
+    timer = timer if timer is not None else PhaseTimer()
+    errors = []
+    invalid_total = 0
+    parsed = 0
+    inserted = 0
+    counts = np.zeros((6, 44), dtype=np.int64)
+
+    batches = iter_resultado_batches(file_path, batch_size)
+    while True:
+        with timer.phase('read'):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        first_row, values = batch
+        with timer.phase('parse'):
+            draws, batch_errors = parse_resultados(values, first_row)
+        parsed += len(values)
+        if batch_errors:
+            invalid_total += len(batch_errors)
+            errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        if not invalid_total:
+            with timer.phase('insert'):
+                bulk_insert_historical(conn, draws, generation)
+                conn.commit()
+            with timer.phase('index'):
+                counts += count_draws(draws)
+                if analytics is not None:
+                    analytics.add(draws)
+            inserted += len(draws)
+        if progress is not None:
+            progress(parsed, inserted)
+
+    if invalid_total:
+        raise InvalidRowsError(errors, invalid_total)
+    return inserted, counts
+
+
+def load_historical_data(file_path='baloto1.xlsx', timer=None):
+    """Load and process historical data from Excel file (whole sheet in memory)"""
+    import pandas as pd
+    
+    timer = timer if timer is not None else PhaseTimer()
+    try:
+        with timer.phase('read'):
+            df = pd.read_excel(file_path, sheet_name='Hoja1')
+        logger.debug('Loaded DataFrame', extra={'rows': df.shape[0], 'columns': df.shape[1]})
+        
+        if df.empty:
+            raise Exception("Archivo Excel vacío")
+        
+        with timer.phase('parse'):
+            draws, errors = parse_resultados(df['resultado'])
+        if errors:
+            raise InvalidRowsError(errors)
+        logger.debug('Parsed resultado column', extra={'rows': len(df)})
+        
+        df[BALOTA_COLUMNS] = draws
+        
+        return df
+    except InvalidRowsError:
+        raise
+    except Exception as e:
+        logger.error('Error al cargar el archivo', extra={'file': str(file_path), 'error': str(e)})
+        return pd.DataFrame()
+
+
+class SupersededError(Exception):
+    """Raised when another upload was activated while this one was loading"""
+
+
+def load_upload(conn, file_path, generation, mode='replace', batch_size=STREAM_BATCH_SIZE,
+                streaming=True, progress=None, timer=None):
+    """Load an uploaded file as a new generation and activate it atomically
+
+    The draws are written under ``generation`` (see generations.allocate_generation)
+    while readers keep seeing the active one. ``mode='append'`` first copies
+    the active draws into the new generation. The frequency index and the
+    analytics tables are built for the new generation and a single UPDATE
+    flips the pointer. On any error the partial generation is discarded.
+    Returns the number of rows loaded; phase timings are added to ``timer``.
+    """
+    timer = timer if timer is not None else PhaseTimer()
+    base = read_generation(conn)
+    conn.commit()
+    analytics = DrawAnalytics()
+    try:
+        if mode == 'append':
+            with timer.phase('copy'):
+                copy_generation(conn, base, generation)
+                conn.commit()
+                # Los sorteos nuevos van después de los ya cargados
+                analytics.add_generation(conn, base)
+
+        if streaming:
+            # Lee, valida e inserta por lotes con memoria acotada
+            records, counts = stream_historical(conn, file_path, generation, batch_size, progress,
+                                                analytics, timer)
+        else:
+            df = load_historical_data(file_path, timer)
+            draws = df[BALOTA_COLUMNS].to_numpy() if not df.empty else []
+            with timer.phase('insert'):
+                records = bulk_insert_historical(conn, draws, generation) if len(draws) else 0
+                # Confirmar antes del heartbeat: en SQLite una escritura abierta lo bloquea
+                conn.commit()
+            with timer.phase('index'):
+                counts = count_draws(draws) if records else None
+                if records:
+                    analytics.add(draws)
+            if progress is not None:
+                progress(len(df), records)
+
+        if records == 0:
+            raise ValueError('No valid data found in Excel file')
+
+        # Índice de frecuencias de la nueva generación
+        with timer.phase('index'):
+            if mode == 'replace':
+                rebuild_frequencies(conn, generation)
+            else:
+                apply_counts(conn, counts, generation)
+            save_analytics(conn, generation, analytics)
+            conn.commit()
+
+        # Cambio de puntero: los lectores pasan a ver el conjunto completo
+        with timer.phase('activate'):
+            activated = activate_generation(conn, generation, base)
+        if not activated:
+            raise SupersededError('Otra carga se activó mientras se procesaba este archivo')
+    except Exception:
+        discard_generation(conn, generation)
+        raise
+    return records
@@ -0,0 +1,334 @@
+"""
+Background upload jobs
+Uploads are recorded in the upload_jobs table and processed by a small
+per-worker thread pool, so POST /api/upload returns immediately and
+pending jobs are picked up again after a restart
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from database import get_db_connection, execute_query, is_postgres
+from cache import stats_cache
+from generations import allocate_generation, discard_generation, delete_stale_generations
+from ingest import load_upload, InvalidRowsError, STREAM_BATCH_SIZE
+from metrics import PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Valores por defecto; create_app() los sobrescribe con configure_jobs()
+_settings = {
+    'workers': 1,
+    'stale_after': 120.0,
+    'progress_interval': 0.5,
+    'upload_folder': 'uploads',
+    'batch_size': STREAM_BATCH_SIZE,
+    'streaming': True,
+}
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_resumed_pid = None
+
+# Progreso en memoria de los jobs que corre este proceso
+_progress = {}
+
+
+def configure_jobs(app_config):
+    """Load job settings from the Flask config (UPLOAD_JOB_* keys)"""
+    _settings['workers'] = app_config.get('UPLOAD_JOB_WORKERS', _settings['workers'])
+    _settings['stale_after'] = app_config.get('UPLOAD_JOB_STALE_AFTER', _settings['stale_after'])
+    _settings['upload_folder'] = app_config.get('UPLOAD_FOLDER', _settings['upload_folder'])
+    _settings['batch_size'] = app_config.get('UPLOAD_BATCH_SIZE', _settings['batch_size'])
+    _settings['streaming'] = app_config.get('UPLOAD_STREAMING', _settings['streaming'])
+
+
+def upload_folder():
+    folder = Path(_settings['upload_folder'])
+    if not folder.is_absolute():
+        folder = Path(__file__).parent / folder
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def _get_executor():
+    """Thread pool of this process (recreated after fork)"""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=_settings['workers'],
+                thread_name_prefix='upload-job'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def new_job_file():
+    """Fresh job id and the path its upload must be saved to"""
+    job_id = uuid.uuid4().hex
+    return job_id, upload_folder() / f'{job_id}.xlsx'
+
+
+def create_job(file_storage, mode):
+    """Save the uploaded file, record a queued job and schedule it"""
+    job_id, file_path = new_job_file()
+    file_storage.save(str(file_path))
+    queue_job(job_id, file_path, mode)
+    return job_id
+
+
+def queue_job(job_id, file_path, mode):
+    """Record a queued job for an already saved file and schedule it"""
+    conn = get_db_connection()
+    execute_query(
+        conn,
+        '''INSERT INTO upload_jobs (id, status, mode, file_path, created_at)
+           VALUES (?, ?, ?, ?, ?)''',
+        (job_id, QUEUED, mode, str(file_path), time.time())
+    )
+    conn.commit()
+    conn.close()
+
+    _get_executor().submit(run_job, job_id)
+
+
+def _finish(job_id, status, rows_parsed, rows_inserted, error=None, invalid=None):
+    conn = get_db_connection()
+    finished = time.time()
+    execute_query(
+        conn,
+        '''UPDATE upload_jobs
+           SET status = ?, rows_parsed = ?, rows_inserted = ?, error = ?,
+               invalid_count = ?, invalid_rows = ?, finished_at = ?, heartbeat_at = ?
+           WHERE id = ?''',
+        (status, rows_parsed, rows_inserted, error,
+         invalid.total if invalid else 0,
+         json.dumps(invalid.errors) if invalid else None,
+         finished, finished, job_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _claim(job_id):
+    """Atomically move a queued job to running; None if someone else took it"""
+    conn = get_db_connection()
+    now = time.time()
+    c = execute_query(
+        conn,
+        '''UPDATE upload_jobs SET status = ?, started_at = ?, heartbeat_at = ?, worker_pid = ?
+           WHERE id = ? AND status = ?''',
+        (RUNNING, now, now, os.getpid(), job_id, QUEUED)
+    )
+    claimed = c.rowcount == 1
+    row = None
+    if claimed:
+        c = execute_query(conn, 'SELECT mode, file_path, generation FROM upload_jobs WHERE id = ?', (job_id,))
+        row = c.fetchone()
+    conn.commit()
+    conn.close()
+    return (row[0], row[1], row[2]) if claimed else None
+
+
+def _assign_generation(job_id, previous):
+    """Discard a previous attempt's partial rows and reserve a fresh generation"""
+    conn = get_db_connection()
+    if previous is not None:
+        discard_generation(conn, previous)
+    generation = allocate_generation(conn)
+    execute_query(conn, 'UPDATE upload_jobs SET generation = ? WHERE id = ?', (generation, job_id))
+    conn.commit()
+    conn.close()
+    return generation
+
+
+def cleanup_generations():
+    """Delete superseded generations (runs in the job thread pool)"""
+    try:
+        conn = get_db_connection()
+        deleted = delete_stale_generations(conn)
+        conn.close()
+        if deleted:
+            logger.info('Deleted rows from old historical_data generations', extra={'rows': deleted})
+    except Exception:
+        logger.exception('Error cleaning old generations')
+
+
+def schedule_cleanup():
+    _get_executor().submit(cleanup_generations)
+
+
+def _close(conn):
+    if conn is not None:
+        conn.close()
+
+
+def run_job(job_id):
+    """Process one upload job (runs in the worker thread pool)"""
+    claimed = _claim(job_id)
+    if claimed is None:
+        return
+    mode, file_path, previous_generation = claimed
+
+    state = _progress[job_id] = {'rows_parsed': 0, 'rows_inserted': 0, 'saved_at': 0.0}
+
+    def progress(rows_parsed, rows_inserted):
+        state['rows_parsed'] = rows_parsed
+        state['rows_inserted'] = rows_inserted
+        now = time.monotonic()
+        # La carga confirma cada lote, así que el progreso se puede guardar entre lotes
+        if now - state['saved_at'] >= _settings['progress_interval']:
+            state['saved_at'] = now
+            progress_conn = get_db_connection()
+            execute_query(
+                progress_conn,
+                'UPDATE upload_jobs SET rows_parsed = ?, rows_inserted = ?, heartbeat_at = ? WHERE id = ?',
+                (rows_parsed, rows_inserted, time.time(), job_id)
+            )
+            progress_conn.commit()
+            progress_conn.close()
+
+    conn = None
+    timer = PhaseTimer()
+    try:
+        generation = _assign_generation(job_id, previous_generation)
+        conn = get_db_connection()
+        records = load_upload(
+            conn, file_path, generation, mode,
+            batch_size=_settings['batch_size'],
+            streaming=_settings['streaming'],
+            progress=progress,
+            timer=timer
+        )
+        conn.close()
+        stats_cache.invalidate()
+        _finish(job_id, SUCCEEDED, state['rows_parsed'], records)
+        logger.info('Upload job loaded', extra={
+            'job_id': job_id, 'records': records,
+            'phases': {name: round(seconds, 3) for name, seconds in timer.phases.items()}
+        })
+        # La generación anterior se borra en segundo plano
+        schedule_cleanup()
+    except InvalidRowsError as e:
+        _close(conn)
+        _finish(job_id, FAILED, state['rows_parsed'], 0,
+                error=f'Se encontraron {e.total} filas inválidas en el archivo', invalid=e)
+    except Exception as e:
+        _close(conn)
+        logger.exception('Error loading data', extra={'job_id': job_id})
+        _finish(job_id, FAILED, state['rows_parsed'], 0, error=f'Error processing file: {str(e)}')
+    finally:
+        timer.record()
+        _progress.pop(job_id, None)
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+def get_job(job_id):
+    """Job status as a dict, or None if it does not exist"""
+    conn = get_db_connection()
+    c = execute_query(
+        conn,
+        '''SELECT id, status, mode, rows_parsed, rows_inserted, invalid_count, invalid_rows,
+                  error, created_at, started_at, finished_at
+           FROM upload_jobs WHERE id = ?''',
+        (job_id,)
+    )
+    row = c.fetchone()
+    conn.close()
+    if row is None:
+        return None
+
+    job = {
+        'job_id': row[0],
+        'status': row[1],
+        'mode': row[2],
+        'rows_parsed': row[3] or 0,
+        'rows_inserted': row[4] or 0,
+        'invalid_count': row[5] or 0,
+        'invalid_rows': json.loads(row[6]) if row[6] else [],
+        'error': row[7],
+        'created_at': row[8],
+        'started_at': row[9],
+        'finished_at': row[10],
+    }
+    local = _progress.get(job_id)
+    if local is not None and job['status'] == RUNNING:
+        job['rows_parsed'] = local['rows_parsed']
+        job['rows_inserted'] = local['rows_inserted']
+
+    end = job['finished_at'] or (time.time() if job['started_at'] else None)
+    job['duration'] = round(end - job['started_at'], 3) if job['started_at'] and end else None
+    return job
+
+
+def _is_abandoned(worker_pid, heartbeat_at, now):
+    """A running job whose worker is gone (SQLite: same host) or silent for too long"""
+    if not is_postgres() and worker_pid:
+        try:
+            os.kill(worker_pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+    return heartbeat_at is None or now - heartbeat_at > _settings['stale_after']
+
+
+def resume_pending_jobs():
+    """Requeue abandoned jobs and schedule every queued one"""
+    conn = get_db_connection()
+    now = time.time()
+    c = execute_query(
+        conn,
+        'SELECT id, worker_pid, heartbeat_at FROM upload_jobs WHERE status = ?',
+        (RUNNING,)
+    )
+    for job_id, worker_pid, heartbeat_at in [tuple(row) for row in c.fetchall()]:
+        if worker_pid != os.getpid() and _is_abandoned(worker_pid, heartbeat_at, now):
+            execute_query(
+                conn,
+                'UPDATE upload_jobs SET status = ? WHERE id = ? AND status = ? AND heartbeat_at IS NOT DISTINCT FROM ?'
+                if is_postgres() else
+                'UPDATE upload_jobs SET status = ? WHERE id = ? AND status = ? AND heartbeat_at IS ?',
+                (QUEUED, job_id, RUNNING, heartbeat_at)
+            )
+    conn.commit()
+
+    c = execute_query(conn, 'SELECT id FROM upload_jobs WHERE status = ? ORDER BY created_at', (QUEUED,))
+    queued = [row[0] for row in c.fetchall()]
+    conn.close()
+
+    for job_id in queued:
+        _get_executor().submit(run_job, job_id)
+    schedule_cleanup()
+    return len(queued)
+
+
+def ensure_started():
+    """Resume pending jobs once per worker process (called before requests)"""
+    global _resumed_pid
+    if _resumed_pid == os.getpid():
+        return
+    with _lock:
+        if _resumed_pid == os.getpid():
+            return
+        _resumed_pid = os.getpid()
+    try:
+        resume_pending_jobs()
+    except Exception:
+        logger.exception('Error resuming upload jobs')
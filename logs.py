@@ -0,0 +1,70 @@
+"""
+Structured logging
+Records are formatted as one JSON object per line (LOG_FORMAT=json) or as
+plain text, and written by a background thread through a queue, so a
+request only pays for enqueueing records at an enabled level (LOG_LEVEL).
+Fields passed with ``extra={...}`` are included in the JSON output.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+# Atributos estándar de LogRecord: todo lo demás viene de extra={...}
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with the ``extra`` fields at the top level"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _start(handler):
+    """Install a fresh queue + listener thread writing to ``handler``"""
+    global _listener
+    records = queue.SimpleQueue()
+    logging.getLogger().handlers = [logging.handlers.QueueHandler(records)]
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging(app_config):
+    """Route the root logger through a queue to stderr (LOG_LEVEL, LOG_FORMAT keys)"""
+    _stop()
+    handler = logging.StreamHandler()
+    if app_config.get('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logging.getLogger().setLevel(app_config.get('LOG_LEVEL', 'INFO'))
+    _start(handler)
+
+
+def restart_logging():
+    """Start the writer thread again in a forked worker (threads do not survive fork)"""
+    if _listener is not None:
+        _start(_listener.handlers[0])
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop)
@@ -0,0 +1,333 @@
+"""
+Request-level instrumentation
+Counters and fixed-bucket histograms for request latency, DB time per
+request (fed by database.execute_query and async_database) and upload
+phases, rendered in Prometheus text format by /metrics.
+
+Each gunicorn worker keeps its own registry and, when METRICS_DIR is set
+(gunicorn.conf.py does it), a background thread writes a snapshot there
+every METRICS_FLUSH_INTERVAL seconds as <pid>-<start>.json (a recycled
+worker that reuses a pid gets a new file); /metrics sums the snapshots of
+every worker. When a worker exits the gunicorn master folds its snapshot
+into dead.json, so counters never go back and the directory does not grow
+with every worker recycled by max_requests.
+"""
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served', None),
+    'http_request_duration_seconds': ('histogram', 'Request latency until the response is built', DEFAULT_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Time spent in database queries per request', DEFAULT_BUCKETS),
+    'http_request_db_queries_total': ('counter', 'Database queries issued by requests', None),
+    'db_queries_total': ('counter', 'Database queries issued (requests and background jobs)', None),
+    'db_query_duration_seconds': ('histogram', 'Latency of a single database query', DEFAULT_BUCKETS),
+    'upload_phase_duration_seconds': ('histogram', 'Time per upload job phase', UPLOAD_BUCKETS),
+    'db_read_connections_total': ('counter', 'Read connections by target and routing reason', None),
+}
+
+# Valores por defecto; create_app() los sobrescribe con configure_metrics()
+_settings = {
+    'enabled': True,
+    'dir': None,
+    'flush_interval': 5.0,
+}
+
+# [consultas, segundos] de la petición en curso (None fuera de una petición)
+_request_db = contextvars.ContextVar('request_db', default=None)
+
+_flusher_pid = None
+
+# Snapshot de los workers que ya terminaron (lo escribe el master)
+DEAD_SNAPSHOT = 'dead.json'
+
+# (pid, nombre del snapshot de este proceso); el nombre cambia tras un fork
+_snapshot = (None, None)
+
+
+class Registry:
+    """Thread-safe counters and histograms of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = METRICS[name][2]
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # [conteo por bucket..., +Inf, suma]
+                histogram = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(buckets)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """JSON-serializable copy of every series"""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(values)]
+                               for (name, labels), values in self._histograms.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def configure_metrics(app_config):
+    """Load instrumentation settings from the Flask config (METRICS_* keys)"""
+    _settings['enabled'] = app_config.get('METRICS_ENABLED', _settings['enabled'])
+    _settings['dir'] = app_config.get('METRICS_DIR') or None
+    _settings['flush_interval'] = app_config.get('METRICS_FLUSH_INTERVAL', _settings['flush_interval'])
+    if _settings['dir']:
+        Path(_settings['dir']).mkdir(parents=True, exist_ok=True)
+
+
+def metrics_enabled():
+    return _settings['enabled']
+
+
+def reset_metrics_dir(path):
+    """Remove snapshots of a previous run (called by the gunicorn master)"""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    for snapshot in directory.glob('*.json'):
+        snapshot.unlink(missing_ok=True)
+
+
+def _snapshot_path():
+    """<pid>-<start in ms>.json of this process, named on first use"""
+    global _snapshot
+    pid = os.getpid()
+    if _snapshot[0] != pid:
+        _snapshot = (pid, f'{pid}-{time.time_ns() // 1_000_000}.json')
+    return Path(_settings['dir']) / _snapshot[1]
+
+
+def _write_snapshot(path, snapshot):
+    """Write a snapshot atomically (readers never see a half-written file)"""
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(snapshot))
+    os.replace(tmp, path)
+
+
+def flush():
+    """Write this worker's snapshot to METRICS_DIR"""
+    if not _settings['dir']:
+        return
+    _write_snapshot(_snapshot_path(), registry.snapshot())
+
+
+def collect_dead_worker(path, pid):
+    """Fold the snapshots of exited worker ``pid`` into dead.json (gunicorn child_exit)
+
+    dead.json lists the files it already includes, so a scrape between the
+    rewrite and the unlink skips them instead of counting them twice.
+    """
+    directory = Path(path)
+    files = list(directory.glob(f'{pid}-*.json'))
+    if not files:
+        return
+    dead = _read_snapshot(directory / DEAD_SNAPSHOT) or {'counters': [], 'histograms': []}
+    snapshots = [dead] + [snapshot for snapshot in map(_read_snapshot, files) if snapshot]
+    merged = _as_snapshot(*_merge(snapshots))
+    merged['merged'] = [file.name for file in files]
+    _write_snapshot(directory / DEAD_SNAPSHOT, merged)
+    for file in files:
+        file.unlink(missing_ok=True)
+
+
+def _flush_forever():
+    while True:
+        time.sleep(_settings['flush_interval'])
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    """Start the snapshot thread once per worker process (threads do not survive fork)"""
+    global _flusher_pid
+    if not _settings['dir'] or _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_forever, name='metrics-flush', daemon=True).start()
+
+
+atexit.register(flush)
+
+
+# Hooks
+
+def record_query(seconds):
+    """Account one database query (called by execute_query and async_database)"""
+    if not _settings['enabled']:
+        return
+    registry.inc('db_queries_total')
+    registry.observe('db_query_duration_seconds', seconds)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += seconds
+
+
+def record_read(target, reason):
+    """Account where get_read_connection() sent a read (replica or primary, and why)"""
+    if _settings['enabled']:
+        registry.inc('db_read_connections_total', target=target, reason=reason)
+
+
+def start_request():
+    """Begin accounting DB time for the current request; returns its start time"""
+    _ensure_flusher()
+    _request_db.set([0, 0.0])
+    return time.perf_counter()
+
+
+def finish_request(started, method, endpoint, status):
+    """Record the request and return ``(total, db_seconds, db_queries)``"""
+    total = time.perf_counter() - started
+    queries, db_seconds = _request_db.get() or (0, 0.0)
+    _request_db.set(None)
+    registry.inc('http_requests_total', method=method, endpoint=endpoint, status=str(status))
+    registry.observe('http_request_duration_seconds', total, method=method, endpoint=endpoint)
+    registry.observe('http_request_db_seconds', db_seconds, method=method, endpoint=endpoint)
+    registry.inc('http_request_db_queries_total', queries, method=method, endpoint=endpoint)
+    return total, db_seconds, queries
+
+
+def server_timing(total, db_seconds, queries):
+    """Server-Timing header value: DB time and the rest of the request"""
+    return (f'db;dur={db_seconds * 1000:.2f};desc="{queries} queries", '
+            f'app;dur={(total - db_seconds) * 1000:.2f}')
+
+
+class PhaseTimer:
+    """Accumulates the time of named phases of one upload job"""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self):
+        """Observe every phase in upload_phase_duration_seconds"""
+        for name, seconds in self.phases.items():
+            registry.observe('upload_phase_duration_seconds', seconds, phase=name)
+
+
+# Exposición
+
+def _read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _merged_snapshots():
+    """Snapshots of every worker that wrote one, with this worker's live data"""
+    snapshots = [registry.snapshot()]
+    if _settings['dir']:
+        directory = Path(_settings['dir'])
+        dead = _read_snapshot(directory / DEAD_SNAPSHOT)
+        skip = {_snapshot_path().name, DEAD_SNAPSHOT}
+        if dead:
+            snapshots.append(dead)
+            skip.update(dead.get('merged', ()))
+        for path in directory.glob('*.json'):
+            if path.name not in skip:
+                snapshot = _read_snapshot(path)
+                if snapshot:
+                    snapshots.append(snapshot)
+    return snapshots
+
+
+def _merge(snapshots):
+    """Sum snapshots into ``(counters, histograms)`` keyed by (name, labels)"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.get(key)
+            histograms[key] = values if merged is None else [a + b for a, b in zip(merged, values)]
+    return counters, histograms
+
+
+def _as_snapshot(counters, histograms):
+    """Inverse of _merge: the JSON layout of Registry.snapshot()"""
+    return {
+        'counters': [[name, [list(label) for label in labels], value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, [list(label) for label in labels], values]
+                       for (name, labels), values in histograms.items()],
+    }
+
+
+def _format_labels(labels, extra=()):
+    pairs = [f'{key}="{value}"' for key, value in list(labels) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_metrics():
+    """Aggregated instrumentation of every worker in Prometheus text format"""
+    counters, histograms = _merge(_merged_snapshots())
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+            continue
+        for (series, labels), values in sorted(histograms.items()):
+            if series != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
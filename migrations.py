@@ -0,0 +1,373 @@
+"""
+Versioned schema migrations
+Each migration runs once and bumps the version stored in schema_version, so
+a worker that starts against an up-to-date database only reads that row
+instead of issuing the whole DDL. Migrations run under a lock (advisory
+lock on PostgreSQL, BEGIN IMMEDIATE on SQLite) so workers starting at the
+same time never apply one twice.
+
+To change the schema append ``(next_version, description, function)`` to
+MIGRATIONS; never edit a migration that already shipped.
+"""
+import logging
+
+from database import execute_many, execute_query, is_postgres
+from history import SORTEO_COLUMNS, InvalidNumbersError, validate_numbers
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de PostgreSQL (cualquier entero fijo)
+MIGRATION_LOCK_ID = 7311001
+
+
+def _column_exists(c, table, column):
+    """True if ``table`` already has ``column``"""
+    if is_postgres():
+        c.execute(
+            'SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s',
+            (table, column)
+        )
+        return c.fetchone() is not None
+    c.execute(f'PRAGMA table_info({table})')
+    return any(row[1] == column for row in c.fetchall())
+
+
+def _table_exists(c, table):
+    """True if ``table`` has already been created"""
+    if is_postgres():
+        c.execute('SELECT 1 FROM information_schema.tables WHERE table_name = %s', (table,))
+    else:
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return c.fetchone() is not None
+
+
+def _migrate_generations(conn, c):
+    """Add generation columns to tables created before double buffering"""
+    if not _column_exists(c, 'historical_data', 'generation'):
+        c.execute('ALTER TABLE historical_data ADD COLUMN generation INTEGER NOT NULL DEFAULT 0')
+        # Las filas existentes forman el conjunto activo
+        c.execute('''UPDATE historical_data SET generation =
+                     (SELECT generation FROM data_generation WHERE name = 'historical_data')''')
+    if not _column_exists(c, 'number_frequency', 'generation'):
+        # Índice derivado: se recrea y ensure_frequencies() lo reconstruye
+        c.execute('DROP TABLE number_frequency')
+        c.execute('''CREATE TABLE number_frequency
+                     (generation INTEGER NOT NULL,
+                      position INTEGER NOT NULL,
+                      number INTEGER NOT NULL,
+                      count INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (generation, position, number))''')
+    if not _column_exists(c, 'upload_jobs', 'generation'):
+        c.execute('ALTER TABLE upload_jobs ADD COLUMN generation INTEGER')
+
+
+def _parse_legacy_numbers(numbers):
+    """Validated sorteo from a legacy ``numbers`` TEXT value; raises InvalidNumbersError"""
+    try:
+        values = [int(n) for n in (numbers or '').split(',') if n.strip()]
+    except ValueError:
+        raise InvalidNumbersError('Numbers must be integers') from None
+    return validate_numbers(values)
+
+
+def _quarantine_sorteos(conn, c, rejected):
+    """Move legacy sorteos that fail validation to sorteos_quarantine"""
+    c.execute('''CREATE TABLE IF NOT EXISTS sorteos_quarantine
+                 (id INTEGER PRIMARY KEY,
+                  user_id INTEGER NOT NULL,
+                  numbers TEXT,
+                  reason TEXT NOT NULL,
+                  created_at TIMESTAMP)''')
+    execute_many(conn, '''INSERT INTO sorteos_quarantine (id, user_id, numbers, reason, created_at)
+                           SELECT id, user_id, numbers, ?, created_at FROM sorteos WHERE id = ?''',
+                 [(reason, sorteo_id) for sorteo_id, reason in rejected])
+    # Bases anteriores al versionado pueden tener ya el contador por usuario
+    if _table_exists(c, 'user_sorteo_counts'):
+        execute_many(conn, '''UPDATE user_sorteo_counts SET count = count - 1
+                               WHERE user_id = (SELECT user_id FROM sorteos WHERE id = ?)''',
+                     [(sorteo_id,) for sorteo_id, _ in rejected])
+    execute_many(conn, 'DELETE FROM sorteos WHERE id = ?', [(sorteo_id,) for sorteo_id, _ in rejected])
+
+
+def _migrate_sorteo_numbers(conn, c):
+    """Move sorteos from the comma-joined numbers TEXT column to compact columns
+
+    Legacy rows that are not a valid sorteo (5 distinct balls 1-43 plus a
+    bonus 1-16) go to sorteos_quarantine untouched instead of aborting the
+    migration or being truncated to fit.
+    """
+    if not _column_exists(c, 'sorteos', 'numbers'):
+        return
+    
+    int_type = 'SMALLINT' if is_postgres() else 'INTEGER'
+    for column in SORTEO_COLUMNS:
+        c.execute(f'ALTER TABLE sorteos ADD COLUMN {column} {int_type} NOT NULL DEFAULT 0')
+    
+    c.execute('SELECT id, numbers FROM sorteos')
+    rows = []
+    rejected = []
+    for sorteo_id, numbers in c.fetchall():
+        try:
+            values = _parse_legacy_numbers(numbers)
+        except InvalidNumbersError as e:
+            # Incluye los de 6 balotas + extra que llegó a generar /api/sorteo
+            rejected.append((sorteo_id, str(e)))
+            continue
+        rows.append(tuple(values) + (sorteo_id,))
+    
+    if rejected:
+        _quarantine_sorteos(conn, c, rejected)
+    placeholders = ', '.join(f'{column} = ?' for column in SORTEO_COLUMNS)
+    execute_many(conn, f'UPDATE sorteos SET {placeholders} WHERE id = ?', rows)
+    c.execute('ALTER TABLE sorteos DROP COLUMN numbers')
+    logger.info('Migrated sorteos to compact storage', extra={'sorteos': len(rows), 'quarantined': len(rejected)})
+    if rejected:
+        logger.warning('Quarantined invalid legacy sorteos', extra={'ids': [sorteo_id for sorteo_id, _ in rejected]})
+
+
+def _baseline(conn, c):
+    """Schema as of the first versioned release
+
+    Idempotent (IF NOT EXISTS plus the column checks of the pre-versioning
+    upgrades) because databases created before schema_version existed
+    also start at version 0.
+    """
+    if is_postgres():
+        # PostgreSQL syntax
+        # Users table
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (id SERIAL PRIMARY KEY,
+                      username VARCHAR(255) UNIQUE NOT NULL,
+                      password VARCHAR(255) NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # Sorteos table
+        c.execute('''CREATE TABLE IF NOT EXISTS sorteos
+                     (id SERIAL PRIMARY KEY,
+                      user_id INTEGER NOT NULL,
+                      balota1 SMALLINT NOT NULL,
+                      balota2 SMALLINT NOT NULL,
+                      balota3 SMALLINT NOT NULL,
+                      balota4 SMALLINT NOT NULL,
+                      balota5 SMALLINT NOT NULL,
+                      balota6 SMALLINT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      FOREIGN KEY (user_id) REFERENCES users (id))''')
+        
+        # Historical data table
+        c.execute('''CREATE TABLE IF NOT EXISTS historical_data
+                     (id SERIAL PRIMARY KEY,
+                      balota1 INTEGER,
+                      balota2 INTEGER,
+                      balota3 INTEGER,
+                      balota4 INTEGER,
+                      balota5 INTEGER,
+                      balota6 INTEGER,
+                      date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      generation INTEGER NOT NULL DEFAULT 0)''')
+        
+        # Frequency index: apariciones de cada número por posición (6 = balota extra)
+        c.execute('''CREATE TABLE IF NOT EXISTS number_frequency
+                     (generation INTEGER NOT NULL,
+                      position INTEGER NOT NULL,
+                      number INTEGER NOT NULL,
+                      count INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (generation, position, number))''')
+        
+        # Upload jobs (tiempos en segundos epoch)
+        c.execute('''CREATE TABLE IF NOT EXISTS upload_jobs
+                     (id VARCHAR(32) PRIMARY KEY,
+                      status VARCHAR(16) NOT NULL,
+                      mode VARCHAR(16) NOT NULL,
+                      file_path TEXT NOT NULL,
+                      rows_parsed INTEGER DEFAULT 0,
+                      rows_inserted INTEGER DEFAULT 0,
+                      invalid_count INTEGER DEFAULT 0,
+                      invalid_rows TEXT,
+                      error TEXT,
+                      worker_pid INTEGER,
+                      created_at DOUBLE PRECISION NOT NULL,
+                      started_at DOUBLE PRECISION,
+                      heartbeat_at DOUBLE PRECISION,
+                      finished_at DOUBLE PRECISION,
+                      generation INTEGER)''')
+    else:
+        # SQLite syntax
+        # Users table
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      username TEXT UNIQUE NOT NULL,
+                      password TEXT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # Sorteos table
+        c.execute('''CREATE TABLE IF NOT EXISTS sorteos
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      user_id INTEGER NOT NULL,
+                      balota1 INTEGER NOT NULL,
+                      balota2 INTEGER NOT NULL,
+                      balota3 INTEGER NOT NULL,
+                      balota4 INTEGER NOT NULL,
+                      balota5 INTEGER NOT NULL,
+                      balota6 INTEGER NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      FOREIGN KEY (user_id) REFERENCES users (id))''')
+        
+        # Historical data table
+        c.execute('''CREATE TABLE IF NOT EXISTS historical_data
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      balota1 INTEGER,
+                      balota2 INTEGER,
+                      balota3 INTEGER,
+                      balota4 INTEGER,
+                      balota5 INTEGER,
+                      balota6 INTEGER,
+                      date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      generation INTEGER NOT NULL DEFAULT 0)''')
+        
+        # Frequency index: apariciones de cada número por posición (6 = balota extra)
+        c.execute('''CREATE TABLE IF NOT EXISTS number_frequency
+                     (generation INTEGER NOT NULL,
+                      position INTEGER NOT NULL,
+                      number INTEGER NOT NULL,
+                      count INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (generation, position, number))''')
+        
+        # Upload jobs (tiempos en segundos epoch)
+        c.execute('''CREATE TABLE IF NOT EXISTS upload_jobs
+                     (id TEXT PRIMARY KEY,
+                      status TEXT NOT NULL,
+                      mode TEXT NOT NULL,
+                      file_path TEXT NOT NULL,
+                      rows_parsed INTEGER DEFAULT 0,
+                      rows_inserted INTEGER DEFAULT 0,
+                      invalid_count INTEGER DEFAULT 0,
+                      invalid_rows TEXT,
+                      error TEXT,
+                      worker_pid INTEGER,
+                      created_at REAL NOT NULL,
+                      started_at REAL,
+                      heartbeat_at REAL,
+                      finished_at REAL,
+                      generation INTEGER)''')
+    
+    # Generaciones: 'historical_data' apunta al conjunto visible,
+    # 'historical_data_seq' reparte números nuevos para cada carga
+    c.execute('''CREATE TABLE IF NOT EXISTS data_generation
+                 (name VARCHAR(64) PRIMARY KEY,
+                  generation INTEGER NOT NULL DEFAULT 0)''')
+    c.execute('''INSERT INTO data_generation (name, generation) VALUES ('historical_data', 0)
+                 ON CONFLICT (name) DO NOTHING''')
+    c.execute('''INSERT INTO data_generation (name, generation)
+                 SELECT 'historical_data_seq', generation FROM data_generation
+                 WHERE name = 'historical_data'
+                 ON CONFLICT (name) DO NOTHING''')
+    
+    _migrate_generations(conn, c)
+    _migrate_sorteo_numbers(conn, c)
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_historical_data_generation
+                 ON historical_data (generation)''')
+    
+    # Historial paginado por (created_at, id) dentro de cada usuario
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_sorteos_user_created
+                 ON sorteos (user_id, created_at, id)''')
+    
+    # Contador de sorteos por usuario (evita COUNT(*) sobre todo el historial)
+    counts_exist = _table_exists(c, 'user_sorteo_counts')
+    c.execute('''CREATE TABLE IF NOT EXISTS user_sorteo_counts
+                 (user_id INTEGER PRIMARY KEY,
+                  count INTEGER NOT NULL DEFAULT 0,
+                  version INTEGER NOT NULL DEFAULT 0)''')
+    if not counts_exist:
+        c.execute('''INSERT INTO user_sorteo_counts (user_id, count)
+                     SELECT user_id, COUNT(*) FROM sorteos GROUP BY user_id''')
+    elif not _column_exists(c, 'user_sorteo_counts', 'version'):
+        # Versión del historial por usuario (ETag de /api/history)
+        c.execute('ALTER TABLE user_sorteo_counts ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+    
+    # Análisis precalculados por generación (ver analytics.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS number_pairs
+                 (generation INTEGER NOT NULL,
+                  number_a INTEGER NOT NULL,
+                  number_b INTEGER NOT NULL,
+                  count INTEGER NOT NULL,
+                  PRIMARY KEY (generation, number_a, number_b))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS number_triples
+                 (generation INTEGER NOT NULL,
+                  number_a INTEGER NOT NULL,
+                  number_b INTEGER NOT NULL,
+                  number_c INTEGER NOT NULL,
+                  count INTEGER NOT NULL,
+                  PRIMARY KEY (generation, number_a, number_b, number_c))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_number_triples_rank
+                 ON number_triples (generation, count)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS number_gaps
+                 (generation INTEGER NOT NULL,
+                  kind VARCHAR(8) NOT NULL,
+                  number INTEGER NOT NULL,
+                  gap INTEGER,
+                  PRIMARY KEY (generation, kind, number))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS number_windows
+                 (generation INTEGER NOT NULL,
+                  window_size INTEGER NOT NULL,
+                  number INTEGER NOT NULL,
+                  count INTEGER NOT NULL,
+                  PRIMARY KEY (generation, window_size, number))''')
+
+
+# (versión, descripción, función(conn, cursor)) en orden
+MIGRATIONS = [
+    (1, 'Baseline schema', _baseline),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Applied schema version (0 if the database predates schema_version)"""
+    c = conn.cursor()
+    if not _table_exists(c, 'schema_version'):
+        return 0
+    row = execute_query(conn, 'SELECT version FROM schema_version').fetchone()
+    return row[0] if row else 0
+
+
+def _lock(conn, c):
+    """Serialize migrations between processes until the transaction ends"""
+    if is_postgres():
+        c.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+    else:
+        if conn.in_transaction:
+            conn.commit()
+        c.execute('BEGIN IMMEDIATE')
+
+
+def migrate(conn):
+    """Apply pending migrations; returns ``(version, applied_versions)``"""
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        # Caso normal al arrancar un worker: sin DDL
+        conn.commit()
+        return version, []
+    
+    c = conn.cursor()
+    _lock(conn, c)
+    c.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+    # Otro proceso pudo migrar mientras esperábamos el lock
+    version = current_version(conn)
+    applied = []
+    try:
+        for number, description, migration in MIGRATIONS:
+            if number <= version:
+                continue
+            migration(conn, c)
+            applied.append(number)
+            logger.info('Applied schema migration', extra={'version': number, 'description': description})
+        if applied:
+            execute_query(conn, 'DELETE FROM schema_version')
+            execute_query(conn, 'INSERT INTO schema_version (version) VALUES (?)', (applied[-1],))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return (applied[-1] if applied else version), applied
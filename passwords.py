@@ -0,0 +1,112 @@
+"""
+Password hashing off the request thread
+Hashes are computed in a small per-worker process pool so a burst of logins
+does not hold the GIL of the worker that serves sorteos; the algorithm and
+cost come from the config and old hashes are upgraded on the next
+successful login
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Costo por defecto de cada algoritmo (los mismos de werkzeug)
+DEFAULT_COSTS = {'scrypt': 32768, 'pbkdf2': 1_000_000}
+
+# Valores por defecto; create_app() los sobrescribe con configure_passwords()
+_settings = {
+    'algorithm': 'scrypt',
+    'cost': 32768,
+    'workers': 1,
+}
+
+# Sin fork: el worker de gunicorn tiene hilos (gthread, logging, jobs) y un
+# fork puede heredar locks tomados por otro hilo y quedarse bloqueado
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def configure_passwords(app_config):
+    """Load hashing settings from the Flask config (PASSWORD_HASH_* keys)"""
+    algorithm = app_config.get('PASSWORD_HASH_ALGORITHM', _settings['algorithm'])
+    if algorithm not in DEFAULT_COSTS:
+        raise ValueError(f'PASSWORD_HASH_ALGORITHM must be one of {", ".join(DEFAULT_COSTS)}')
+    _settings['algorithm'] = algorithm
+    _settings['cost'] = app_config.get('PASSWORD_HASH_COST') or DEFAULT_COSTS[algorithm]
+    _settings['workers'] = app_config.get('PASSWORD_HASH_WORKERS', _settings['workers'])
+    shutdown()
+
+
+def hash_method():
+    """Current werkzeug method string, e.g. 'scrypt:32768:8:1'"""
+    if _settings['algorithm'] == 'scrypt':
+        return f"scrypt:{_settings['cost']}:8:1"
+    return f"pbkdf2:sha256:{_settings['cost']}"
+
+
+def _get_executor():
+    """Process pool of this worker (recreated after fork); None = hash inline"""
+    global _executor, _executor_pid
+    if _settings['workers'] <= 0:
+        return None
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=_settings['workers'],
+                                            mp_context=multiprocessing.get_context(_START_METHOD))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(fn, *args):
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+
+def hash_password(password):
+    """Hash a password with the configured algorithm and cost"""
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(stored_hash, password):
+    """Check a password against a stored werkzeug hash"""
+    return _run(check_password_hash, stored_hash, password)
+
+
+async def _run_async(fn, *args):
+    executor = _get_executor()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.wrap_future(executor.submit(fn, *args))
+
+
+async def hash_password_async(password):
+    """hash_password for async views: awaits the pool without blocking the event loop"""
+    return await _run_async(generate_password_hash, password, hash_method())
+
+
+async def verify_password_async(stored_hash, password):
+    """verify_password for async views"""
+    return await _run_async(check_password_hash, stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    """True when a stored hash was made with other parameters than the current ones"""
+    return stored_hash.split('$', 1)[0] != hash_method()
+
+
+def shutdown():
+    """Stop this process' hashing pool (a new one is created on demand)"""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_pid = None
@@ -0,0 +1,277 @@
+"""
+Database connection pool
+One pool per gunicorn worker process, fork-safe and thread-safe
+"""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+# Conexiones heredadas de un proceso padre (antes del fork). No se cierran en
+# el hijo porque cerrar el socket compartido rompería la sesión del padre;
+# se mantienen referenciadas para que el GC no las finalice.
+_orphans = []
+
+
+class PooledConnection:
+    """Proxy around a DB-API connection that returns it to the pool on close()"""
+
+    def __init__(self, pool, record):
+        self._pool = pool
+        self._record = record
+
+    @property
+    def raw(self):
+        if self._record is None:
+            raise RuntimeError('Connection already returned to the pool')
+        return self._record.raw
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        if self._record is not None:
+            record, self._record = self._record, None
+            self._pool._release(record)
+
+    @property
+    def closed(self):
+        return self._record is None
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class _Record:
+    """Bookkeeping for one physical connection"""
+
+    __slots__ = ('raw', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections with health checks and recycling"""
+
+    def __init__(self, connect, name='primary', min_size=1, max_size=5,
+                 timeout=10.0, max_uses=5000, max_age=1800.0,
+                 pre_ping=True, ping_interval=5.0, ping=None):
+        if max_size < 1:
+            raise ValueError('max_size must be >= 1')
+        self.name = name
+        self._connect = connect
+        self._ping = ping or _default_ping
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._warmed = False
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+        }
+
+    def _check_pid(self):
+        """Drop connections inherited across fork()"""
+        if self._pid != os.getpid():
+            _orphans.extend(record.raw for record in self._idle)
+            self._cond = threading.Condition(threading.Lock())
+            self._reset_state()
+
+    def _open(self):
+        record = _Record(self._connect())
+        with self._cond:
+            self.stats['created'] += 1
+        return record
+
+    def _expired(self, record, now):
+        if self.max_uses and record.uses >= self.max_uses:
+            return True
+        if self.max_age and now - record.created_at >= self.max_age:
+            return True
+        return False
+
+    def _discard(self, record):
+        try:
+            record.raw.close()
+        except Exception:
+            pass
+
+    def _warm_up(self):
+        """Open min_size connections the first time the pool is used"""
+        self._warmed = True
+        while self._size < self.min_size:
+            self._size += 1
+            self._cond.release()
+            try:
+                record = self._open()
+            except Exception:
+                self._cond.acquire()
+                self._size -= 1
+                return
+            self._cond.acquire()
+            self._idle.append(record)
+
+    def getconn(self):
+        """Borrow a connection, waiting up to ``timeout`` seconds"""
+        self._check_pid()
+        deadline = None
+        waited = False
+        start = time.monotonic()
+
+        with self._cond:
+            if not self._warmed:
+                self._warm_up()
+            while True:
+                if self._idle:
+                    record = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    record = None
+                    break
+                if deadline is None:
+                    deadline = start + self.timeout
+                    waited = True
+                    self.stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    self.stats['wait_seconds'] += time.monotonic() - start
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s '
+                        f'(pool "{self.name}", max_size={self.max_size})'
+                    )
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self.stats['checkouts'] += 1
+            if waited:
+                self.stats['wait_seconds'] += time.monotonic() - start
+
+        try:
+            record = self._validate(record)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        record.uses += 1
+        return PooledConnection(self, record)
+
+    def _validate(self, record):
+        """Recycle expired connections and ping idle ones before handing them out"""
+        now = time.monotonic()
+        if record is not None and self._expired(record, now):
+            self._discard(record)
+            with self._cond:
+                self.stats['recycled'] += 1
+            record = None
+
+        if (record is not None and self.pre_ping
+                and now - record.last_used >= self.ping_interval):
+            try:
+                self._ping(record.raw)
+            except Exception:
+                self._discard(record)
+                with self._cond:
+                    self.stats['failed_pings'] += 1
+                record = None
+
+        if record is None:
+            record = self._open()
+        return record
+
+    def _release(self, record):
+        if self._pid != os.getpid():
+            # Conexión prestada antes del fork: no pertenece a este proceso
+            _orphans.append(record.raw)
+            return
+
+        keep = True
+        try:
+            # Descarta cualquier transacción sin commit
+            record.raw.rollback()
+        except Exception:
+            keep = False
+
+        record.last_used = time.monotonic()
+        if keep and self._expired(record, record.last_used):
+            keep = False
+            with self._cond:
+                self.stats['recycled'] += 1
+
+        if not keep:
+            self._discard(record)
+
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append(record)
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection owned by this process"""
+        with self._cond:
+            if self._pid != os.getpid():
+                self._check_pid()
+                return
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for record in idle:
+            self._discard(record)
+
+    def metrics(self):
+        """Snapshot of pool gauges and counters"""
+        self._check_pid()
+        with self._cond:
+            snapshot = dict(self.stats)
+            snapshot.update({
+                'name': self.name,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            })
+        return snapshot
+
+
+def _default_ping(raw):
+    """Cheap round-trip to verify a connection is still alive"""
+    if getattr(raw, 'closed', 0):
+        raise ConnectionError('connection closed')
+    cursor = raw.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    finally:
+        cursor.close()
+    # psycopg2 abre una transacción implícita incluso para SELECT
+    raw.rollback()
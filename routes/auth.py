@@ -2,26 +2,14 @@
 Authentication Blueprint
 Handles user registration and login
 """
+import logging
 from flask import Blueprint, jsonify, request
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import get_db_connection
-import os
+from database import get_db_connection, execute_query
+from passwords import hash_password, verify_password, needs_rehash
+from tokens import issue_tokens, verify_token, InvalidTokenError, REFRESH
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api')
-
-
-def execute_query(conn, query, params=()):
-    """Execute query with appropriate placeholder for DB type"""
-    database_url = os.getenv('DATABASE_URL', '')
-    is_postgres = database_url.startswith('postgres')
-    
-    if is_postgres:
-        # PostgreSQL usa %s
-        query = query.replace('?', '%s')
-    
-    c = conn.cursor()
-    c.execute(query, params)
-    return c
+logger = logging.getLogger(__name__)
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -37,11 +25,12 @@ def register():
             'message': 'Usuario y contraseña requeridos'
         }), 400
     
+    # Hash antes de pedir la conexión: no la retiene durante el cálculo lento
+    hashed_password = hash_password(password)
     conn = get_db_connection()
     
     try:
-        hashed_password = generate_password_hash(password)
-        c = execute_query(
+        execute_query(
             conn,
             'INSERT INTO users (username, password) VALUES (?, ?)', 
             (username, hashed_password)
@@ -67,6 +56,22 @@ def register():
         conn.close()
 
 
+def _rehash(user_id, old_hash, password):
+    """Upgrade a hash made with outdated parameters (best effort)"""
+    try:
+        new_hash = hash_password(password)
+        conn = get_db_connection()
+        execute_query(
+            conn,
+            'UPDATE users SET password = ? WHERE id = ? AND password = ?',
+            (new_hash, user_id, old_hash)
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        logger.warning('Error rehashing password', extra={'user_id': user_id, 'error': str(e)})
+
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Authenticate a user"""
@@ -81,23 +86,53 @@ def login():
         }), 400
     
     conn = get_db_connection()
-    c = execute_query(conn, 'SELECT id, password FROM users WHERE username = ?', (username,))
+    c = execute_query(conn, 'SELECT id, password FROM users WHERE username = ?', (username,), prepare=True)
     user = c.fetchone()
     conn.close()
     
     if user:
-        # Maneja tanto SQLite Row como PostgreSQL tuple
-        user_id = user[0] if isinstance(user, tuple) else user['id']
-        user_password = user[1] if isinstance(user, tuple) else user['password']
+        user_id = user['id']
+        user_password = user['password']
         
-        if check_password_hash(user_password, password):
+        if verify_password(user_password, password):
+            if needs_rehash(user_password):
+                _rehash(user_id, user_password, password)
             return jsonify({
                 'success': True, 
                 'user_id': user_id, 
-                'message': 'Login exitoso'
+                'message': 'Login exitoso',
+                **issue_tokens(user_id)
             }), 200
     
     return jsonify({
         'success': False, 
         'message': 'Usuario o contraseña incorrectos'
     }), 401
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """Exchange a refresh token for a new access/refresh token pair"""
+    data = request.get_json(silent=True) or {}
+    # Cuerpo JSON que no es un objeto ([], 123...): igual que sin refresh_token
+    refresh_token = data.get('refresh_token') if isinstance(data, dict) else None
+    
+    if not refresh_token:
+        return jsonify({
+            'success': False, 
+            'message': 'refresh_token requerido'
+        }), 400
+    
+    try:
+        user_id = verify_token(refresh_token, REFRESH)
+    except InvalidTokenError as e:
+        return jsonify({
+            'success': False, 
+            'message': str(e)
+        }), 401
+    
+    return jsonify({
+        'success': True, 
+        'user_id': user_id, 
+        **issue_tokens(user_id)
+    }), 200
@@ -2,175 +2,348 @@
 Lottery Blueprint
 Handles lottery generation, history, and statistics
 """
-from flask import Blueprint, jsonify, request
-from database import get_db_connection
-import random
-from collections import Counter
-import os
+import logging
+from flask import Blueprint, Response, jsonify, request, current_app, g
+from database import get_db_connection, get_read_connection, execute_query
+from analytics import (top_pairs, top_triples, number_gaps, hot_cold, bonus_frequency,
+                       analytics_windows, max_limit)
+from cache import stats_cache
+from etags import conditional, history_etag_for, statistics_etag_for
+from strategies import generate_sorteos, sorteo_sampler, default_strategy, strategy_error, get_top_3_with_count
+from tickets import iter_ndjson
+from tokens import token_required, is_forbidden
+from history import (fetch_history_page, get_sorteo_count, get_history_version, adjust_sorteo_count, validate_numbers,
+                     parse_history_args, insert_sorteos, delete_sorteos, update_sorteos, bulk_items_error, bulk_result,
+                     validate_bulk_saves, validate_bulk_ids, validate_bulk_updates, attach_ids, mark_missing,
+                     SORTEO_COLUMNS, InvalidCursorError, InvalidNumbersError)
 
 lottery_bp = Blueprint('lottery', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
 
 
-def execute_query(conn, query, params=()):
-    """Execute query with appropriate placeholder for DB type"""
-    database_url = os.getenv('DATABASE_URL', '')
-    is_postgres = database_url.startswith('postgres')
-    
-    if is_postgres:
-        # PostgreSQL usa %s
-        query = query.replace('?', '%s')
-    
-    c = conn.cursor()
-    c.execute(query, params)
-    return c
-
-
-def get_top_3_frequent():
-    """Get the top 3 most frequent numbers from historical data"""
-    try:
-        conn = get_db_connection()
-        c = execute_query(conn, 'SELECT COUNT(*) FROM historical_data')
-        count = c.fetchone()[0]
-        
-        if count > 0:
-            # Get frequency of each number from all balota columns (1-5 only)
-            numbers = []
-            for i in range(1, 6):
-                c = execute_query(conn, f'SELECT balota{i} FROM historical_data')
-                numbers.extend([row[0] for row in c.fetchall()])
-            
-            conn.close()
-            
-            # Count frequency
-            counter = Counter(numbers)
-            top_3 = [num for num, _ in counter.most_common(3)]
-            return top_3 if len(top_3) == 3 else random.sample(range(1, 44), 3)
-        else:
-            conn.close()
-            return random.sample(range(1, 44), 3)
-    except Exception as e:
-        print(f"Error getting top 3 frequent: {e}")
-        return random.sample(range(1, 44), 3)
+def sorteo_strategy(value):
+    """Read the ``strategy`` of a sorteo request; returns (strategy, error)"""
+    strategy = value or default_strategy()
+    return strategy, strategy_error(strategy)
 
 
 @lottery_bp.route('/sorteo', methods=['GET'])
 def sorteo():
-    """Generate a new lottery sorteo"""
-    top_three = get_top_3_frequent()
-    
-    # Use top three as the first three balotas, then add three random from remaining numbers
-    available_numbers = [x for x in range(1, 44) if x not in top_three]
-    three_random = random.sample(available_numbers, 3)  # Three unique random numbers
-    all_five_balotas = top_three + three_random
-    random.shuffle(all_five_balotas)  # Shuffle to randomize order
-    
-    sixth_balota = random.randint(1, 16)  # Extra balota (1-16)
-    balotas = all_five_balotas
-    balotas.append(sixth_balota)  # Ensure exactly 6 numbers
+    """Generate a new lottery sorteo
+
+    ``?strategy=`` picks the generation engine (see strategies.py); the
+    default keeps the top three + two random + extra balota (1-16) rule.
+    """
+    strategy, error = sorteo_strategy(request.args.get('strategy'))
+    if error:
+        return jsonify({'error': error}), 400
     
-    print(f"Generated balotas: {balotas}")  # Debug print
+    balotas = generate_sorteos(strategy, 1)[0].tolist()
     
-    if not (1 <= sixth_balota <= 16):
-        print(f"Warning: Sixth balota {sixth_balota} is out of range 1-16")
+    logger.debug('Generated balotas', extra={'balotas': balotas, 'strategy': strategy})
     
     return jsonify({'balotas': balotas})
 
 
+@lottery_bp.route('/sorteo/batch', methods=['POST'])
+def sorteo_batch():
+    """Generate ``count`` sorteos at once with a single frequency lookup
+
+    Body: ``{"count": 100, "stream": false, "strategy": "frequency"}``. With
+    ``stream`` true (or an ``Accept: application/x-ndjson`` header) the
+    tickets are streamed as one JSON object per line.
+    """
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 1)
+    max_count = current_app.config['SORTEO_BATCH_MAX']
+    if not isinstance(count, int) or isinstance(count, bool) or not (1 <= count <= max_count):
+        return jsonify({'error': f'count must be an integer between 1 and {max_count}'}), 400
+    strategy, error = sorteo_strategy(data.get('strategy'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    stream = data.get('stream') is True or request.accept_mimetypes.best == 'application/x-ndjson'
+    if stream:
+        # La tabla se lee ahora (dentro de la petición); los tickets, trozo a trozo al enviar
+        return Response(iter_ndjson(sorteo_sampler(strategy), count), mimetype='application/x-ndjson')
+    tickets = generate_sorteos(strategy, count)
+    return jsonify({'count': count, 'balotas': tickets.tolist()})
+
+
+def _bulk_items(items):
+    """Check the size of a bulk request body list; returns an error message or None"""
+    return bulk_items_error(items, current_app.config['SORTEO_BULK_MAX'])
+
+
+def _forbidden(user_id):
+    """403 response when ``user_id`` is not the authenticated user, else None"""
+    if is_forbidden(user_id, g.user_id):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+
+def _bulk_response(results, **extra):
+    """Per-item results; 200 if at least one item succeeded, 400 otherwise"""
+    body, status = bulk_result(results, **extra)
+    return jsonify(body), status
+
+
 @lottery_bp.route('/save_sorteo', methods=['POST'])
+@token_required
 def save_sorteo():
-    """Save a sorteo to user's history"""
+    """Save a sorteo to the authenticated user's history
+
+    Body: ``{"numbers": [...]}`` for one sorteo or ``{"sorteos": [[...], ...]}``
+    to save many in one transaction. ``user_id`` is optional and must match
+    the token.
+    """
     data = request.json
-    user_id = data.get('user_id')
+    forbidden = _forbidden(data.get('user_id'))
+    if forbidden:
+        return forbidden
+    user_id = g.user_id
+    if 'sorteos' in data:
+        return save_sorteos(user_id, data.get('sorteos'))
     numbers = data.get('numbers')
     
     if not user_id or not numbers:
         return jsonify({'error': 'Missing data'}), 400
+    try:
+        numbers = validate_numbers(numbers)
+    except InvalidNumbersError as e:
+        return jsonify({'error': str(e)}), 400
     
     conn = get_db_connection()
-    c = execute_query(
+    execute_query(
         conn,
-        'INSERT INTO sorteos (user_id, numbers) VALUES (?, ?)', 
-        (user_id, ','.join(map(str, numbers)))
+        f'''INSERT INTO sorteos (user_id, {', '.join(SORTEO_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, ?, ?)''', 
+        (user_id, *numbers),
+        prepare=True
     )
+    adjust_sorteo_count(conn, user_id, 1)
     conn.commit()
     conn.close()
     
     return jsonify({'success': True}), 200
 
 
+def save_sorteos(user_id, sorteos):
+    """Bulk variant of save_sorteo: valid items are inserted, invalid ones reported"""
+    error = _bulk_items(sorteos)
+    if not user_id or error:
+        return jsonify({'error': error or 'Missing data'}), 400
+    
+    results, valid = validate_bulk_saves(sorteos)
+    if valid:
+        try:
+            conn = get_db_connection()
+            ids = insert_sorteos(conn, user_id, valid)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        attach_ids(results, ids)
+    
+    return _bulk_response(results)
+
+
+def history_etag(user_id):
+    """ETag of a history page: the user's history version plus the query
+
+    Read from the primary, so a save is visible right away; get_history()
+    only reads the page from a replica that already has this version.
+    """
+    if user_id != g.user_id:
+        return None
+    conn = get_read_connection(replicas=False)
+    count, version = get_history_version(conn, user_id)
+    conn.close()
+    g.history_version = version
+    return history_etag_for(user_id, count, version, request.args)
+
+
+def statistics_etag(*args, **kwargs):
+    """ETag of a statistics endpoint: the active data generation plus the query"""
+    return statistics_etag_for(request.path, stats_cache.current_generation(), request.args)
+
+
 @lottery_bp.route('/history/<int:user_id>', methods=['GET'])
+@token_required
+@conditional(history_etag, 'private, no-cache')
 def get_history(user_id):
-    """Get user's sorteo history"""
-    conn = get_db_connection()
-    c = execute_query(
-        conn,
-        'SELECT id, numbers, created_at FROM sorteos WHERE user_id = ? ORDER BY created_at DESC', 
-        (user_id,)
-    )
-    rows = c.fetchall()
+    """Get user's sorteo history, newest first, one page at a time
+
+    Query params: ``limit`` (page size), ``before`` (the ``next_cursor`` of
+    the previous page), ``contains`` (comma separated main balls that every
+    sorteo must include) and ``total=true`` to include the user's sorteo count.
+    """
+    forbidden = _forbidden(user_id)
+    if forbidden:
+        return forbidden
+    paging, error = parse_history_args(request.args, current_app.config['HISTORY_PAGE_SIZE'],
+                                       current_app.config['HISTORY_MAX_PAGE_SIZE'])
+    if error:
+        return jsonify({'error': error}), 400
+    limit, before, contains = paging
+    
+    # Read-your-writes: una réplica que aún no tiene el último guardado no sirve
+    version = g.history_version
+    conn = get_read_connection(fresh=lambda replica: get_history_version(replica, user_id)[1] >= version)
+    try:
+        rows, next_cursor = fetch_history_page(conn, user_id, limit, before, contains)
+    except InvalidCursorError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
+    total = get_sorteo_count(conn, user_id) if request.args.get('total', '').lower() == 'true' else None
     conn.close()
     
-    history = []
-    for row in rows:
-        numbers = [int(n) for n in row[1].split(',')]
-        history.append({
-            'id': row[0],
-            'numbers': numbers,
-            'date': str(row[2])
-        })
+    history = [
+        {'id': row[0], 'numbers': list(row[1:7]), 'date': str(row[7])}
+        for row in rows
+    ]
     
-    return jsonify({'history': history}), 200
+    response = {'history': history, 'next_cursor': next_cursor}
+    if total is not None:
+        response['total'] = total
+    return jsonify(response), 200
 
 
 @lottery_bp.route('/statistics', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
 def statistics():
     """Get lottery statistics (top 3 most frequent numbers with count)"""
     try:
-        conn = get_db_connection()
-        c = execute_query(conn, 'SELECT COUNT(*) FROM historical_data')
-        count = c.fetchone()[0]
+        top_3_with_count = get_top_3_with_count()
         
-        if count > 0:
-            # Get frequency of each number from all balota columns (1-5 only)
-            numbers = []
-            for i in range(1, 6):
-                c = execute_query(conn, f'SELECT balota{i} FROM historical_data')
-                numbers.extend([row[0] for row in c.fetchall()])
-            
-            conn.close()
-            
-            # Count frequency and get top 3
-            counter = Counter(numbers)
-            top_3_with_count = counter.most_common(3)
-            
-            # Format response
-            top_numbers = [
-                {'number': num, 'count': freq} 
-                for num, freq in top_3_with_count
-            ]
-            
-            return jsonify({'top_three_numbers': top_numbers})
-        else:
-            conn.close()
-            return jsonify({'top_three_numbers': []})
-    except Exception as e:
-        print(f"Error getting statistics: {e}")
+        # Format response
+        top_numbers = [
+            {'number': num, 'count': freq} 
+            for num, freq in top_3_with_count
+        ]
+        
+        return jsonify({'top_three_numbers': top_numbers})
+    except Exception:
+        logger.exception('Error getting statistics')
         return jsonify({'top_three_numbers': []})
 
 
+ANALYTICS_DEFAULT_LIMIT = 10
+
+
+def analytics_limit(args):
+    """Read ``?limit=`` of the /statistics/* endpoints; returns (limit, error)"""
+    try:
+        limit = int(args.get('limit', ANALYTICS_DEFAULT_LIMIT))
+    except ValueError:
+        return None, 'limit must be an integer'
+    if not (1 <= limit <= max_limit()):
+        return None, f'limit must be between 1 and {max_limit()}'
+    return limit, None
+
+
+def analytics_window(args):
+    """Read ``?window=`` (one of ANALYTICS_WINDOWS); returns (window, error)"""
+    windows = analytics_windows()
+    try:
+        window = int(args.get('window', windows[0]))
+    except ValueError:
+        return None, 'window must be an integer'
+    if window not in windows:
+        return None, f"window must be one of {', '.join(map(str, windows))}"
+    return window, None
+
+
+def _counted(items):
+    return [{'number': number, 'count': count} for number, count in items]
+
+
+def pairs_payload(limit):
+    return {'pairs': [{'numbers': list(numbers), 'count': count} for numbers, count in top_pairs(limit)]}
+
+
+def triples_payload(limit):
+    return {'triples': [{'numbers': list(numbers), 'count': count} for numbers, count in top_triples(limit)]}
+
+
+def gaps_payload():
+    return {kind: [{'number': number, 'gap': gap} for number, gap in gaps]
+            for kind, gaps in number_gaps().items()}
+
+
+def hot_cold_payload(window, limit):
+    hot, cold = hot_cold(window, limit)
+    return {'window': window, 'hot': _counted(hot), 'cold': _counted(cold)}
+
+
+def bonus_payload():
+    return {'bonus': _counted(bonus_frequency())}
+
+
+@lottery_bp.route('/statistics/pairs', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+def statistics_pairs():
+    """Most frequent pairs of main balls (``?limit=``, default 10)"""
+    limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(pairs_payload(limit)), 200
+
+
+@lottery_bp.route('/statistics/triples', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+def statistics_triples():
+    """Most frequent triples of main balls (``?limit=``, default 10)"""
+    limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(triples_payload(limit)), 200
+
+
+@lottery_bp.route('/statistics/gaps', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+def statistics_gaps():
+    """Draws since each main and bonus number last appeared (null = never)"""
+    return jsonify(gaps_payload()), 200
+
+
+@lottery_bp.route('/statistics/hot_cold', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+def statistics_hot_cold():
+    """Most and least drawn main balls in the last ``?window=`` draws"""
+    window, error = analytics_window(request.args)
+    if not error:
+        limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(hot_cold_payload(window, limit)), 200
+
+
+@lottery_bp.route('/statistics/bonus', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+def statistics_bonus():
+    """Frequency of every bonus ball (balota6, 1-16)"""
+    return jsonify(bonus_payload()), 200
+
+
 @lottery_bp.route('/sorteo/<int:sorteo_id>', methods=['DELETE'])
+@token_required
 def delete_sorteo(sorteo_id):
-    """Delete a sorteo by ID"""
+    """Delete one of the authenticated user's sorteos by ID"""
     try:
         conn = get_db_connection()
-        c = execute_query(conn, 'DELETE FROM sorteos WHERE id = ?', (sorteo_id,))
+        c = execute_query(
+            conn,
+            'DELETE FROM sorteos WHERE id = ? AND user_id = ? RETURNING user_id',
+            (sorteo_id, g.user_id)
+        )
+        deleted = c.fetchone()
+        if deleted is not None:
+            adjust_sorteo_count(conn, deleted[0], -1)
         conn.commit()
-        
-        # rowcount funciona en ambas bases de datos
-        rows_affected = c.rowcount
         conn.close()
         
-        if rows_affected == 0:
+        if deleted is None:
             return jsonify({'error': 'Sorteo not found'}), 404
         
         return jsonify({'success': True, 'message': 'Sorteo deleted'}), 200
@@ -179,31 +352,29 @@ def delete_sorteo(sorteo_id):
 
 
 @lottery_bp.route('/sorteo/<int:sorteo_id>', methods=['PUT'])
+@token_required
 def update_sorteo(sorteo_id):
-    """Update a sorteo by ID"""
+    """Update one of the authenticated user's sorteos by ID"""
     try:
         data = request.json
         numbers = data.get('numbers')
         
-        if not numbers or len(numbers) != 6:
-            return jsonify({'error': 'Invalid numbers format'}), 400
-        
-        # Validate numbers
-        for i in range(5):
-            if not (1 <= numbers[i] <= 43):
-                return jsonify({'error': f'Number {i+1} must be between 1-43'}), 400
-        if not (1 <= numbers[5] <= 16):
-            return jsonify({'error': 'Sixth number must be between 1-16'}), 400
+        try:
+            numbers = validate_numbers(numbers)
+        except InvalidNumbersError as e:
+            return jsonify({'error': str(e)}), 400
         
         conn = get_db_connection()
+        assignments = ', '.join(f'{column} = ?' for column in SORTEO_COLUMNS)
         c = execute_query(
             conn,
-            'UPDATE sorteos SET numbers = ? WHERE id = ?', 
-            (','.join(map(str, numbers)), sorteo_id)
+            f'UPDATE sorteos SET {assignments} WHERE id = ? AND user_id = ?', 
+            (*numbers, sorteo_id, g.user_id)
         )
-        conn.commit()
-        
         rows_affected = c.rowcount
+        if rows_affected:
+            adjust_sorteo_count(conn, g.user_id, 0)
+        conn.commit()
         conn.close()
         
         if rows_affected == 0:
@@ -212,3 +383,47 @@ def update_sorteo(sorteo_id):
         return jsonify({'success': True, 'message': 'Sorteo updated'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@lottery_bp.route('/sorteos', methods=['DELETE'])
+@token_required
+def delete_sorteos_bulk():
+    """Delete many sorteos in one transaction: ``{"ids": [1, 2, ...]}``"""
+    try:
+        ids = (request.get_json(silent=True) or {}).get('ids')
+        error = _bulk_items(ids)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        results, valid = validate_bulk_ids(ids)
+        conn = get_db_connection()
+        deleted = set(delete_sorteos(conn, valid, g.user_id)) if valid else set()
+        conn.commit()
+        conn.close()
+        
+        mark_missing(results, deleted)
+        return _bulk_response(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@lottery_bp.route('/sorteos', methods=['PUT'])
+@token_required
+def update_sorteos_bulk():
+    """Update many sorteos in one statement: ``{"sorteos": [{"id": 1, "numbers": [...]}, ...]}``"""
+    try:
+        items = (request.get_json(silent=True) or {}).get('sorteos')
+        error = _bulk_items(items)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        results, valid = validate_bulk_updates(items)
+        conn = get_db_connection()
+        updated = set(update_sorteos(conn, valid, g.user_id)) if valid else set()
+        conn.commit()
+        conn.close()
+        
+        mark_missing(results, updated)
+        return _bulk_response(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
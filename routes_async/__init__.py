@@ -0,0 +1,9 @@
+"""
+Async routes package initialization
+Same endpoints as the routes package, served by async_app.py under ASGI
+"""
+from .auth import auth_bp
+from .lottery import lottery_bp
+from .upload import upload_bp
+
+__all__ = ['auth_bp', 'lottery_bp', 'upload_bp']
@@ -0,0 +1,127 @@
+"""
+Authentication Blueprint (async)
+Handles user registration and login
+"""
+import logging
+from quart import Blueprint, jsonify, request
+from async_database import async_db
+from passwords import hash_password_async, verify_password_async, needs_rehash
+from tokens import issue_tokens, verify_token, InvalidTokenError, REFRESH
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
+
+
+@auth_bp.route('/register', methods=['POST'])
+async def register():
+    """Register a new user"""
+    data = await request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+    
+    if not username or not password:
+        return jsonify({
+            'success': False, 
+            'message': 'Usuario y contraseña requeridos'
+        }), 400
+    
+    try:
+        hashed_password = await hash_password_async(password)
+        async with async_db.connection() as conn:
+            await conn.execute(
+                'INSERT INTO users (username, password) VALUES (?, ?)', 
+                (username, hashed_password)
+            )
+        return jsonify({
+            'success': True, 
+            'message': 'Usuario registrado exitosamente'
+        }), 200
+    except Exception as e:
+        # Maneja tanto IntegrityError de SQLite como asyncpg
+        if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
+            return jsonify({
+                'success': False, 
+                'message': 'El usuario ya existe'
+            }), 400
+        else:
+            return jsonify({
+                'success': False, 
+                'message': f'Error: {str(e)}'
+            }), 500
+
+
+async def _rehash(user_id, old_hash, password):
+    """Upgrade a hash made with outdated parameters (best effort)"""
+    try:
+        new_hash = await hash_password_async(password)
+        async with async_db.connection() as conn:
+            await conn.execute(
+                'UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                (new_hash, user_id, old_hash)
+            )
+    except Exception as e:
+        logger.warning('Error rehashing password', extra={'user_id': user_id, 'error': str(e)})
+
+
+@auth_bp.route('/login', methods=['POST'])
+async def login():
+    """Authenticate a user"""
+    data = await request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+    
+    if not username or not password:
+        return jsonify({
+            'success': False, 
+            'message': 'Usuario y contraseña requeridos'
+        }), 400
+    
+    async with async_db.connection() as conn:
+        user = await conn.fetchone('SELECT id, password FROM users WHERE username = ?', (username,))
+    
+    if user:
+        user_id = user['id']
+        user_password = user['password']
+        
+        if await verify_password_async(user_password, password):
+            if needs_rehash(user_password):
+                await _rehash(user_id, user_password, password)
+            return jsonify({
+                'success': True, 
+                'user_id': user_id, 
+                'message': 'Login exitoso',
+                **issue_tokens(user_id)
+            }), 200
+    
+    return jsonify({
+        'success': False, 
+        'message': 'Usuario o contraseña incorrectos'
+    }), 401
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+async def refresh():
+    """Exchange a refresh token for a new access/refresh token pair"""
+    data = await request.get_json(silent=True) or {}
+    # Cuerpo JSON que no es un objeto ([], 123...): igual que sin refresh_token
+    refresh_token = data.get('refresh_token') if isinstance(data, dict) else None
+    
+    if not refresh_token:
+        return jsonify({
+            'success': False, 
+            'message': 'refresh_token requerido'
+        }), 400
+    
+    try:
+        user_id = verify_token(refresh_token, REFRESH)
+    except InvalidTokenError as e:
+        return jsonify({
+            'success': False, 
+            'message': str(e)
+        }), 401
+    
+    return jsonify({
+        'success': True, 
+        'user_id': user_id, 
+        **issue_tokens(user_id)
+    }), 200
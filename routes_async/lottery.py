@@ -0,0 +1,421 @@
+"""
+Lottery Blueprint (async)
+Handles lottery generation, history, and statistics
+"""
+import asyncio
+import logging
+from datetime import datetime
+from functools import wraps
+
+from quart import Blueprint, Response, jsonify, request, current_app, g, make_response
+from async_database import async_db
+from cache import stats_cache
+from database import is_postgres
+from etags import etag_matches, history_etag_for, statistics_etag_for, tag_response
+from strategies import generate_sorteos, sorteo_sampler
+from tickets import chunk_sizes, ndjson_chunk
+from tokens import authenticate, is_forbidden, InvalidTokenError
+from history import (history_page_query, parse_history_args, split_page, validate_numbers,
+                     insert_statements, delete_statements, update_statements, bulk_items_error, bulk_result,
+                     validate_bulk_saves, validate_bulk_ids, validate_bulk_updates, attach_ids, mark_missing,
+                     ADJUST_COUNT_SQL, COUNT_SQL, VERSION_SQL, SORTEO_COLUMNS,
+                     InvalidCursorError, InvalidNumbersError)
+from routes.lottery import (get_top_3_with_count, sorteo_strategy, analytics_limit, analytics_window,
+                            pairs_payload, triples_payload, gaps_payload, hot_cold_payload, bonus_payload)
+
+lottery_bp = Blueprint('lottery', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
+
+
+def token_required(view):
+    """Require 'Authorization: Bearer <access token>'; sets g.user_id"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        try:
+            g.user_id = authenticate(request.headers.get('Authorization'))
+        except InvalidTokenError as e:
+            return jsonify({'error': str(e)}), 401
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+def conditional(etag_for, cache_control):
+    """Answer 304 when If-None-Match matches ``await etag_for(*args, **kwargs)``
+
+    Async counterpart of etags.conditional; ``etag_for`` returns None to
+    skip the check.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            etag = await etag_for(*args, **kwargs)
+            if etag is None:
+                return await view(*args, **kwargs)
+            if etag_matches(request.if_none_match, etag):
+                response = current_app.response_class('', status=304)
+            else:
+                response = await make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return tag_response(response, etag, cache_control)
+        return wrapper
+    return decorator
+
+
+async def history_etag(user_id):
+    """ETag of a history page: the user's history version plus the query"""
+    if user_id != g.user_id:
+        return None
+    async with async_db.connection() as conn:
+        row = await conn.fetchone(VERSION_SQL, (user_id,))
+    count, version = (row[0], row[1]) if row else (0, 0)
+    return history_etag_for(user_id, count, version, request.args)
+
+
+async def statistics_etag(*args, **kwargs):
+    """ETag of a statistics endpoint: the active data generation plus the query"""
+    generation = await asyncio.to_thread(stats_cache.current_generation)
+    return statistics_etag_for(request.path, generation, request.args)
+
+
+@lottery_bp.route('/sorteo', methods=['GET'])
+async def sorteo():
+    """Generate a new lottery sorteo
+
+    ``?strategy=`` picks the generation engine (see strategies.py); the
+    default keeps the top three + two random + extra balota (1-16) rule.
+    """
+    strategy, error = sorteo_strategy(request.args.get('strategy'))
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Las tablas salen de la caché de estadísticas (síncrona): se consulta en un hilo
+    balotas = (await asyncio.to_thread(generate_sorteos, strategy, 1))[0].tolist()
+
+    return jsonify({'balotas': balotas})
+
+
+@lottery_bp.route('/sorteo/batch', methods=['POST'])
+async def sorteo_batch():
+    """Generate ``count`` sorteos at once with a single frequency lookup
+
+    Body: ``{"count": 100, "stream": false, "strategy": "frequency"}``. With
+    ``stream`` true (or an ``Accept: application/x-ndjson`` header) the
+    tickets are streamed as one JSON object per line.
+    """
+    data = await request.get_json(silent=True) or {}
+    count = data.get('count', 1)
+    max_count = current_app.config['SORTEO_BATCH_MAX']
+    if not isinstance(count, int) or isinstance(count, bool) or not (1 <= count <= max_count):
+        return jsonify({'error': f'count must be an integer between 1 and {max_count}'}), 400
+    strategy, error = sorteo_strategy(data.get('strategy'))
+    if error:
+        return jsonify({'error': error}), 400
+
+    stream = data.get('stream') is True or request.accept_mimetypes.best == 'application/x-ndjson'
+    if stream:
+        draw = await asyncio.to_thread(sorteo_sampler, strategy)
+
+        async def lines():
+            # Cada trozo se genera en un hilo: el event loop sigue libre entre trozos
+            for size in chunk_sizes(count):
+                yield ndjson_chunk(await asyncio.to_thread(draw, size))
+
+        return Response(lines(), mimetype='application/x-ndjson')
+    tickets = await asyncio.to_thread(generate_sorteos, strategy, count)
+    return jsonify({'count': count, 'balotas': tickets.tolist()})
+
+
+def _bulk_items(items):
+    """Check the size of a bulk request body list; returns an error message or None"""
+    return bulk_items_error(items, current_app.config['SORTEO_BULK_MAX'])
+
+
+def _forbidden(user_id):
+    """403 response when ``user_id`` is not the authenticated user, else None"""
+    if is_forbidden(user_id, g.user_id):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+
+def _bulk_response(results, **extra):
+    """Per-item results; 200 if at least one item succeeded, 400 otherwise"""
+    body, status = bulk_result(results, **extra)
+    return jsonify(body), status
+
+
+async def _returned_ids(conn, statements):
+    ids = []
+    for sql, params in statements:
+        ids.extend(row[0] for row in await conn.fetchall(sql, params))
+    return ids
+
+
+@lottery_bp.route('/save_sorteo', methods=['POST'])
+@token_required
+async def save_sorteo():
+    """Save a sorteo to the authenticated user's history
+
+    Body: ``{"numbers": [...]}`` for one sorteo or ``{"sorteos": [[...], ...]}``
+    to save many in one transaction. ``user_id`` is optional and must match
+    the token.
+    """
+    data = await request.get_json()
+    forbidden = _forbidden(data.get('user_id'))
+    if forbidden:
+        return forbidden
+    user_id = g.user_id
+    if 'sorteos' in data:
+        return await save_sorteos(user_id, data.get('sorteos'))
+    numbers = data.get('numbers')
+
+    if not user_id or not numbers:
+        return jsonify({'error': 'Missing data'}), 400
+    try:
+        numbers = validate_numbers(numbers)
+    except InvalidNumbersError as e:
+        return jsonify({'error': str(e)}), 400
+
+    async with async_db.connection() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                f'''INSERT INTO sorteos (user_id, {', '.join(SORTEO_COLUMNS)})
+                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (user_id, *numbers)
+            )
+            await conn.execute(ADJUST_COUNT_SQL, (user_id, 1))
+
+    return jsonify({'success': True}), 200
+
+
+async def save_sorteos(user_id, sorteos):
+    """Bulk variant of save_sorteo: valid items are inserted, invalid ones reported"""
+    error = _bulk_items(sorteos)
+    if not user_id or error:
+        return jsonify({'error': error or 'Missing data'}), 400
+
+    results, valid = validate_bulk_saves(sorteos)
+    if valid:
+        try:
+            async with async_db.connection() as conn:
+                async with conn.transaction():
+                    ids = await _returned_ids(conn, insert_statements(user_id, valid))
+                    await conn.execute(ADJUST_COUNT_SQL, (user_id, len(ids)))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        attach_ids(results, ids)
+
+    return _bulk_response(results)
+
+
+@lottery_bp.route('/history/<int:user_id>', methods=['GET'])
+@token_required
+@conditional(history_etag, 'private, no-cache')
+async def get_history(user_id):
+    """Get user's sorteo history, newest first, one page at a time
+
+    Query params: ``limit`` (page size), ``before`` (the ``next_cursor`` of
+    the previous page), ``contains`` (comma separated main balls that every
+    sorteo must include) and ``total=true`` to include the user's sorteo count.
+    """
+    forbidden = _forbidden(user_id)
+    if forbidden:
+        return forbidden
+    paging, error = parse_history_args(request.args, current_app.config['HISTORY_PAGE_SIZE'],
+                                       current_app.config['HISTORY_MAX_PAGE_SIZE'])
+    if error:
+        return jsonify({'error': error}), 400
+    limit, before, contains = paging
+
+    # asyncpg compara created_at como TIMESTAMP: el cursor debe llegar como datetime
+    parse_timestamp = datetime.fromisoformat if is_postgres() else None
+    try:
+        sql, params = history_page_query(user_id, limit, before, contains, parse_timestamp)
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Siempre del primario: async_db no enruta a réplicas (ver async_database.py)
+    async with async_db.connection() as conn:
+        rows, next_cursor = split_page(await conn.fetchall(sql, params), limit)
+        total = None
+        if request.args.get('total', '').lower() == 'true':
+            row = await conn.fetchone(COUNT_SQL, (user_id,))
+            total = row[0] if row else 0
+
+    history = [
+        {'id': row[0], 'numbers': list(row[1:7]), 'date': str(row[7])}
+        for row in rows
+    ]
+
+    response = {'history': history, 'next_cursor': next_cursor}
+    if total is not None:
+        response['total'] = total
+    return jsonify(response), 200
+
+
+@lottery_bp.route('/statistics', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics():
+    """Get lottery statistics (top 3 most frequent numbers with count)"""
+    try:
+        top_3_with_count = await asyncio.to_thread(get_top_3_with_count)
+
+        # Format response
+        top_numbers = [
+            {'number': num, 'count': freq}
+            for num, freq in top_3_with_count
+        ]
+
+        return jsonify({'top_three_numbers': top_numbers})
+    except Exception:
+        logger.exception('Error getting statistics')
+        return jsonify({'top_three_numbers': []})
+
+
+@lottery_bp.route('/statistics/pairs', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics_pairs():
+    """Most frequent pairs of main balls (``?limit=``, default 10)"""
+    limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(await asyncio.to_thread(pairs_payload, limit)), 200
+
+
+@lottery_bp.route('/statistics/triples', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics_triples():
+    """Most frequent triples of main balls (``?limit=``, default 10)"""
+    limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(await asyncio.to_thread(triples_payload, limit)), 200
+
+
+@lottery_bp.route('/statistics/gaps', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics_gaps():
+    """Draws since each main and bonus number last appeared (null = never)"""
+    return jsonify(await asyncio.to_thread(gaps_payload)), 200
+
+
+@lottery_bp.route('/statistics/hot_cold', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics_hot_cold():
+    """Most and least drawn main balls in the last ``?window=`` draws"""
+    window, error = analytics_window(request.args)
+    if not error:
+        limit, error = analytics_limit(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(await asyncio.to_thread(hot_cold_payload, window, limit)), 200
+
+
+@lottery_bp.route('/statistics/bonus', methods=['GET'])
+@conditional(statistics_etag, 'public, no-cache')
+async def statistics_bonus():
+    """Frequency of every bonus ball (balota6, 1-16)"""
+    return jsonify(await asyncio.to_thread(bonus_payload)), 200
+
+
+@lottery_bp.route('/sorteo/<int:sorteo_id>', methods=['DELETE'])
+@token_required
+async def delete_sorteo(sorteo_id):
+    """Delete one of the authenticated user's sorteos by ID"""
+    try:
+        async with async_db.connection() as conn:
+            async with conn.transaction():
+                deleted = await conn.fetchone(
+                    'DELETE FROM sorteos WHERE id = ? AND user_id = ? RETURNING user_id',
+                    (sorteo_id, g.user_id)
+                )
+                if deleted is not None:
+                    await conn.execute(ADJUST_COUNT_SQL, (deleted[0], -1))
+
+        if deleted is None:
+            return jsonify({'error': 'Sorteo not found'}), 404
+
+        return jsonify({'success': True, 'message': 'Sorteo deleted'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@lottery_bp.route('/sorteo/<int:sorteo_id>', methods=['PUT'])
+@token_required
+async def update_sorteo(sorteo_id):
+    """Update one of the authenticated user's sorteos by ID"""
+    try:
+        data = await request.get_json()
+        numbers = data.get('numbers')
+
+        try:
+            numbers = validate_numbers(numbers)
+        except InvalidNumbersError as e:
+            return jsonify({'error': str(e)}), 400
+
+        assignments = ', '.join(f'{column} = ?' for column in SORTEO_COLUMNS)
+        async with async_db.connection() as conn:
+            async with conn.transaction():
+                rows_affected = await conn.execute(
+                    f'UPDATE sorteos SET {assignments} WHERE id = ? AND user_id = ?',
+                    (*numbers, sorteo_id, g.user_id)
+                )
+                if rows_affected:
+                    await conn.execute(ADJUST_COUNT_SQL, (g.user_id, 0))
+
+        if rows_affected == 0:
+            return jsonify({'error': 'Sorteo not found'}), 404
+
+        return jsonify({'success': True, 'message': 'Sorteo updated'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@lottery_bp.route('/sorteos', methods=['DELETE'])
+@token_required
+async def delete_sorteos_bulk():
+    """Delete many sorteos in one transaction: ``{"ids": [1, 2, ...]}``"""
+    try:
+        ids = (await request.get_json(silent=True) or {}).get('ids')
+        error = _bulk_items(ids)
+        if error:
+            return jsonify({'error': error}), 400
+
+        results, valid = validate_bulk_ids(ids)
+        deleted = set()
+        if valid:
+            async with async_db.connection() as conn:
+                async with conn.transaction():
+                    deleted = set(await _returned_ids(conn, delete_statements(valid, g.user_id)))
+                    if deleted:
+                        await conn.execute(ADJUST_COUNT_SQL, (g.user_id, -len(deleted)))
+
+        mark_missing(results, deleted)
+        return _bulk_response(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@lottery_bp.route('/sorteos', methods=['PUT'])
+@token_required
+async def update_sorteos_bulk():
+    """Update many sorteos in one statement: ``{"sorteos": [{"id": 1, "numbers": [...]}, ...]}``"""
+    try:
+        items = (await request.get_json(silent=True) or {}).get('sorteos')
+        error = _bulk_items(items)
+        if error:
+            return jsonify({'error': error}), 400
+
+        results, valid = validate_bulk_updates(items)
+        updated = set()
+        if valid:
+            async with async_db.connection() as conn:
+                async with conn.transaction():
+                    updated = set(await _returned_ids(conn, update_statements(valid, g.user_id)))
+                    if updated:
+                        await conn.execute(ADJUST_COUNT_SQL, (g.user_id, 0))
+
+        mark_missing(results, updated)
+        return _bulk_response(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
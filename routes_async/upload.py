@@ -0,0 +1,61 @@
+"""
+Upload Blueprint (async)
+Handles Excel file uploads; processing runs as a background job
+"""
+import asyncio
+import logging
+
+from quart import Blueprint, jsonify, request, url_for
+from jobs import new_job_file, queue_job, get_job
+
+upload_bp = Blueprint('upload', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
+
+
+@upload_bp.route('/upload', methods=['POST'])
+async def upload_file():
+    """Upload and process Excel file with historical lottery data"""
+    files = await request.files
+    if 'file' not in files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    if not file.filename.endswith('.xlsx'):
+        return jsonify({'error': 'Invalid file format. Only .xlsx files are allowed'}), 400
+    
+    # mode=replace (default) reemplaza el histórico; mode=append agrega sorteos nuevos
+    mode = request.args.get('mode', 'replace')
+    if mode not in ('replace', 'append'):
+        return jsonify({'error': "Invalid mode. Use 'replace' or 'append'"}), 400
+    
+    # El archivo se escribe sin bloquear el loop; la carga corre en el pool de jobs
+    try:
+        job_id, file_path = new_job_file()
+        await file.save(str(file_path))
+        await asyncio.to_thread(queue_job, job_id, file_path, mode)
+    except Exception as e:
+        logger.exception('Error queuing upload')
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+    
+    status_url = url_for('upload.upload_status', job_id=job_id)
+    response = jsonify({
+        'message': 'File accepted for processing',
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': status_url
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+@upload_bp.route('/upload/<job_id>', methods=['GET'])
+async def upload_status(job_id):
+    """Report progress of an upload job"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
@@ -0,0 +1,241 @@
+"""
+Sorteo generation strategies
+Every strategy samples from a probability table built once per data
+generation from the precomputed indexes (number_frequency, number_gaps,
+number_pairs) and kept in stats_cache, so a request only draws random
+numbers, whatever the strategy:
+
+- top3: the original rule (top 3 frequent + 2 uniform, see tickets.py)
+- uniform: every main and bonus ball equally likely
+- frequency: weighted by how often each number was drawn
+- recency: weighted by how recently each number was drawn
+- cooccurrence: each ball weighted by how often it came out together with
+  the balls already chosen for the ticket
+- avoid_recent: uniform, skipping the numbers of the last N draws
+
+Main balls are sampled without replacement with the Gumbel top-k trick
+(argmax of log-weight + Gumbel noise, vectorized over every ticket); the
+bonus ball by inverse CDF (searchsorted on the cumulative probabilities).
+"""
+import logging
+import random
+
+import numpy as np
+
+from analytics import MAIN_NUMBERS, BONUS_NUMBERS, read_gaps, read_pair_matrix
+from cache import stats_cache
+from frequency import BONUS_POSITION, get_top_frequent, get_position_counts
+from tickets import generate_tickets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRATEGY = 'top3'
+
+# Valores por defecto; create_app() los sobrescribe con configure_strategies()
+_settings = {
+    'default': DEFAULT_STRATEGY,
+    'recency_half_life': 10.0,
+    'avoid_recent_draws': 3,
+}
+
+
+def configure_strategies(app_config):
+    """Load sorteo strategy settings from the Flask config (SORTEO_* keys)"""
+    default = app_config.get('SORTEO_DEFAULT_STRATEGY', _settings['default'])
+    if default not in STRATEGIES:
+        raise ValueError(f"SORTEO_DEFAULT_STRATEGY must be one of {', '.join(STRATEGIES)}")
+    _settings['default'] = default
+    _settings['recency_half_life'] = app_config.get('SORTEO_RECENCY_HALF_LIFE', _settings['recency_half_life'])
+    _settings['avoid_recent_draws'] = app_config.get('SORTEO_AVOID_RECENT_DRAWS', _settings['avoid_recent_draws'])
+
+
+def default_strategy():
+    return _settings['default']
+
+
+def strategy_error(name):
+    """Error message for an unknown strategy name, or None"""
+    if isinstance(name, str) and name in STRATEGIES:
+        return None
+    return f"strategy must be one of {', '.join(STRATEGIES)}"
+
+
+def get_top_3_with_count():
+    """Top 3 most frequent numbers with count, cached until the next upload"""
+    return stats_cache.get_or_compute('top_3', lambda conn: get_top_frequent(conn, 3))
+
+
+def get_top_3_frequent():
+    """Get the top 3 most frequent numbers from historical data"""
+    try:
+        top_3 = [num for num, _ in get_top_3_with_count()]
+        return top_3 if len(top_3) == 3 else random.sample(range(1, 44), 3)
+    except Exception as e:
+        logger.warning('Error getting top 3 frequent', extra={'error': str(e)})
+        return random.sample(range(1, 44), 3)
+
+
+class SamplingTable:
+    """Log-weights of the main balls and bonus CDF of one strategy
+
+    ``main_log`` and ``bonus_cdf`` are indexed by number (index 0 unused,
+    log-weight -inf = never chosen). ``pairs`` holds the log of the pair
+    affinities for co-occurrence sampling, otherwise None.
+    """
+
+    def __init__(self, main_weights, bonus_weights, pairs=None):
+        main_weights = np.asarray(main_weights, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            self.main_log = np.log(main_weights / main_weights.sum())
+        bonus_weights = np.asarray(bonus_weights, dtype=np.float64)
+        self.bonus_cdf = np.cumsum(bonus_weights / bonus_weights.sum())
+        self.bonus_cdf[-1] = 1.0
+        self.pairs = pairs
+
+    def sample(self, count, rng):
+        """Return a ``count`` x 6 int array of tickets (5 balotas + balota extra)"""
+        if self.pairs is None:
+            keys = self.main_log + rng.gumbel(size=(count, MAIN_NUMBERS + 1))
+            top = np.argpartition(-keys, 5, axis=1)[:, :5]
+            # Orden de extracción (de mayor a menor clave), como un sorteo secuencial
+            order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+            main = np.take_along_axis(top, order, axis=1)
+        else:
+            main = self._sample_cooccurrence(count, rng)
+
+        bonus = np.searchsorted(self.bonus_cdf, rng.random(count), side='right')
+        return np.column_stack([main, np.minimum(bonus, BONUS_NUMBERS)])
+
+    def _sample_cooccurrence(self, count, rng):
+        rows = np.arange(count)
+        main = np.empty((count, 5), dtype=np.int64)
+        log_weights = np.broadcast_to(self.main_log, (count, MAIN_NUMBERS + 1)).copy()
+        affinity = np.zeros((count, MAIN_NUMBERS + 1))
+        for step in range(5):
+            # Primera balota por frecuencia; las demás por afinidad con las ya elegidas
+            keys = (log_weights if step == 0 else affinity) + rng.gumbel(size=log_weights.shape)
+            chosen = np.argmax(keys, axis=1)
+            main[:, step] = chosen
+            log_weights[rows, chosen] = -np.inf
+            affinity = np.logaddexp(affinity, self.pairs[chosen]) if step else self.pairs[chosen].copy()
+            affinity[np.isinf(log_weights)] = -np.inf
+        return main
+
+
+def _main_mask():
+    """Weight 1 for every main ball, 0 for the unused index 0"""
+    weights = np.ones(MAIN_NUMBERS + 1)
+    weights[0] = 0
+    return weights
+
+
+def _bonus_mask():
+    """Weight 1 for every bonus ball, 0 for the unused index 0"""
+    weights = np.ones(BONUS_NUMBERS + 1)
+    weights[0] = 0
+    return weights
+
+
+def _counts(conn):
+    """Main and bonus weights proportional to draw counts (+1 smoothing)"""
+    main = _main_mask()
+    for number, count in get_top_frequent(conn, MAIN_NUMBERS):
+        main[number] += count
+    bonus = _bonus_mask()
+    for number, count in get_position_counts(conn, BONUS_POSITION).items():
+        if 1 <= number <= BONUS_NUMBERS:
+            bonus[number] += count
+    return main, bonus
+
+
+def _decay(gaps, mask, half_life):
+    """Weights halving every ``half_life`` draws since a number last appeared"""
+    weights = mask()
+    gaps = dict(gaps)
+    known = [gap for gap in gaps.values() if gap is not None]
+    newest = min(known, default=0)
+    # Nunca salió: un sorteo más antiguo que el más antiguo conocido
+    never = max(known, default=0) + 1
+    for number in range(1, len(weights)):
+        gap = gaps.get(number)
+        weights[number] = 0.5 ** (((never if gap is None else gap) - newest) / half_life)
+    return weights
+
+
+def _skip_recent(gaps, mask, draws, minimum):
+    """Uniform weights without the numbers of the last ``draws`` draws
+
+    Falls back to uniform when fewer than ``minimum`` numbers remain.
+    """
+    weights = mask()
+    for number, gap in gaps:
+        if 1 <= number < len(weights) and gap is not None and gap < draws:
+            weights[number] = 0
+    return weights if np.count_nonzero(weights) >= minimum else mask()
+
+
+def _uniform(conn):
+    return SamplingTable(_main_mask(), _bonus_mask())
+
+
+def _frequency(conn):
+    return SamplingTable(*_counts(conn))
+
+
+def _recency(conn):
+    gaps = read_gaps(conn)
+    half_life = _settings['recency_half_life']
+    return SamplingTable(_decay(gaps['main'], _main_mask, half_life),
+                         _decay(gaps['bonus'], _bonus_mask, half_life))
+
+
+def _cooccurrence(conn):
+    main, bonus = _counts(conn)
+    # Suavizado +1: un par que nunca salió sigue siendo posible
+    pairs = read_pair_matrix(conn).astype(np.float64) + 1
+    np.fill_diagonal(pairs, 0)
+    pairs[0, :] = pairs[:, 0] = 0
+    with np.errstate(divide='ignore'):
+        return SamplingTable(main, bonus, np.log(pairs))
+
+
+def _avoid_recent(conn):
+    gaps = read_gaps(conn)
+    draws = _settings['avoid_recent_draws']
+    return SamplingTable(_skip_recent(gaps['main'], _main_mask, draws, minimum=5),
+                         _skip_recent(gaps['bonus'], _bonus_mask, draws, minimum=1))
+
+
+# Nombre (?strategy=) -> constructor de su tabla; top3 usa tickets.generate_tickets
+STRATEGIES = {
+    'top3': None,
+    'uniform': _uniform,
+    'frequency': _frequency,
+    'recency': _recency,
+    'cooccurrence': _cooccurrence,
+    'avoid_recent': _avoid_recent,
+}
+
+
+def sampling_table(name):
+    """The strategy's table for the active generation, cached until the next upload"""
+    return stats_cache.get_or_compute(f'strategy:{name}', STRATEGIES[name])
+
+
+def sorteo_sampler(name, rng=None):
+    """``draw(n)`` returning an ``n`` x 6 int array of tickets of strategy ``name``
+
+    The table (or top three) is looked up once, so the chunks of a streamed
+    batch all come from the same data generation.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if STRATEGIES[name] is None:
+        top_three = get_top_3_frequent()
+        return lambda n: generate_tickets(top_three, n, rng)
+    table = sampling_table(name)
+    return lambda n: table.sample(n, rng)
+
+
+def generate_sorteos(name, count, rng=None):
+    """Return a ``count`` x 6 int array of tickets drawn with strategy ``name``"""
+    return sorteo_sampler(name, rng)(count)
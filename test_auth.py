@@ -7,6 +7,9 @@ import json
 
 BASE_URL = 'http://192.168.1.9:8080'
 
+# Token de acceso que devuelve el login
+HEADERS = {'Content-Type': 'application/json'}
+
 def test_register():
     """Prueba el registro de usuario"""
     print("🔵 Probando registro...")
@@ -33,6 +36,7 @@ def test_login():
     
     if data.get('success'):
         print(f"✅ Login exitoso! User ID: {data.get('user_id')}")
+        HEADERS['Authorization'] = f"Bearer {data.get('access_token')}"
         return data.get('user_id')
     else:
         print("❌ Login falló")
@@ -43,7 +47,7 @@ def test_save_sorteo(user_id):
     print("🔵 Probando guardar sorteo...")
     response = requests.post(
         f'{BASE_URL}/api/save_sorteo',
-        headers={'Content-Type': 'application/json'},
+        headers=HEADERS,
         json={
             'user_id': user_id,
             'numbers': [5, 12, 23, 34, 42, 8]
@@ -56,7 +60,7 @@ def test_save_sorteo(user_id):
 def test_get_history(user_id):
     """Prueba obtener el historial"""
     print("🔵 Probando obtener historial...")
-    response = requests.get(f'{BASE_URL}/api/history/{user_id}')
+    response = requests.get(f'{BASE_URL}/api/history/{user_id}', headers=HEADERS)
     print(f"Status: {response.status_code}")
     data = response.json()
     print(f"Response: {json.dumps(data, indent=2)}")
@@ -9,6 +9,9 @@ import sys
 BASE_URL = input("Ingresa la URL de tu backend en Render (ej: https://sorteo-loteria-api.onrender.com): ")
 BASE_URL = BASE_URL.rstrip('/')
 
+# Token de acceso que devuelve el login
+HEADERS = {'Content-Type': 'application/json'}
+
 print("\n" + "="*60)
 print("🧪 PROBANDO BACKEND EN RENDER")
 print("="*60)
@@ -68,6 +71,7 @@ def test_login():
         data = response.json()
         if response.status_code == 200 and data.get('success'):
             user_id = data.get('user_id')
+            HEADERS['Authorization'] = f"Bearer {data.get('access_token')}"
             print(f"   ✅ Login exitoso - User ID: {user_id}")
             return user_id
         else:
@@ -104,7 +108,7 @@ def test_save_sorteo(user_id, numbers):
     try:
         response = requests.post(
             f'{BASE_URL}/api/save_sorteo',
-            headers={'Content-Type': 'application/json'},
+            headers=HEADERS,
             json={'user_id': user_id, 'numbers': numbers},
             timeout=10
         )
@@ -122,7 +126,7 @@ def test_history(user_id):
     """Probar obtener historial"""
     print("\n6️⃣  Probando Obtener Historial...")
     try:
-        response = requests.get(f'{BASE_URL}/api/history/{user_id}', timeout=10)
+        response = requests.get(f'{BASE_URL}/api/history/{user_id}', headers=HEADERS, timeout=10)
         if response.status_code == 200:
             data = response.json()
             history = data.get('history', [])
@@ -0,0 +1,57 @@
+"""
+Vectorized sorteo (ticket) generation
+Builds any number of tickets in a single NumPy pass: the top three numbers,
+two distinct random balls from the remaining 40 (shuffled together) and an
+extra ball 1-16, the same rule /api/sorteo applies to one ticket
+"""
+import numpy as np
+
+MAIN_NUMBERS = np.arange(1, 44)
+
+# Tickets por trozo de una respuesta NDJSON (~40 bytes por línea)
+NDJSON_CHUNK_SIZE = 10_000
+NDJSON_LINE = '{"balotas": [%d, %d, %d, %d, %d, %d]}\n'
+
+
+def generate_tickets(top_three, count, rng=None):
+    """Return a ``count`` x 6 int array of tickets (5 balotas + balota extra)"""
+    rng = rng if rng is not None else np.random.default_rng()
+    top_three = np.asarray(top_three, dtype=np.int64)
+    available = np.setdiff1d(MAIN_NUMBERS, top_three)
+
+    # Dos posiciones distintas entre las disponibles sin generar permutaciones
+    first = rng.integers(0, len(available), size=count)
+    second = rng.integers(0, len(available) - 1, size=count)
+    second += second >= first
+
+    main = np.empty((count, 5), dtype=np.int64)
+    main[:, :3] = top_three
+    main[:, 3] = available[first]
+    main[:, 4] = available[second]
+    # Mezclar cada fila (equivale a random.shuffle por ticket)
+    order = np.argsort(rng.random((count, 5)), axis=1)
+    main = np.take_along_axis(main, order, axis=1)
+
+    bonus = rng.integers(1, 17, size=(count, 1))
+    return np.hstack([main, bonus])
+
+
+def chunk_sizes(count, chunk_size=NDJSON_CHUNK_SIZE):
+    """Sizes of the chunks that add up to ``count`` tickets"""
+    for start in range(0, count, chunk_size):
+        yield min(chunk_size, count - start)
+
+
+def ndjson_chunk(tickets):
+    """A ticket array as NDJSON lines ({"balotas": [...]})"""
+    return ''.join(NDJSON_LINE % tuple(row) for row in tickets.tolist())
+
+
+def iter_ndjson(draw, count, chunk_size=NDJSON_CHUNK_SIZE):
+    """Generate ``count`` tickets with ``draw(n)`` and yield them as NDJSON, a chunk at a time
+
+    Only one chunk exists at once, so memory does not grow with ``count``
+    and the first line is sent as soon as the first chunk is drawn.
+    """
+    for size in chunk_sizes(count, chunk_size):
+        yield ndjson_chunk(draw(size))
@@ -0,0 +1,182 @@
+"""
+Stateless session tokens
+Login hands out an access token and a refresh token signed with HMAC-SHA256
+using SECRET_KEY; protected endpoints verify the signature and expiry with
+no DB lookup, and tokens already verified by this worker are remembered in
+a small LRU so repeated requests skip the HMAC as well
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+# Valores por defecto; create_app() los sobrescribe con configure_tokens()
+_settings = {
+    'secret': b'',
+    'access_ttl': 900,
+    'refresh_ttl': 30 * 24 * 3600,
+    'cache_size': 10_000,
+}
+
+# Solo para DEBUG/TESTING: es pública, cualquiera podría firmar tokens con ella
+DEV_SECRET_KEY = 'dev-secret-key-change-in-production'
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is malformed, forged, expired or of the wrong type"""
+
+
+class VerifiedTokenCache:
+    """LRU of token -> (user_id, kind, expires_at) for tokens whose signature checked out"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry
+
+    def put(self, token, entry):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+token_cache = VerifiedTokenCache(_settings['cache_size'])
+
+
+def configure_tokens(app_config):
+    """Load token settings from the Flask config (SECRET_KEY and TOKEN_* keys)
+
+    Raises RuntimeError when SECRET_KEY is missing outside DEBUG/TESTING, so
+    a deploy never signs tokens with the public development key.
+    """
+    secret = app_config.get('SECRET_KEY')
+    if not secret:
+        if not (app_config.get('DEBUG') or app_config.get('TESTING')):
+            raise RuntimeError('SECRET_KEY is not set; refusing to sign tokens with a public key')
+        secret = DEV_SECRET_KEY
+    _settings['secret'] = secret.encode()
+    _settings['access_ttl'] = app_config.get('TOKEN_ACCESS_TTL', _settings['access_ttl'])
+    _settings['refresh_ttl'] = app_config.get('TOKEN_REFRESH_TTL', _settings['refresh_ttl'])
+    token_cache.max_size = app_config.get('TOKEN_CACHE_SIZE', _settings['cache_size'])
+    token_cache.clear()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_settings['secret'], payload.encode(), hashlib.sha256).digest())
+
+
+def create_token(user_id, kind, ttl, now=None):
+    """Signed token '<payload>.<signature>' valid for ``ttl`` seconds"""
+    now = int(now if now is not None else time.time())
+    payload = _b64encode(json.dumps(
+        {'sub': user_id, 'typ': kind, 'iat': now, 'exp': now + ttl},
+        separators=(',', ':')
+    ).encode())
+    return f'{payload}.{_sign(payload)}'
+
+
+def issue_tokens(user_id):
+    """Access + refresh token pair for a user (login and refresh responses)"""
+    return {
+        'access_token': create_token(user_id, ACCESS, _settings['access_ttl']),
+        'refresh_token': create_token(user_id, REFRESH, _settings['refresh_ttl']),
+        'token_type': 'Bearer',
+        'expires_in': _settings['access_ttl'],
+    }
+
+
+def verify_token(token, kind=ACCESS):
+    """Return the user_id of a valid token of type ``kind`` or raise InvalidTokenError"""
+    if not isinstance(token, str):
+        raise InvalidTokenError('Token inválido')
+    now = time.time()
+    entry = token_cache.get(token)
+    if entry is None:
+        try:
+            payload, signature = token.split('.')
+            # Bytes: compare_digest no acepta str con caracteres no ASCII
+            # (UnicodeEncodeError, p. ej. surrogates, también es ValueError)
+            valid = hmac.compare_digest(signature.encode(), _sign(payload).encode())
+        except ValueError:
+            raise InvalidTokenError('Token inválido')
+        if not valid:
+            raise InvalidTokenError('Token inválido')
+        try:
+            claims = json.loads(_b64decode(payload))
+            entry = (int(claims['sub']), claims['typ'], float(claims['exp']))
+        except (ValueError, KeyError, TypeError):
+            raise InvalidTokenError('Token inválido')
+        token_cache.put(token, entry)
+
+    user_id, token_kind, expires_at = entry
+    if token_kind != kind:
+        raise InvalidTokenError('Token inválido')
+    if expires_at <= now:
+        raise InvalidTokenError('Token expirado')
+    return user_id
+
+
+def authenticate(header):
+    """user_id of an 'Authorization: Bearer <access token>' header or raise InvalidTokenError"""
+    scheme, _, token = (header or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise InvalidTokenError('Authentication required')
+    return verify_token(token.strip())
+
+
+def is_forbidden(requested_user_id, user_id):
+    """True when a request names a user_id other than the authenticated one"""
+    return requested_user_id is not None and requested_user_id != user_id
+
+
+def token_required(view):
+    """Require 'Authorization: Bearer <access token>'; sets g.user_id"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            g.user_id = authenticate(request.headers.get('Authorization'))
+        except InvalidTokenError as e:
+            return jsonify({'error': str(e)}), 401
+        return view(*args, **kwargs)
+    return wrapper
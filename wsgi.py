@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Script to create the application instance for Gunicorn
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
 """
 from app import create_app
 import os
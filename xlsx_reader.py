@@ -0,0 +1,191 @@
+"""
+Streaming reader for a single column of an .xlsx worksheet
+Parses the sheet XML incrementally and keeps the shared string table as
+6-byte draw codes, so memory stays flat as history files grow
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+DOC_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+class CompactSharedStrings:
+    """Shared string table storing 'n1-...-n6' entries as 6 bytes each
+
+    Any other string (headers, dates as text, malformed results) is kept
+    verbatim in a side dictionary so it can still be reported.
+    """
+
+    def __init__(self):
+        self._codes = bytearray()
+        self._extras = {}
+        self._count = 0
+
+    def append(self, text):
+        code = None
+        parts = text.split('-')
+        if len(parts) == 6:
+            try:
+                values = [int(part) for part in parts]
+            except ValueError:
+                values = None
+            if values and all(0 < value < 256 for value in values):
+                code = bytes(values)
+
+        if code is None:
+            self._extras[self._count] = text
+            code = bytes(6)
+        self._codes += code
+        self._count += 1
+
+    def __getitem__(self, index):
+        text = self._extras.get(index)
+        if text is not None:
+            return text
+        start = index * 6
+        return '-'.join(map(str, self._codes[start:start + 6]))
+
+    def __len__(self):
+        return self._count
+
+
+def _relationship_targets(archive, path):
+    rels = ET.fromstring(archive.read(path))
+    return {
+        rel.get('Id'): (rel.get('Type', ''), rel.get('Target', ''))
+        for rel in rels.iter(f'{PKG_REL_NS}Relationship')
+    }
+
+
+def _resolve(target):
+    return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+
+
+def _locate_parts(archive, sheet_name):
+    """Return (sheet_path, shared_strings_path or None) inside the archive"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    targets = _relationship_targets(archive, 'xl/_rels/workbook.xml.rels')
+
+    sheet_path = None
+    for sheet in workbook.iter(f'{NS}sheet'):
+        if sheet.get('name') == sheet_name:
+            sheet_path = _resolve(targets[sheet.get(f'{DOC_REL_NS}id')][1])
+            break
+    if sheet_path is None:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    strings_path = None
+    for rel_type, target in targets.values():
+        if rel_type.endswith('/sharedStrings'):
+            strings_path = _resolve(target)
+    return sheet_path, strings_path
+
+
+def _text_of(element):
+    """Concatenate the <t> runs of a string item, ignoring phonetic runs"""
+    parts = []
+    for child in element:
+        if child.tag == f'{NS}t':
+            parts.append(child.text or '')
+        elif child.tag == f'{NS}r':
+            run = child.find(f'{NS}t')
+            if run is not None:
+                parts.append(run.text or '')
+    return ''.join(parts)
+
+
+def _load_shared_strings(archive, path):
+    strings = CompactSharedStrings()
+    if path is None or path not in archive.namelist():
+        return strings
+    with archive.open(path) as source:
+        root = None
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if root is None:
+                root = element
+            elif event == 'end' and element.tag == f'{NS}si':
+                strings.append(_text_of(element))
+                root.clear()
+    return strings
+
+
+def _column_index(reference):
+    """'B12' -> 1 (zero based)"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+
+def _cell_value(cell, shared_strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        inline = cell.find(f'{NS}is')
+        return _text_of(inline) if inline is not None else None
+    value = cell.find(f'{NS}v')
+    if value is None or value.text is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(value.text)]
+    return value.text
+
+
+def iter_rows(file_path, sheet_name):
+    """Yield ``(row_number, {column_index: value})`` for each non-empty row"""
+    with zipfile.ZipFile(file_path) as archive:
+        sheet_path, strings_path = _locate_parts(archive, sheet_name)
+        shared_strings = _load_shared_strings(archive, strings_path)
+
+        with archive.open(sheet_path) as source:
+            sheet_data = None
+            row_number = 0
+            for event, element in ET.iterparse(source, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == f'{NS}sheetData':
+                        sheet_data = element
+                    continue
+                if element.tag != f'{NS}row':
+                    continue
+
+                row_number = int(element.get('r', row_number + 1))
+                cells = {}
+                position = -1
+                for cell in element.iter(f'{NS}c'):
+                    reference = cell.get('r')
+                    position = _column_index(reference) if reference else position + 1
+                    value = _cell_value(cell, shared_strings)
+                    if value is not None:
+                        cells[position] = value
+                if cells:
+                    yield row_number, cells
+                # Liberar las filas ya procesadas
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+
+def iter_column_batches(file_path, sheet_name, column, batch_size):
+    """Yield ``(first_row, values)`` batches of the column titled ``column``
+
+    Row 1 (the first non-empty row) is taken as the header, as pandas does.
+    """
+    rows = iter_rows(file_path, sheet_name)
+    header = next(rows, None)
+    if header is None or column not in header[1].values():
+        raise ValueError(f"La hoja '{sheet_name}' no tiene la columna '{column}'")
+    index = next(position for position, value in header[1].items() if value == column)
+
+    batch = []
+    first_row = None
+    for row_number, cells in rows:
+        if not batch:
+            first_row = row_number
+        batch.append(cells.get(index))
+        if len(batch) >= batch_size:
+            yield first_row, batch
+            batch = []
+    if batch:
+        yield first_row, batch